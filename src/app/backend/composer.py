@@ -2,12 +2,10 @@ from typing import List, Callable
 
 from src.app.mingus.containers.note import Note
 from src.app.model.event import Event
-from src.app.model.meter import invert
 from src.app.model.rhythm import Rhythm
 from src.app.model.types import Unit, NoteUnit, MidiValue
 from src.app.utils.properties import MidiAttr
-
-STEP = invert(NoteUnit.EIGHTH.value)
+from src.app.utils.units import unit2ppq
 
 
 class Composer:
@@ -32,12 +30,12 @@ class Composer:
         if descending:
             scale = scale[::-1]
         # beats = [start_beat + ind * step for ind, _ in enumerate(scale)]
-        beats = map(
-            lambda e: e.beat, Rhythm().bar_of_notes(note_unit=unit, note_duration=note_duration, bar_num=0).events()
+        ticks = map(
+            lambda e: e.tick, Rhythm().bar_of_notes(note_unit=unit, note_duration=note_duration, bar_num=0).events()
         )
         return [
-            Event.from_note(note=note, channel=channel, beat=beat, unit=unit, velocity=velocity)
-            for beat, note in zip(beats, scale)
+            Event.from_note(note=note, channel=channel, tick=tick, duration=unit2ppq(unit=unit), velocity=velocity)
+            for tick, note in zip(ticks, scale)
         ]
 
     def chord(
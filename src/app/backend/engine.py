@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.app.backend.preset_index import PresetEntry, PresetIndex
+from src.app.backend.scheduler import ChannelPrograms
+from src.app.backend.sound_fonts import SoundFontRegistry
+from src.app.model.types import Preset
+from src.app.utils.logger import get_console_logger
+
+logger = get_console_logger(name=__name__, log_level=logging.INFO)
+
+SequencerCallback = Callable[[int, Optional[int], Optional[int], Optional[int]], None]
+
+
+class SequencerBackend(ABC):
+    client_id: Optional[int] = None
+    synth_seq_id: int = -1
+
+    @abstractmethod
+    def get_tick(self) -> int:
+        pass
+
+    @abstractmethod
+    def send_events(
+        self,
+        events: np.ndarray,
+        presets: List[Preset],
+        offset: int,
+        dest=-1,
+        programs: Optional[ChannelPrograms] = None,
+    ):
+        """Schedule a timeline slice of notes, controls, program selects and pitch bends at tick + offset."""
+
+    @abstractmethod
+    def timer(self, time, data=None, source=-1, dest=-1, absolute=True):
+        pass
+
+    @abstractmethod
+    def remove_events(self, source=-1, dest=-1, type=-1):
+        pass
+
+    @abstractmethod
+    def process(self, msec):
+        pass
+
+    @abstractmethod
+    def delete(self):
+        pass
+
+
+class SynthBackend(ABC):
+    def __init__(self):
+        self.sf_registry = SoundFontRegistry()
+
+    @property
+    def sf_map(self) -> Dict[str, int]:
+        return self.sf_registry.sfids
+
+    @property
+    def preset_map(self) -> Dict[int, Dict[int, Dict[int, str]]]:
+        return self.sf_registry.banks
+
+    @staticmethod
+    def get_sf_files(path: str) -> List[str]:
+        glob_path = Path(path)
+        logger.debug(f"Reading soundfonts from path {glob_path}")
+        return [str(item) for item in glob_path.glob("**/*.sf2")]
+
+    def load_sf(self, file_name: str, index: Optional[PresetIndex] = None):
+        sfid = self.sfload(filename=file_name)
+        if index is None:
+            presets = self.sfpresets(sfid=sfid)
+        else:
+            presets = index.presets(sf_name=file_name, enumerate_presets=lambda: self.sfpresets(sfid=sfid))
+        self.sf_registry.add_presets(sfid=sfid, presets=presets)
+
+    def sf_name(self, sfid: int) -> str:
+        return self.sf_registry.sf_name(sfid=sfid)
+
+    @abstractmethod
+    def create_sequencer(
+        self, time_scale: int, use_system_timer: bool = False, callback: Optional[SequencerCallback] = None
+    ) -> SequencerBackend:
+        pass
+
+    @abstractmethod
+    def start(self, driver=None, device=None, midi_driver=None, cmd_handler=False):
+        pass
+
+    @abstractmethod
+    def delete(self):
+        pass
+
+    @abstractmethod
+    def sfload(self, filename, update_midi_preset=0) -> int:
+        pass
+
+    @abstractmethod
+    def sfunload(self, sfid, update_midi_preset=0):
+        pass
+
+    @abstractmethod
+    def sfpresets(self, sfid: int) -> List[PresetEntry]:
+        pass
+
+    @abstractmethod
+    def program_select(self, chan, sfid, bank, preset):
+        pass
+
+    @abstractmethod
+    def program_info(self, chan) -> Tuple[int, int, int]:
+        pass
+
+    @abstractmethod
+    def noteon(self, chan, key, vel):
+        pass
+
+    @abstractmethod
+    def noteoff(self, chan, key):
+        pass
+
+    @abstractmethod
+    def system_reset(self):
+        pass
+
+    @abstractmethod
+    def all_notes_off(self, chan):
+        pass
+
+    @abstractmethod
+    def active_voice_count(self) -> int:
+        pass
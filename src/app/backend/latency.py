@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from time import perf_counter
+from typing import List, Optional
+
+import numpy as np
+
+from src.app.backend.profiles import ENGINE_PROFILES, EngineProfile
+from src.app.backend.synth import Synth
+from src.app.utils.logger import get_console_logger
+from src.app.utils.properties import EngineProfileName, MidiAttr
+
+logger = get_console_logger(name=__name__, log_level=logging.INFO)
+
+
+@dataclass(kw_only=True, slots=True)
+class LatencyReport:
+    profile: EngineProfileName
+    sample_rate: int
+    buffer_ms: float
+    onset_ms: float
+    render_ms: float
+    period_ms: float
+    voices: int
+
+    @property
+    def effective_ms(self) -> float:
+        # Audio queued in the driver, attack of the preset and the time the synth needs to fill the next period
+        return self.buffer_ms + self.onset_ms + self.render_ms
+
+    @property
+    def headroom(self) -> float:
+        # Below 1 a period takes longer to render than to play and the driver underruns
+        return self.period_ms / self.render_ms if self.render_ms else float("inf")
+
+    def __str__(self) -> str:
+        return (
+            f"{self.profile.value}: effective {round(self.effective_ms, 2)} ms "
+            f"(buffer {round(self.buffer_ms, 2)} ms, onset {round(self.onset_ms, 2)} ms, "
+            f"render {round(self.render_ms, 3)} ms per period), headroom {round(self.headroom, 1)}x "
+            f"with {self.voices} voices"
+        )
+
+
+def measure_latency(
+    profile: EngineProfile,
+    sf_name: str = MidiAttr.DEFAULT_SF2,
+    sample_rate: int = MidiAttr.SAMPLE_RATE,
+    notes: int = 16,
+    periods: int = 200,
+    threshold: float = 1e-4,
+) -> LatencyReport:
+    # Fluidsynth does not report the latency of the audio driver, so the synth renders periods in-process with the
+    # settings of the profile and the driver buffer is added to what is measured
+    synth = Synth(samplerate=float(sample_rate), profile=profile)
+    try:
+        synth.program_select(0, synth.sfload(filename=sf_name), 0, 0)
+        block = np.zeros((profile.period_size, 2), dtype=np.float32)
+        onset_frames = 0
+        synth.noteon(0, 60, 100)
+        for _ in range(periods):
+            synth.write_float(block)
+            if len(audible := np.flatnonzero(np.abs(block).max(axis=1) > threshold)):
+                onset_frames += int(audible[0])
+                break
+            onset_frames += len(block)
+        for key in range(notes):
+            synth.noteon(0, 36 + key, 100)
+        voices = synth.active_voice_count()
+        start = perf_counter()
+        for _ in range(periods):
+            synth.write_float(block)
+        render_time = (perf_counter() - start) / periods
+    finally:
+        synth.delete()
+    report = LatencyReport(
+        profile=profile.name,
+        sample_rate=sample_rate,
+        buffer_ms=profile.buffer_latency_ms(sample_rate=sample_rate),
+        onset_ms=1000 * onset_frames / sample_rate,
+        render_ms=1000 * render_time,
+        period_ms=1000 * profile.period_size / sample_rate,
+        voices=voices,
+    )
+    logger.info(str(report))
+    return report
+
+
+def measure_latencies(
+    sf_name: str = MidiAttr.DEFAULT_SF2, names: Optional[List[EngineProfileName]] = None
+) -> List[LatencyReport]:
+    return [measure_latency(profile=ENGINE_PROFILES[name], sf_name=sf_name) for name in names or ENGINE_PROFILES]
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from math import log10
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.app.utils.logger import get_console_logger
+from src.app.utils.properties import MidiAttr
+
+logger = get_console_logger(name=__name__, log_level=logging.INFO)
+
+LOUDNESS_HOP_SEC = 0.1
+LOUDNESS_BLOCK_HOPS = 4
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+
+
+def to_db(value: float) -> float:
+    return 20 * log10(value) if value > 0 else float("-inf")
+
+
+def mean_square_to_lufs(mean_square: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore"):
+        return -0.691 + 10 * np.log10(mean_square)
+
+
+@dataclass(kw_only=True, slots=True)
+class Levels:
+    name: str
+    peak: float
+    rms: float
+    loudness: float
+    clipped: int
+
+    def __str__(self) -> str:
+        return (
+            f"{self.name}: peak {round(self.peak_db, 2)} dBFS, rms {round(self.rms_db, 2)} dBFS, "
+            f"loudness {round(self.loudness, 2)} LUFS, clipped {self.clipped}"
+        )
+
+    @property
+    def peak_db(self) -> float:
+        return to_db(self.peak)
+
+    @property
+    def rms_db(self) -> float:
+        return to_db(self.rms)
+
+
+@dataclass(kw_only=True, slots=True)
+class LevelReport:
+    master: Levels
+    tracks: Dict[str, Levels] = field(default_factory=dict)
+    gain: float = 1.0
+
+    def __str__(self) -> str:
+        lines = [str(self.master)] + [str(levels) for levels in self.tracks.values()]
+        if self.gain != 1.0:
+            lines.append(f"gain {round(to_db(self.gain), 2)} dB")
+        return "\n".join(lines)
+
+    @property
+    def clipped(self) -> List[str]:
+        return [levels.name for levels in [self.master, *self.tracks.values()] if levels.clipped]
+
+    def normalize(self, target: float, ceiling: float = MidiAttr.NORMALIZE_CEILING_DB) -> float:
+        # One gain for the whole export, towards the target loudness but never pushing the peak over the ceiling
+        if self.master.peak == 0 or self.master.loudness == float("-inf"):
+            return self.gain
+        self.gain = min(10 ** ((target - self.master.loudness) / 20), 10 ** (ceiling / 20) / self.master.peak)
+        return self.gain
+
+
+class LevelMeter:
+    def __init__(self, name: str, sample_rate: int):
+        self.name = name
+        self.hop = round(sample_rate * LOUDNESS_HOP_SEC)
+        self.peak = 0.0
+        self.clipped = 0
+        self.frames = 0
+        self.square_sum = 0.0
+        # Mean square summed over channels per 100 ms hop, the last hop is completed by the next block
+        self._hops: List[float] = []
+        self._hop_sum = 0.0
+        self._hop_frames = 0
+
+    def __repr__(self) -> str:
+        return f"LevelMeter(name={self.name}, frames={self.frames}, peak={self.peak})"
+
+    def update(self, block: np.ndarray):
+        # Block of shape (frames, channels), every statistic is computed over the whole block at once
+        if not len(block):
+            return
+        magnitude = np.abs(block)
+        self.peak = max(self.peak, float(magnitude.max()))
+        self.clipped += int(np.count_nonzero(magnitude >= 1.0))
+        power = np.square(block, dtype=np.float64).sum(axis=1)
+        self.square_sum += float(power.sum())
+        self.frames += len(block)
+        first = min(len(power), self.hop - self._hop_frames)
+        self._hop_sum += float(power[:first].sum())
+        self._hop_frames += first
+        if self._hop_frames == self.hop:
+            self._hops.append(self._hop_sum / self.hop)
+            self._hop_sum, self._hop_frames = 0.0, 0
+        rest = power[first:]
+        full = len(rest) // self.hop * self.hop
+        if full:
+            self._hops.extend(rest[:full].reshape(-1, self.hop).mean(axis=1).tolist())
+        self._hop_sum += float(rest[full:].sum())
+        self._hop_frames += len(rest) - full
+
+    @property
+    def rms(self) -> float:
+        # Over all channels, a full scale sine reads -3 dBFS
+        return (self.square_sum / self.frames / 2) ** 0.5 if self.frames else 0.0
+
+    @property
+    def loudness(self) -> float:
+        # Gated integrated loudness following ITU-R BS.1770 on 400 ms blocks overlapping by 75 %,
+        # an estimate as the K-weighting filter is left out
+        hops = np.array(self._hops)
+        if len(hops) >= LOUDNESS_BLOCK_HOPS:
+            blocks = np.convolve(hops, np.ones(LOUDNESS_BLOCK_HOPS) / LOUDNESS_BLOCK_HOPS, mode="valid")
+        elif self.frames:
+            blocks = np.array([self.square_sum / self.frames])
+        else:
+            return float("-inf")
+        blocks = blocks[mean_square_to_lufs(blocks) > ABSOLUTE_GATE_LUFS]
+        if not len(blocks):
+            return float("-inf")
+        relative_gate = mean_square_to_lufs(blocks.mean()) + RELATIVE_GATE_LU
+        blocks = blocks[mean_square_to_lufs(blocks) > relative_gate]
+        return float(mean_square_to_lufs(blocks.mean()))
+
+    def levels(self, name: Optional[str] = None) -> Levels:
+        return Levels(
+            name=name or self.name, peak=self.peak, rms=self.rms, loudness=self.loudness, clipped=self.clipped
+        )
+
+
+class RenderMeters:
+    def __init__(self, sample_rate: int, tracks: Dict[str, Tuple[int, ...]]):
+        # Tracks are metered on the sum of the audio groups their channels are rendered to, the master includes effects
+        self.tracks = {name: tuple(sorted(groups)) for name, groups in tracks.items()}
+        self.master = LevelMeter(name="master", sample_rate=sample_rate)
+        self.groups = {
+            groups: LevelMeter(name=f"groups {', '.join(map(str, groups))}", sample_rate=sample_rate)
+            for groups in self.tracks.values()
+        }
+        used = [group for groups in self.groups for group in groups]
+        if len(set(used)) < len(used) or len(self.groups) < len(self.tracks):
+            logger.warning(f"Tracks {tracks} share audio groups, their levels are metered together")
+
+    def update(self, master: np.ndarray, groups: np.ndarray):
+        # Master as (frames, 2) and the dry audio groups as planar (groups, 2, frames)
+        self.master.update(block=master)
+        for track_groups, meter in self.groups.items():
+            if len(track_groups) == 1:
+                meter.update(block=groups[track_groups[0]].T)
+            else:
+                meter.update(block=groups[list(track_groups)].sum(axis=0).T)
+
+    def report(self) -> LevelReport:
+        return LevelReport(
+            master=self.master.levels(),
+            tracks={name: self.groups[group].levels(name=name) for name, group in self.tracks.items()},
+        )
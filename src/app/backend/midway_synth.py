@@ -1,35 +1,43 @@
 from __future__ import annotations
 
-import gc
 import logging
 import weakref
 from queue import Queue
-from time import sleep
-from typing import List, Optional, Callable, TYPE_CHECKING, Any, Tuple
+from threading import Lock, RLock, Thread, current_thread
+from time import sleep, perf_counter
+from typing import Optional, Callable, TYPE_CHECKING, Any, Tuple, List, Set, Iterable
 from uuid import UUID
 
-from PySide6.QtCore import QThread, Signal, QObject
+from PySide6.QtCore import QThread, Signal, QObject, QTimer, QCoreApplication
 
 from src.app import AppAttr
-from src.app.backend.synth import Sequencer, Synth
+from src.app.backend.preset_index import PresetIndex
+from src.app.backend.preview import NotePreview
+from src.app.backend.profiles import DEFAULT_ENGINE_PROFILE, ENGINE_PROFILES
+from src.app.backend.recording import RecordingSynth
+from src.app.backend.scheduler import CallbackMetrics, LookaheadScheduler
+from src.app.backend.sound_fonts import SoundFontManager
+from src.app.backend.synth import Synth
+from src.app.backend.timeline import Timeline, TimelineCache
 from src.app.mingus.containers import Note
 from src.app.model.bar import Bar
 from src.app.model.composition import Composition
 
 from src.app.model.project_version import ProjectVersion
-from src.app.model.sequence import Sequence
 from src.app.model.track import Track, TrackVersion, Tracks
-from src.app.model.types import Channel, Bpm, TimedEvent, Preset
+from src.app.model.types import Channel, Bpm, Preset
 from src.app.model.variant import Variant
 from src.app.utils.logger import get_console_logger
 from src.app.utils.notification import notify
-from src.app.utils.properties import MidiAttr, PlayOptions, StatusMessage, NotificationMessage, StopMessage
-from src.app.utils.units import (
-    unit2tick,
-    bpm2time_scale,
-    beat2tick,
-    bar_length2sec,
+from src.app.utils.properties import (
+    EngineProfileName,
+    MidiAttr,
+    PlayOptions,
+    StatusMessage,
+    NotificationMessage,
+    TransportState,
 )
+from src.app.utils.units import bpm2time_scale, bar_length2sec
 
 if TYPE_CHECKING:
     from src.app.gui.main_frame import MainFrame
@@ -38,91 +46,209 @@ logger = get_console_logger(name=__name__, log_level=logging.INFO)
 
 
 class FontLoader(QThread):
-    def __init__(self, mf, synth: MidwaySynth):
+    # Emitted when the fonts of the open project are loaded, delivered in the thread owning the loader
+    fonts_ready = Signal()
+
+    def __init__(self, mf, synth: MidwaySynthBase):
         super().__init__(parent=None)
         self.mf = mf
         self.synth = synth
+        self.lock = Lock()
+        self.pending: List[str] = list(synth.sf_files)
+        self.priority: Set[str] = set()
+
+    def prioritize(self, sf_names: Iterable[str]):
+        with self.lock:
+            needed = [sf_name for sf_name in self.pending if sf_name in sf_names]
+            self.priority.update(needed)
+            self.pending = needed + [sf_name for sf_name in self.pending if sf_name not in sf_names]
+
+    def is_ready(self) -> bool:
+        with self.lock:
+            return not self.priority
+
+    def next_font(self) -> Optional[str]:
+        with self.lock:
+            return self.pending.pop(0) if self.pending else None
 
     def run(self):
-        self.synth.load_sound_fonts()
+        while (sf_name := self.next_font()) is not None:
+            if sf_name not in self.priority and not self.synth.sound_fonts.fits(sf_name=sf_name):
+                # Fonts over the memory budget are left to be loaded when used
+                continue
+            self.mf.show_message(f"{StatusMessage.SF_LOADING} {sf_name}")
+            self.synth.ensure_font(sf_name=sf_name)
+            with self.lock:
+                ready = sf_name in self.priority and len(self.priority) == 1
+                self.priority.discard(sf_name)
+            if ready:
+                self.fonts_ready.emit()
+        self.synth.preset_index.save()
+        logger.info(f"Loaded sound fonts {self.synth.preset_index}")
+        self.mf.show_message(message=StatusMessage.SF_LOADED)
+
+
+class PrefetchWorker(Thread):
+    def __init__(self, player: Player):
+        super().__init__(name="prefetch", daemon=True)
+        self.player = player
+        self.requests: Queue[Optional[Tuple[int, float]]] = Queue()
+
+    def submit(self, time: int):
+        self.requests.put((time, perf_counter()))
+
+    def wait(self):
+        self.requests.join()
+
+    def close(self):
+        self.requests.put(None)
+        if self.is_alive() and current_thread() is not self:
+            self.join()
 
+    def run(self):
+        while (request := self.requests.get()) is not None:
+            time, submitted = request
+            try:
+                self.player.metrics.handoff.record(1000 * (perf_counter() - submitted))
+                self.player.prefetch(now=time)
+            except Exception as e:
+                logger.error(f"Prefetch at {time} failed: {e}")
+            finally:
+                self.requests.task_done()
+        self.requests.task_done()
+
+
+class Transport(QObject):
+    # Emitted from the sequencer thread, delivered in the thread owning the transport
+    stopped = Signal()
+
+    def __init__(self, synth: MidwaySynthBase):
+        super().__init__(parent=None)
+        self.synth = synth
+        self.state = TransportState.IDLE
+        self.stop_requested: Optional[float] = None
+        self.stop_latency: Optional[float] = None
+        self.stopped.connect(self.on_stopped)
 
-class MidwaySynth(Synth):
-    q = Queue()
+    def set_state(self, state: TransportState):
+        logger.debug(f"transport {self.state} -> {state}")
+        self.state = state
 
-    class StopWorker(QObject):
-        finished = Signal()
+    def is_playing(self) -> bool:
+        return self.state in (TransportState.STARTING, TransportState.PLAYING)
 
-        def run(self):
-            while True:
-                item: StopMessage = MidwaySynth.q.get()
-                if item == StopMessage.QUIT:
-                    MidwaySynth.q.task_done()
-                    break
-                notify(message=NotificationMessage.STOP)
-                MidwaySynth.q.task_done()
-            self.finished.emit()
+    def on_stopped(self):
+        notify(message=NotificationMessage.STOP)
+        self.wait_for_silence()
 
-    def __init__(self, mf: Optional[MainFrame] = None, sf2_path: str = AppAttr.PATH_SF2):
-        Synth.__init__(self)
+    def wait_for_silence(self):
+        elapsed = 1000 * (perf_counter() - self.stop_requested)
+        polling = QCoreApplication.instance() is not None and elapsed < MidiAttr.SILENCE_TIMEOUT_MS
+        if polling and self.synth.active_voice_count():
+            QTimer.singleShot(MidiAttr.SILENCE_POLL_MS, self.wait_for_silence)
+            return
+        self.stop_latency = round(elapsed, 2)
+        logger.info(f"stop to silence {self.stop_latency} ms")
+
+
+class MidwaySynthBase:
+    # Backend independent part, combined with fluidsynth or the recording backend below
+    PREFETCH_IN_THREAD = True
+
+    def __init__(
+        self,
+        mf: Optional[MainFrame] = None,
+        sf2_path: str = AppAttr.PATH_SF2,
+        sf_memory_budget: int = MidiAttr.SF_MEMORY_BUDGET,
+        profile: EngineProfileName = DEFAULT_ENGINE_PROFILE,
+    ):
+        super().__init__(profile=ENGINE_PROFILES[profile])
         self.mf = mf
         self.sf2_path = sf2_path
         self.player: Optional[Player] = None
+        self.timelines = TimelineCache()
+        self.preset_index = PresetIndex()
+        self.transport = Transport(synth=self)
+        self.sf_files = self.get_sf_files(path=self.sf2_path)
+        self.sound_fonts = SoundFontManager(budget=sf_memory_budget)
+        self.font_lock = RLock()
+        self.started = perf_counter()
+        self.time_to_first_note: Optional[float] = None
+        self.font_loader: Optional[FontLoader] = None
+        self._preview: Optional[NotePreview] = None
+        # Playback is possible as soon as the fonts it needs are in, the rest is loaded on demand or in background
+        self.start(driver=MidiAttr.DRIVER)
         if mf:
-            self.thread = FontLoader(mf=mf, synth=self)
-            # self.thread.finished.connect(self.finished)
-            self.thread.start()
+            self.font_loader = FontLoader(mf=mf, synth=self)
+            self.font_loader.fonts_ready.connect(self.on_fonts_ready)
+            self.font_loader.start(QThread.LowPriority)
         else:
             self.load_sound_fonts()
-        self.stop_thread, self.stop_worker = self.run_stop_loop()
-
-    def run_stop_loop(self) -> Tuple[QThread, StopWorker]:
-        stop_thread = QThread()
-        stop_worker = MidwaySynth.StopWorker()
-        stop_worker.finished.connect(stop_thread.quit)
-        stop_worker.moveToThread(stop_thread)
-        stop_thread.started.connect(stop_worker.run)
-        stop_worker.finished.connect(stop_worker.deleteLater)
-        stop_thread.finished.connect(stop_thread.deleteLater)
-        stop_thread.start()
-        return stop_thread, stop_worker
-
-    def send_stop_message(self, message: StopMessage):
-        logger.debug(f"processing message {message}")
-        self.q.put(item=message)
-        logger.debug("waiting for queue")
-        self.q.join()
-        logger.debug("q done")
-
-    def send_stop_notification(self):
-        self.send_stop_message(message=StopMessage.STOP)
 
     def quit(self):
-        self.send_stop_message(message=StopMessage.QUIT)
+        self.stop()
+        if self.player:
+            self.player.dispose()
+            self.player = None
+        if self._preview:
+            self._preview.delete()
+            self._preview = None
+        self.timelines.close()
+        self.preset_index.save()
 
     def sfid(self, sf_name: str) -> int:
-        return self.sf_map[sf_name]
+        return self.ensure_font(sf_name=sf_name)
+
+    def ensure_font(self, sf_name: str) -> int:
+        with self.font_lock:
+            if sf_name in self.sf_map:
+                self.sound_fonts.touch(sf_name=sf_name)
+            else:
+                start = perf_counter()
+                self.load_sf(file_name=sf_name, index=self.preset_index)
+                self.sound_fonts.loaded(sf_name=sf_name, load_time=perf_counter() - start)
+                logger.info(f"Loaded {sf_name} in {round(1000 * (perf_counter() - start), 2)} ms")
+                self.unload_fonts(keep={sf_name})
+            return self.sf_map[sf_name]
+
+    def unload_fonts(self, keep: Iterable[str] = ()):
+        with self.font_lock:
+            for sf_name in self.sound_fonts.victims(keep=keep):
+                self.sfunload(sfid=self.sf_map[sf_name])
+                self.sound_fonts.unloaded(sf_name=sf_name)
+                logger.info(f"Unloaded least recently used {sf_name} {self.sound_fonts}")
+
+    def ensure_fonts(self, sf_names: Iterable[str]):
+        for sf_name in sf_names:
+            self.ensure_font(sf_name=sf_name)
+
+    def prioritize_fonts(self, sf_names: Iterable[str]):
+        self.sound_fonts.referenced = set(sf_names)
+        if self.font_loader:
+            self.font_loader.prioritize(sf_names=self.sound_fonts.referenced)
 
     def is_loaded(self) -> bool:
-        return self.thread.isFinished()
+        return self.font_loader is None or self.font_loader.is_ready()
+
+    def on_fonts_ready(self):
+        logger.info(f"Project sound fonts loaded after {round(1000 * (perf_counter() - self.started), 2)} ms")
+        self.mf.project_control.init_fonts()
+
+    def first_note(self):
+        if self.time_to_first_note is None:
+            self.time_to_first_note = round(1000 * (perf_counter() - self.started), 2)
+            logger.info(
+                f"Time to first note {self.time_to_first_note} ms, "
+                f"{len(self.sf_map)} of {len(self.sf_files)} sound fonts loaded"
+            )
 
     def is_playing(self) -> bool:
         return self.player and self.player.is_playing()
 
     def load_sound_fonts(self):
-        for file_name in self.get_sf_files(path=self.sf2_path):
-            if self.mf:
-                self.mf.show_message(f"{StatusMessage.SF_LOADING} {file_name}")
-            self.load_sf(file_name=file_name)
-        if self.mf:
-            self.mf.show_message(message=StatusMessage.SF_LOADED)
-            while not hasattr(self.mf, "project_control"):
-                sleep(0.01)
-            self.mf.project_control.init_fonts()
-        self.start(driver=MidiAttr.DRIVER)
-
-    def finished(self):
-        pass
+        self.ensure_fonts(sf_names=self.sf_files)
+        self.preset_index.save()
+        logger.info(f"Loaded sound fonts {self.preset_index}")
 
     def get_current_preset(self, channel: int) -> Preset:
         sfid, bank, patch = self.program_info(channel)
@@ -134,11 +260,15 @@ class MidwaySynth(Synth):
         self.program_select(chan=channel, sfid=sfid, bank=preset.bank, preset=preset.patch)
 
     def note_on(self, channel: int, pitch: int, velocity: int, preset: Optional[Preset] = None):
-        if preset and preset != self.get_current_preset(channel=channel):
-            self.preset_change(channel=channel, preset=preset)
-            logger.debug(f"Preset changed to {preset}")
+        # Programs are compared as (sfid, bank, patch), no preset is built or looked up by name per note
+        if preset:
+            program = self.sfid(sf_name=preset.sf_name), preset.bank, preset.patch
+            if program != self.program_info(channel):
+                self.program_select(channel, *program)
+                logger.debug(f"Preset changed to {preset}")
         logger.debug(f"Playing {str(Note().from_int(pitch))} on channel {channel} using preset {preset}")
         self.noteon(chan=channel, key=pitch, vel=velocity)
+        self.first_note()
 
     def wait_to_the_end(self):
         while self.is_playing():
@@ -147,20 +277,19 @@ class MidwaySynth(Synth):
     def stop(self):
         if self.player and self.player.is_playing():
             self.player.stop()
-            self.wait_to_the_end()
 
     def all_notes_off(self, chan: Optional[Channel] = None):
-        if self.mf is None:
-            channels = MidiAttr.CHANNELS
-        else:
-            channels = self.mf.project.get_reserved_channels()
-        if chan:
-            channels = [chan]
-        for channel in channels:
-            super().all_notes_off(chan=channel)
+        # Channel -1 turns off notes on all channels in one call
+        super().all_notes_off(chan=-1 if chan is None else chan)
+
+    @property
+    def preview(self) -> NotePreview:
+        if self._preview is None:
+            self._preview = NotePreview(synth=self)
+        return self._preview
 
-    @staticmethod
     def play_bar(
+        self,
         bar: Bar,
         bpm: Bpm,
         channel: Channel = 0,
@@ -168,16 +297,12 @@ class MidwaySynth(Synth):
         patch=MidiAttr.DEFAULT_PATCH,
         repeat: int = 1,
     ):
-        fs = Synth()
-        sfid = fs.sfload(MidiAttr.DEFAULT_SF2)
-        fs.program_select(chan=channel, sfid=sfid, bank=bank, preset=patch)
-        fs.start(driver=MidiAttr.DRIVER)
-        sequencer = Sequencer(synth=fs, time_scale=bpm2time_scale(bpm=bpm), use_system_timer=False)
-        sequencer.play_bar(synth=fs, bar=bar, bpm=bpm, repeat=repeat)
-        print(f"time {bar_length2sec(bar=bar, bpm=bpm) * repeat}")
+        # Played on the shared synth through the preview sequencer, returns once the bar is over
+        self.preset_change(channel=channel, preset=Preset(sf_name=MidiAttr.DEFAULT_SF2, bank=bank, patch=patch))
+        timeline = Timeline.from_bars(bars=[bar] * repeat)
+        self.ensure_fonts(sf_names={preset.sf_name for preset in timeline.presets})
+        self.preview.play_timeline(timeline=timeline, bpm=bpm)
         sleep(bar_length2sec(bar=bar, bpm=bpm) * repeat)
-        fs.system_reset()
-        del fs
 
     def play(
         self,
@@ -188,6 +313,8 @@ class MidwaySynth(Synth):
         options=PlayOptions(),
     ):
         self.stop()
+        if self.player:
+            self.player.dispose()
         self.player = Player(synth=self, project_version=project_version)
         self.player.play(
             start_variant_id=start_variant_id,
@@ -219,176 +346,192 @@ class MidwaySynth(Synth):
         self.play(project_version=project_version, start_variant_id=variant.id, options=options)
 
 
+class MidwaySynth(MidwaySynthBase, Synth):
+    pass
+
+
+class RecordingMidwaySynth(MidwaySynthBase, RecordingSynth):
+    # The virtual clock is advanced by the caller, so the callback work is done inline and stays deterministic
+    PREFETCH_IN_THREAD = False
+
+
 class EventProvider:
     def __init__(
         self,
-        synth: MidwaySynth,
-        project_version: ProjectVersion,
-        start_variant_id: UUID,
-        last_variant_id: UUID,
-        track: Track,
+        synth: MidwaySynthBase,
+        timeline: Timeline,
+        bpm: Bpm,
         callback: Callable,
         options: PlayOptions,
+        start_position: int = 0,
     ):
         self.synth = synth
-        self.project_version = project_version
-        self.bpm = options.bpm or project_version.bpm
-        self.variant_id = start_variant_id
-        self.last_variant_id = last_variant_id
-        self.track = track
-        self.bar_num = options.start_bar_num
+        self.timeline = timeline
+        self.bpm = bpm
         self.repeat = options.repeat
-        logger.debug(f"EventProvider variant id {self.variant_id}")
-        self.bar_length = self.sequence().bars[options.start_bar_num].length()
-        self.bar_duration = unit2tick(unit=self.bar_length, bpm=self.bpm)
-        self._sequencer = Sequencer(
-            synth=synth,
-            time_scale=bpm2time_scale(bpm=self.bpm),
-            use_system_timer=False,
-            callback=callback,
+        logger.debug(f"EventProvider {timeline}")
+        self._sequencer = synth.create_sequencer(
+            time_scale=bpm2time_scale(bpm=self.bpm), use_system_timer=False, callback=callback
         )
         self.sequencer = weakref.ref(self._sequencer)
-        self.tick = self.sequencer().get_tick()
-        self.stop_time = (
-            self.project_version.get_total_num_of_bars(variant_id=self.variant_id) * self.bar_duration + self.tick
-        )
-        self.skip_time = self.stop_time - int(self.bar_duration / 2)
-
-    def sequence(self) -> Sequence:
-        if self.variant_id is None:
-            return Sequence()
-        return self.project_version.get_compiled_sequence(
-            variant_id=self.variant_id,
-            single_track=self.track,
-            include_preset=True,
-        )
-
-    def events(self) -> List[TimedEvent]:
-        sequence = self.sequence()
-        if sequence.is_empty():
-            return []
-        return [
-            TimedEvent(
-                time=self.tick + beat2tick(beat=event.beat, bpm=self.bpm),
-                event=event,
-            )
-            for event in sequence.bars[self.bar_num].events()
-        ]
-
-    def has_next_variant(self):
-        return (
-            not self.project_version.is_last_variant(variant_id=self.variant_id, repeat=self.repeat)
-            and self.variant_id != self.last_variant_id
+        self.scheduler = LookaheadScheduler(
+            timeline=timeline,
+            start_tick=self.sequencer().get_tick(),
+            time_scale=bpm2time_scale(bpm=self.bpm),
+            options=options,
+            start_position=start_position,
         )
 
-    def move_to_next_bar(self):
-        if self.variant_id is None or self.bar_num + 1 not in self.sequence().bars.keys():
-            self.bar_num = 0
-        else:
-            self.bar_num += 1
-        logger.debug(f"next bar is {self.bar_num}")
-        if self.bar_num == 0:
-            self.variant_id = (
-                self.project_version.get_next_variant(self.variant_id, repeat=self.repeat).id
-                if self.has_next_variant()
-                else None
-            )
-        self.tick = self.tick + self.bar_duration
-
-    def next_callback_time(self) -> int:
-        return int(self.tick + (self.bar_duration - (self.bar_duration / 8)))
+    @property
+    def stop_time(self) -> int:
+        return self.scheduler.stop_time
 
 
 class Player:
-    def __init__(self, synth: MidwaySynth, project_version: ProjectVersion):
+    def __init__(self, synth: MidwaySynthBase, project_version: ProjectVersion):
         self.synth = synth
         self.project_version = project_version
         self._event_provider: Optional[EventProvider] = None
         self.event_provider = None
-        self.callbacks = set()
+        self.last_callback: Optional[int] = None
+        self.metrics: Optional[CallbackMetrics] = None
+        self.worker: Optional[PrefetchWorker] = None
+        # Held across transport changes in stop and across refills, so no events are queued after a stop.
+        # Reentrant as the prefetch worker stops playback at the end while refilling
+        self.lock = RLock()
 
     def is_playing(self) -> bool:
-        return self.event_provider() is not None
+        return self.synth.transport.is_playing()
 
     def play(self, start_variant_id: UUID, last_variant_id: UUID, track: Track, options: PlayOptions):
+        self.synth.transport.set_state(state=TransportState.STARTING)
+        try:
+            with self.lock:
+                self.start(
+                    start_variant_id=start_variant_id, last_variant_id=last_variant_id, track=track, options=options
+                )
+        except BaseException:
+            # A failed start leaves nothing playing, so the player can be started or disposed again
+            self.synth.transport.set_state(state=TransportState.IDLE)
+            self.dispose()
+            raise
+        self.synth.transport.set_state(state=TransportState.PLAYING)
+        self.synth.first_note()
+
+    def start(self, start_variant_id: UUID, last_variant_id: UUID, track: Track, options: PlayOptions):
         self.synth.system_reset()
-        self.callbacks = set()
-        self._event_provider = EventProvider(
-            synth=self.synth,
+        self.last_callback = None
+        bpm = options.bpm or self.project_version.bpm
+        start_variant_id, start_position = self.seek(
+            start_variant_id=start_variant_id, last_variant_id=last_variant_id, options=options
+        )
+        timeline = self.synth.timelines.get(
             project_version=self.project_version,
             start_variant_id=start_variant_id,
             last_variant_id=last_variant_id,
             track=track,
+        )
+        self.synth.sound_fonts.playing = {preset.sf_name for preset in timeline.presets}
+        self.synth.ensure_fonts(sf_names=self.synth.sound_fonts.playing)
+        self._event_provider = EventProvider(
+            synth=self.synth,
+            timeline=timeline,
+            bpm=bpm,
             callback=self.seq_callback,
             options=options,
+            start_position=start_position,
         )
         self.event_provider = weakref.ref(self._event_provider)
+        self.metrics = CallbackMetrics(time_scale=bpm2time_scale(bpm=bpm))
+        if self.synth.PREFETCH_IN_THREAD:
+            self.worker = PrefetchWorker(player=self)
+            self.worker.start()
         self.schedule_stop_callback()
-        self.schedule_next_bar()
+        self.schedule_window(now=self.event_provider().sequencer().get_tick(), record=False)
+
+    def seek(self, start_variant_id: UUID, last_variant_id: Optional[UUID], options: PlayOptions) -> Tuple[UUID, int]:
+        # Start position is relative to the start variant and may point into any following variant up to the last one
+        index = self.synth.timelines.index(project_version=self.project_version, variant_id=start_variant_id)
+        if options.start_tick is not None:
+            variant_id, position = index.seek_tick(
+                tick=options.start_tick, variant_id=start_variant_id, last_variant_id=last_variant_id
+            )
+        else:
+            variant_id, position = index.seek_bar(
+                bar_num=options.start_bar_num, variant_id=start_variant_id, last_variant_id=last_variant_id
+            )
+        if options.repeat and last_variant_id is None:
+            # A repeat loops back to the first variant of the composition, so the timeline starts there
+            # and playback starts at the seek position within it
+            return index.variant_ids[0], index.tick_offsets[index.variant_index(variant_id=variant_id)] + position
+        return variant_id, position
 
     def stop(self):
-        logger.debug("In stop")
-        self.synth.all_notes_off()
-        logger.debug("all notes off")
-        if self.event_provider() and self.event_provider().sequencer():
-            self.event_provider()._sequencer = None
-        if self.event_provider():
-            self._event_provider = None
-        logger.debug("before qc")
-        gc.collect()
-        logger.debug("after qc")
-        if self.event_provider() is None:
-            logger.debug("stopped and disposed")
-        else:
-            logger.debug("event provider still assigned")
-        self.synth.send_stop_notification()
+        with self.lock:
+            if not self.is_playing():
+                return
+            self.synth.transport.stop_requested = perf_counter()
+            self.synth.transport.set_state(state=TransportState.STOPPING)
+            if self.event_provider is not None and self.event_provider():
+                self.event_provider().sequencer().remove_events()
+            self.synth.all_notes_off()
+            self.synth.transport.set_state(state=TransportState.IDLE)
+            self.synth.transport.stopped.emit()
+        logger.info(f"Playback stopped {self.metrics}")
+
+    def dispose(self):
+        # Stop may run on the prefetch worker, so the worker and the sequencer are closed later from the owning thread
+        if self.worker:
+            self.worker.close()
+            self.worker = None
+        if self.event_provider is not None and self.event_provider():
+            self.event_provider().sequencer().delete()
+        self._event_provider = None
 
     def seq_callback(self, time, event, seq, data):
-        def should_stop() -> bool:
-            return time >= self.event_provider().stop_time and not self.event_provider().repeat
-
-        def skip_next_bar() -> bool:
-            return time >= self.event_provider().skip_time and not self.event_provider().repeat
-
-        if time not in self.callbacks:
-            self.callbacks.add(time)
-            logger.debug(
-                f"callback active {time} {event} {seq} {data} "
-                f"current tick {self.event_provider().tick} "
-                f"bar duration {self.event_provider().bar_duration} "
-                f"stop time {self.event_provider().stop_time} "
-                f"skip time {self.event_provider().skip_time}"
-            )
-
-            if should_stop():
-                logger.debug("stop detected. Stopping...")
-                self.stop()
-            elif not skip_next_bar():
-                self.event_provider().move_to_next_bar()
-                self.schedule_next_bar()
+        # Runs in the fluidsynth timer thread, so it only hands the time over and measures itself
+        start = perf_counter()
+        if self.worker:
+            self.worker.submit(time=time)
         else:
-            logger.debug(f"time {time} in callbacks {self.callbacks}")
+            self.prefetch(now=time)
+        self.metrics.record(duration=perf_counter() - start, late=0 if data is None else time - data)
+
+    def prefetch(self, now: int):
+        with self.lock:
+            # Checked under the lock, so a stop on another thread either comes first or waits for the refill
+            # Sequencer time only moves forward, so a callback not later than the last handled one is a duplicate
+            if not self.is_playing() or (self.last_callback is not None and now <= self.last_callback):
+                return
+            self.last_callback = now
+            if now >= self.event_provider().stop_time and not self.event_provider().repeat:
+                logger.debug(
+                    f"stop detected. Stopping... {self.event_provider().scheduler.metrics} "
+                    f"{self.event_provider().scheduler.programs}"
+                )
+                self.stop()
+            else:
+                self.schedule_window(now=now)
 
     def schedule_callback(self, time):
         if not self.event_provider().sequencer().client_id:
             raise ValueError("Client callback not registered")
-        self.event_provider().sequencer().timer(time=time, dest=self.event_provider().sequencer().client_id)
-
-    def schedule_next_callback(self):
-        self.schedule_callback(time=self.event_provider().next_callback_time())
+        # The timer carries its own time, so the callback can tell how late it runs
+        self.event_provider().sequencer().timer(time=time, data=time, dest=self.event_provider().sequencer().client_id)
 
     def schedule_stop_callback(self):
         logger.debug(f"stop time {self.event_provider().stop_time}")
         self.schedule_callback(time=self.event_provider().stop_time)
 
-    def schedule_next_bar(self):
-        # e = [(event.event.bar_num, event.event.beat, event.event.pitch) for event in self.event_provider().events()]
-        # logger.info(f"schedule_next_bar bar {self.event_provider().bar_num} events {e}")
-        for timed_event in self.event_provider().events():
-            self.event_provider().sequencer().send_event(
-                time=timed_event.time,
-                event=timed_event.event,
-                bpm=self.event_provider().bpm,
-                synth_seq_id=self.event_provider().sequencer().synth_seq_id,
+    def schedule_window(self, now: int, record: bool = True):
+        scheduler = self.event_provider().scheduler
+        for events, offset in scheduler.refill(now=now, record=record):
+            self.event_provider().sequencer().send_events(
+                events=events,
+                presets=self.event_provider().timeline.presets,
+                offset=offset,
+                dest=self.event_provider().sequencer().synth_seq_id,
+                programs=scheduler.programs,
             )
-        self.schedule_next_callback()
+        if not scheduler.is_finished():
+            self.schedule_callback(time=now + scheduler.period)
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple, Callable
+
+from src.app.utils.logger import get_console_logger
+from src.app.utils.properties import AppAttr
+
+logger = get_console_logger(name=__name__, log_level=logging.INFO)
+
+PresetEntry = Tuple[int, int, str]
+
+
+class PresetIndex:
+    VERSION = 1
+
+    def __init__(self, file_name: str = AppAttr.PATH_PRESET_INDEX):
+        self.file_name = Path(file_name)
+        self.hits = 0
+        self.misses = 0
+        self.time_saved = 0.0
+        self.dirty = False
+        self._entries: Dict[str, Dict] = {}
+        if self.file_name.exists():
+            try:
+                data = json.loads(self.file_name.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable preset index {self.file_name}: {e}")
+            else:
+                if data.get("version") == PresetIndex.VERSION:
+                    self._entries = data.get("fonts", {})
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return (
+            f"PresetIndex(fonts={len(self)}, hits={self.hits}, misses={self.misses}, "
+            f"time_saved_ms={round(1000 * self.time_saved, 2)})"
+        )
+
+    @staticmethod
+    def signature(sf_name: str) -> Tuple[int, int]:
+        stat = os.stat(sf_name)
+        return stat.st_size, stat.st_mtime_ns
+
+    def get(self, sf_name: str) -> Optional[List[PresetEntry]]:
+        entry = self._entries.get(os.path.abspath(sf_name))
+        if entry is None or (entry["size"], entry["mtime_ns"]) != self.signature(sf_name=sf_name):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [(bank, patch, name) for bank, patch, name in entry["presets"]]
+
+    def put(self, sf_name: str, presets: List[PresetEntry], elapsed: float):
+        size, mtime_ns = self.signature(sf_name=sf_name)
+        self._entries[os.path.abspath(sf_name)] = {
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "elapsed": elapsed,
+            "presets": [list(preset) for preset in presets],
+        }
+        self.dirty = True
+
+    def presets(self, sf_name: str, enumerate_presets: Callable[[], List[PresetEntry]]) -> List[PresetEntry]:
+        start = perf_counter()
+        if (presets := self.get(sf_name=sf_name)) is not None:
+            # Saving is measured against the enumeration time recorded when the font was indexed
+            saved = self._entries[os.path.abspath(sf_name)]["elapsed"] - (perf_counter() - start)
+            self.time_saved += saved
+            logger.info(f"Presets of {sf_name} read from index, saved {round(1000 * saved, 2)} ms")
+            return presets
+        presets = enumerate_presets()
+        self.put(sf_name=sf_name, presets=presets, elapsed=perf_counter() - start)
+        return presets
+
+    def save(self):
+        if not self.dirty:
+            return
+        data = {"version": PresetIndex.VERSION, "fonts": self._entries}
+        # Written aside and renamed so that an interrupted save never leaves a truncated index
+        tmp_file_name = self.file_name.with_suffix(".tmp")
+        tmp_file_name.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_file_name, self.file_name)
+        self.dirty = False
+        logger.debug(f"Saved {self}")
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import logging
+from collections import OrderedDict
+from itertools import count
+from threading import Lock
+from typing import Dict, Optional, TYPE_CHECKING
+
+import numpy as np
+
+from src.app.backend.timeline import Timeline
+from src.app.model.types import Bpm, Channel, Pitch, Preset
+from src.app.utils.logger import get_console_logger
+from src.app.utils.properties import MidiAttr
+from src.app.utils.units import bpm2time_scale
+
+if TYPE_CHECKING:
+    from src.app.backend.midway_synth import MidwaySynthBase
+
+logger = get_console_logger(name=__name__, log_level=logging.INFO)
+
+
+class NotePreview:
+    TIME_SCALE = 1000
+
+    def __init__(self, synth: MidwaySynthBase, voices: int = MidiAttr.PREVIEW_VOICES):
+        self.synth = synth
+        self.voices = voices
+        self.stolen = 0
+        self.lock = Lock()
+        self._ids = count(start=1)
+        # Sounding notes per channel, oldest first, the voice id tells a pending note-off of a retriggered key apart
+        self._sounding: Dict[Channel, OrderedDict[Pitch, int]] = {}
+        # Driven by the synth like the playback sequencer, note-offs are timed in milliseconds without any thread
+        self.sequencer = synth.create_sequencer(
+            time_scale=NotePreview.TIME_SCALE, use_system_timer=False, callback=self.on_timer
+        )
+
+    def __repr__(self) -> str:
+        return f"NotePreview(sounding={self.sounding()}, voices={self.voices}, stolen={self.stolen})"
+
+    def sounding(self) -> int:
+        with self.lock:
+            return sum(len(pitches) for pitches in self._sounding.values())
+
+    def note_on(
+        self,
+        channel: Channel,
+        pitch: Pitch,
+        velocity: int = MidiAttr.DEFAULT_VELOCITY,
+        preset: Optional[Preset] = None,
+        secs: Optional[float] = None,
+    ):
+        with self.lock:
+            sounding = self._sounding.setdefault(channel, OrderedDict())
+            if sounding.pop(pitch, None) is not None:
+                self.synth.noteoff(chan=channel, key=pitch)
+            while len(sounding) >= self.voices:
+                stolen, _ = sounding.popitem(last=False)
+                self.synth.noteoff(chan=channel, key=stolen)
+                self.stolen += 1
+            voice = sounding[pitch] = next(self._ids)
+        self.synth.note_on(channel=channel, pitch=pitch, velocity=velocity, preset=preset)
+        if secs is not None:
+            self.sequencer.timer(
+                time=round(secs * NotePreview.TIME_SCALE), data=voice, dest=self.sequencer.client_id, absolute=False
+            )
+
+    def note_off(self, channel: Channel, pitch: Pitch, voice: Optional[int] = None):
+        with self.lock:
+            sounding = self._sounding.get(channel, {})
+            if pitch not in sounding or voice not in (None, sounding[pitch]):
+                return
+            del sounding[pitch]
+            self.synth.noteoff(chan=channel, key=pitch)
+
+    def on_timer(self, time, event, seq, data):
+        with self.lock:
+            for channel, sounding in self._sounding.items():
+                for pitch, voice in sounding.items():
+                    if voice == data:
+                        del sounding[pitch]
+                        self.synth.noteoff(chan=channel, key=pitch)
+                        return
+
+    def play_timeline(self, timeline: Timeline, bpm: Bpm):
+        # Timeline ticks are rescaled to the millisecond clock of the preview sequencer
+        events = timeline.events.copy()
+        scale = NotePreview.TIME_SCALE / bpm2time_scale(bpm=bpm)
+        events["tick"] = np.rint(events["tick"] * scale)
+        events["duration"] = np.maximum(np.rint(events["duration"] * scale), 1)
+        self.sequencer.send_events(
+            events=events,
+            presets=timeline.presets,
+            offset=self.sequencer.get_tick(),
+            dest=self.sequencer.synth_seq_id,
+        )
+
+    def stop(self):
+        self.sequencer.remove_events()
+        with self.lock:
+            for channel, sounding in self._sounding.items():
+                for pitch in sounding:
+                    self.synth.noteoff(chan=channel, key=pitch)
+            self._sounding.clear()
+
+    def delete(self):
+        self.stop()
+        self.sequencer.delete()
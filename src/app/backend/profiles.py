@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Dict
+
+from src.app.utils.properties import EngineProfileName
+
+
+class Interpolation(IntEnum):
+    NONE = 0
+    LINEAR = 1
+    FOURTH_ORDER = 4
+    SEVENTH_ORDER = 7
+
+
+@dataclass(frozen=True, kw_only=True, slots=True)
+class EngineProfile:
+    name: EngineProfileName
+    period_size: int
+    periods: int
+    polyphony: int
+    interpolation: Interpolation
+    cpu_cores: int = 1
+    reverb: bool = True
+    chorus: bool = True
+
+    @property
+    def buffer_frames(self) -> int:
+        return self.period_size * self.periods
+
+    def buffer_latency_ms(self, sample_rate: int) -> float:
+        return 1000 * self.buffer_frames / sample_rate
+
+    def settings(self) -> Dict[str, Any]:
+        return {
+            "audio.period-size": self.period_size,
+            "audio.periods": self.periods,
+            "synth.polyphony": self.polyphony,
+            "synth.cpu-cores": self.cpu_cores,
+            "synth.reverb.active": self.reverb,
+            "synth.chorus.active": self.chorus,
+        }
+
+
+ENGINE_PROFILES: Dict[EngineProfileName, EngineProfile] = {
+    # Smallest buffers fluidsynth accepts, voices and interpolation kept cheap so that short periods do not underrun
+    EngineProfileName.LOW_LATENCY: EngineProfile(
+        name=EngineProfileName.LOW_LATENCY,
+        period_size=64,
+        periods=2,
+        polyphony=64,
+        interpolation=Interpolation.LINEAR,
+        chorus=False,
+    ),
+    EngineProfileName.BALANCED: EngineProfile(
+        name=EngineProfileName.BALANCED,
+        period_size=256,
+        periods=2,
+        polyphony=256,
+        interpolation=Interpolation.FOURTH_ORDER,
+    ),
+    EngineProfileName.HIGH_POLYPHONY: EngineProfile(
+        name=EngineProfileName.HIGH_POLYPHONY,
+        period_size=1024,
+        periods=4,
+        polyphony=1024,
+        interpolation=Interpolation.SEVENTH_ORDER,
+        cpu_cores=os.cpu_count() or 1,
+    ),
+    # No audio driver, buffers only set the rendering granularity
+    EngineProfileName.OFFLINE: EngineProfile(
+        name=EngineProfileName.OFFLINE,
+        period_size=4096,
+        periods=2,
+        polyphony=4096,
+        interpolation=Interpolation.SEVENTH_ORDER,
+        cpu_cores=os.cpu_count() or 1,
+    ),
+}
+
+DEFAULT_ENGINE_PROFILE = EngineProfileName.BALANCED
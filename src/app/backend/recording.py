@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import heapq
+import logging
+from itertools import count
+from time import perf_counter
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from src.app.backend.engine import SequencerBackend, SequencerCallback, SynthBackend
+from src.app.backend.preset_index import PresetEntry, PresetIndex
+from src.app.backend.profiles import EngineProfile
+from src.app.backend.scheduler import ChannelPrograms, Program, decode_events
+from src.app.backend.timeline import EventCode
+from src.app.model.types import Preset
+from src.app.utils.logger import get_console_logger
+
+logger = get_console_logger(name=__name__, log_level=logging.INFO)
+
+
+class ScheduledEvent(NamedTuple):
+    time: int
+    code: EventCode
+    channel: int
+    # (pitch, velocity, duration), (sfid, bank, patch), (control, value) or (value,) by code
+    data: Tuple[int, ...]
+    dest: int
+
+
+class QueueItem(NamedTuple):
+    time: int
+    order: int
+    event: Optional[ScheduledEvent]
+    data: Any
+    dest: int
+
+
+class RecordingSequencer(SequencerBackend):
+    def __init__(
+        self,
+        synth: RecordingSynth,
+        time_scale: int,
+        use_system_timer: bool = False,
+        callback: Optional[SequencerCallback] = None,
+    ):
+        # The clock is virtual and only moves with process, use_system_timer is accepted for compatibility
+        self.synth = synth
+        self.time_scale = time_scale
+        self.now = 0
+        self.callback = callback
+        self.client_id = 1 if callback else None
+        self.synth_seq_id = 0
+        self.scheduled: List[ScheduledEvent] = []
+        self.played: List[ScheduledEvent] = []
+        self.timers: List[int] = []
+        self.callback_durations: List[float] = []
+        self.removed = 0
+        self._queue: List[QueueItem] = []
+        self._order = count()
+
+    def __repr__(self) -> str:
+        return (
+            f"RecordingSequencer(now={self.now}, scheduled={len(self.scheduled)}, played={len(self.played)}, "
+            f"pending={len(self._queue)}, timers={len(self.timers)}, removed={self.removed})"
+        )
+
+    def get_tick(self) -> int:
+        return self.now
+
+    def _schedule(self, event: ScheduledEvent):
+        self.scheduled.append(event)
+        heapq.heappush(self._queue, QueueItem(event.time, next(self._order), event, None, event.dest))
+
+    def send_events(
+        self,
+        events: np.ndarray,
+        presets: List[Preset],
+        offset: int,
+        dest=-1,
+        programs: Optional[ChannelPrograms] = None,
+    ):
+        if programs is None:
+            programs = ChannelPrograms()
+        program_list = [self.synth.sf_registry.program(preset=preset) for preset in presets]
+        for time, code, channel, data in decode_events(
+            events=events, program_list=program_list, offset=offset, programs=programs
+        ):
+            self._schedule(ScheduledEvent(time, code, channel, data, dest))
+
+    def timer(self, time, data=None, source=-1, dest=-1, absolute=True):
+        time = time if absolute else self.now + time
+        self.timers.append(time)
+        heapq.heappush(self._queue, QueueItem(time, next(self._order), None, data, dest))
+
+    def remove_events(self, source=-1, dest=-1, type=-1):
+        kept = [item for item in self._queue if dest not in (-1, item.dest)]
+        self.removed += len(self._queue) - len(kept)
+        self._queue = kept
+        heapq.heapify(self._queue)
+
+    def process(self, msec):
+        # Like fluid_sequencer_process, msec is the absolute sequencer time to advance to
+        self.advance(tick=round(msec * self.time_scale / 1000))
+
+    def advance(self, tick: int):
+        while self._queue and self._queue[0].time <= tick:
+            item = heapq.heappop(self._queue)
+            self.now = max(self.now, item.time)
+            if item.event is not None:
+                self.played.append(item.event)
+                self.synth.handle(event=item.event)
+            elif self.callback:
+                start = perf_counter()
+                self.callback(item.time, None, None, item.data)
+                self.callback_durations.append(perf_counter() - start)
+        self.now = max(self.now, tick)
+
+    def pending(self) -> int:
+        return len(self._queue)
+
+    def delete(self):
+        self._queue.clear()
+        self.callback = None
+        self.client_id = None
+
+
+class RecordingSynth(SynthBackend):
+    def __init__(self, *args, **kwargs):
+        # Same signature as Synth, settings are ignored as nothing is rendered
+        super().__init__()
+        self.profile: Optional[EngineProfile] = kwargs.get("profile")
+        self.calls: List[Tuple] = []
+        self.played: List[ScheduledEvent] = []
+        self.programs: Dict[int, Program] = {}
+        self._sfids = count(start=1)
+
+    def __repr__(self) -> str:
+        return f"RecordingSynth(calls={len(self.calls)}, played={len(self.played)}, fonts={len(self.sf_registry)})"
+
+    def handle(self, event: ScheduledEvent):
+        self.played.append(event)
+        if event.code == EventCode.PROGRAM:
+            self.programs[event.channel] = event.data
+
+    def create_sequencer(
+        self, time_scale: int, use_system_timer: bool = False, callback: Optional[SequencerCallback] = None
+    ) -> RecordingSequencer:
+        return RecordingSequencer(
+            synth=self, time_scale=time_scale, use_system_timer=use_system_timer, callback=callback
+        )
+
+    def start(self, driver=None, device=None, midi_driver=None, cmd_handler=False):
+        self.calls.append(("start", driver))
+
+    def delete(self):
+        self.calls.append(("delete",))
+
+    def sfload(self, filename, update_midi_preset=0) -> int:
+        sfid = next(self._sfids)
+        self.sf_registry.add(sf_name=filename, sfid=sfid)
+        self.calls.append(("sfload", filename, sfid))
+        return sfid
+
+    def sfunload(self, sfid, update_midi_preset=0):
+        self.sf_registry.remove(sfid=sfid)
+        self.calls.append(("sfunload", sfid))
+
+    def load_sf(self, file_name: str, index: Optional[PresetIndex] = None):
+        # Nothing is enumerated, so the preset index is neither read nor updated
+        self.sfload(filename=file_name)
+
+    def sfpresets(self, sfid: int) -> List[PresetEntry]:
+        # Sound font files are not parsed, presets are known only when selected
+        return []
+
+    def program_select(self, chan, sfid, bank, preset):
+        self.programs[chan] = sfid, bank, preset
+        self.calls.append(("program_select", chan, sfid, bank, preset))
+
+    def program_info(self, chan) -> Tuple[int, int, int]:
+        return self.programs.get(chan, (-1, -1, -1))
+
+    def noteon(self, chan, key, vel):
+        self.calls.append(("noteon", chan, key, vel))
+
+    def noteoff(self, chan, key):
+        self.calls.append(("noteoff", chan, key))
+
+    def system_reset(self):
+        self.programs.clear()
+        self.calls.append(("system_reset",))
+
+    def all_notes_off(self, chan):
+        self.calls.append(("all_notes_off", chan))
+
+    def active_voice_count(self) -> int:
+        return 0
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import logging
+import os
+import wave
+from ctypes import c_void_p
+from dataclasses import dataclass
+from math import ceil
+from threading import Event
+from time import perf_counter
+from typing import Optional, Callable, Iterator, Tuple
+from uuid import UUID
+
+import numpy as np
+
+from src.app.backend.meters import LevelReport, RenderMeters
+from src.app.backend.profiles import ENGINE_PROFILES
+from src.app.backend.scheduler import LookaheadScheduler
+from src.app.backend.synth import Sequencer, Synth
+from src.app.backend.timeline import Timeline
+from src.app.model.project_version import ProjectVersion
+from src.app.model.track import Track
+from src.app.model.types import Bpm
+from src.app.utils.exceptions import RenderCancelled
+from src.app.utils.logger import get_console_logger
+from src.app.utils.properties import EngineProfileName, MidiAttr, PlayOptions
+from src.app.utils.units import bpm2time_scale
+
+logger = get_console_logger(name=__name__, log_level=logging.INFO)
+
+
+@dataclass(kw_only=True, slots=True)
+class RenderResult:
+    frames: int
+    sample_rate: int
+    elapsed: float
+    audio: Optional[np.ndarray] = None
+    file_name: Optional[str] = None
+    levels: Optional[LevelReport] = None
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate
+
+    @property
+    def realtime_factor(self) -> float:
+        return self.duration / self.elapsed if self.elapsed else float("inf")
+
+
+@dataclass(kw_only=True, slots=True)
+class RenderProgress:
+    frames: int
+    total_frames: int
+    bars: int
+    total_bars: int
+    sample_rate: int
+    elapsed: float
+
+    @property
+    def realtime_factor(self) -> float:
+        return self.frames / self.sample_rate / self.elapsed if self.elapsed else float("inf")
+
+    @property
+    def eta(self) -> float:
+        return (self.total_frames - self.frames) * self.elapsed / self.frames if self.frames else float("inf")
+
+
+class AudioWriter:
+    def __init__(self, file_name: str, sample_rate: int, channels: int = 2, gain: float = 1.0):
+        self.file_name = file_name
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.gain = gain
+        self.extension = os.path.splitext(file_name)[1].lower()
+        self._file = None
+
+    def __enter__(self) -> AudioWriter:
+        match self.extension:
+            case ".wav":
+                self._file = wave.open(self.file_name, "wb")
+                self._file.setnchannels(self.channels)
+                self._file.setsampwidth(np.dtype(np.int16).itemsize)
+                self._file.setframerate(self.sample_rate)
+            case ".flac":
+                try:
+                    import soundfile  # pylint: disable=import-outside-toplevel
+                except ImportError as e:
+                    raise ValueError("Export to FLAC requires soundfile package") from e
+                self._file = soundfile.SoundFile(
+                    self.file_name, mode="w", samplerate=self.sample_rate, channels=self.channels, format="FLAC"
+                )
+            case extension:
+                raise ValueError(f"Audio format {extension} not supported")
+        return self
+
+    def write(self, audio: np.ndarray):
+        if self.gain != 1.0:
+            audio = audio * np.float32(self.gain)
+        if self.extension == ".wav":
+            self._file.writeframes((np.clip(audio, -1.0, 1.0) * np.iinfo(np.int16).max).astype("<i2").tobytes())
+        else:
+            self._file.write(audio)
+
+    def __exit__(self, *args):
+        self._file.close()
+
+
+def write_audio(file_name: str, audio: np.ndarray, sample_rate: int, gain: float = 1.0):
+    with AudioWriter(file_name=file_name, sample_rate=sample_rate, channels=audio.shape[1], gain=gain) as writer:
+        writer.write(audio=audio)
+
+
+class OfflineRenderer:
+    def __init__(
+        self,
+        sample_rate: int = MidiAttr.SAMPLE_RATE,
+        block_frames: int = MidiAttr.RENDER_BLOCK_FRAMES,
+        tail: float = MidiAttr.RENDER_TAIL_SEC,
+        audio_groups: int = MidiAttr.RENDER_AUDIO_GROUPS,
+    ):
+        self.sample_rate = sample_rate
+        self.block_frames = block_frames
+        self.tail = tail
+        self.audio_groups = audio_groups
+        # No audio driver is started, samples are pulled only as fast as they are rendered.
+        # Midi channel c is rendered dry to audio group c % audio_groups, effects to one shared stereo pair
+        self.synth = Synth(
+            samplerate=float(sample_rate),
+            profile=ENGINE_PROFILES[EngineProfileName.OFFLINE],
+            **{"synth.audio-channels": audio_groups, "synth.audio-groups": audio_groups, "synth.effects-groups": 1},
+        )
+        self.groups = np.zeros((audio_groups, 2, block_frames), dtype=np.float32)
+        self.effects = np.zeros((2, block_frames), dtype=np.float32)
+        self.master = np.zeros((2, block_frames), dtype=np.float32)
+        self._out = (c_void_p * (2 * audio_groups))(
+            *(self.groups[group, side].ctypes.data for group in range(audio_groups) for side in range(2))
+        )
+        # Reverb and chorus left and right channels all mixed into the effects pair
+        self._fx = (c_void_p * 4)(*[self.effects[0].ctypes.data, self.effects[1].ctypes.data] * 2)
+
+    def group(self, channel: int) -> int:
+        return channel % self.audio_groups
+
+    def render_block(self, out: np.ndarray) -> np.ndarray:
+        # Renders len(out) frames of all audio groups and mixes them with the effects into out of shape (frames, 2)
+        frames = len(out)
+        self.groups.fill(0)
+        self.effects.fill(0)
+        self.synth.process_into(frames, self._fx, len(self._fx), self._out, len(self._out))
+        master = self.master[:, :frames]
+        np.sum(self.groups[:, :, :frames], axis=0, out=master)
+        master += self.effects[:, :frames]
+        out[...] = master.T
+        return self.groups[:, :, :frames]
+
+    def load_sound_fonts(self, timeline: Timeline):
+        for sf_name in {preset.sf_name for preset in timeline.presets} - self.synth.sf_map.keys():
+            self.synth.sfload(filename=sf_name)
+
+    def num_of_frames(self, timeline: Timeline, bpm: Bpm) -> int:
+        return round((timeline.length / bpm2time_scale(bpm=bpm) + self.tail) * self.sample_rate)
+
+    def blocks(
+        self, timeline: Timeline, bpm: Bpm, audio: Optional[np.ndarray] = None, meters: Optional[RenderMeters] = None
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        # Renders into views of audio when given, otherwise into one reused block so memory does not grow
+        self.load_sound_fonts(timeline=timeline)
+        self.synth.system_reset()
+        time_scale = bpm2time_scale(bpm=bpm)
+        sequencer = Sequencer(synth=self.synth, time_scale=time_scale, use_system_timer=False)
+        block = np.empty((self.block_frames, 2), dtype=np.float32)
+        try:
+            # Events are queued a couple of blocks ahead of the synth clock, like in live playback
+            scheduler = LookaheadScheduler(
+                timeline=timeline,
+                start_tick=sequencer.get_tick(),
+                time_scale=time_scale,
+                options=PlayOptions(lookahead_ms=ceil(2000 * self.block_frames / self.sample_rate)),
+            )
+            total_frames = self.num_of_frames(timeline=timeline, bpm=bpm)
+            for start in range(0, total_frames, self.block_frames):
+                for events, offset in scheduler.refill(now=sequencer.get_tick(), record=False):
+                    sequencer.send_events(
+                        events=events,
+                        presets=timeline.presets,
+                        offset=offset,
+                        dest=sequencer.synth_seq_id,
+                        programs=scheduler.programs,
+                    )
+                frames = min(self.block_frames, total_frames - start)
+                out = block[:frames] if audio is None else audio[start : start + frames]
+                groups = self.render_block(out=out)
+                if meters is not None:
+                    meters.update(master=out, groups=groups)
+                yield start + frames, out
+        finally:
+            sequencer.delete()
+
+    def meters(self, project_version: ProjectVersion, timeline: Timeline) -> RenderMeters:
+        channels = set(np.unique(timeline.events["channel"]).tolist())
+        tracks = {}
+        for track in project_version.tracks:
+            if used := {
+                self.group(channel=version.channel) for version in track.versions if version.channel in channels
+            }:
+                tracks[track.name] = tuple(used)
+        return RenderMeters(sample_rate=self.sample_rate, tracks=tracks)
+
+    def render_timeline(self, timeline: Timeline, bpm: Bpm, meters: Optional[RenderMeters] = None) -> np.ndarray:
+        audio = np.zeros((self.num_of_frames(timeline=timeline, bpm=bpm), 2), dtype=np.float32)
+        for _ in self.blocks(timeline=timeline, bpm=bpm, audio=audio, meters=meters):
+            pass
+        return audio
+
+    def stream_timeline(
+        self,
+        timeline: Timeline,
+        bpm: Bpm,
+        file_name: str,
+        progress: Optional[Callable[[RenderProgress], None]] = None,
+        cancel: Optional[Event] = None,
+        meters: Optional[RenderMeters] = None,
+    ) -> int:
+        start = perf_counter()
+        total_frames = self.num_of_frames(timeline=timeline, bpm=bpm)
+        ticks_per_frame = bpm2time_scale(bpm=bpm) / self.sample_rate
+        frames = 0
+        try:
+            with AudioWriter(file_name=file_name, sample_rate=self.sample_rate) as writer:
+                for frames, block in self.blocks(timeline=timeline, bpm=bpm, meters=meters):
+                    if cancel is not None and cancel.is_set():
+                        raise RenderCancelled(f"Render of {file_name} cancelled after {frames} frames")
+                    writer.write(audio=block)
+                    if progress:
+                        tick = frames * ticks_per_frame
+                        progress(
+                            RenderProgress(
+                                frames=frames,
+                                total_frames=total_frames,
+                                bars=int(np.searchsorted(timeline.bar_ticks[1:], tick, side="right")),
+                                total_bars=timeline.num_of_bars,
+                                sample_rate=self.sample_rate,
+                                elapsed=perf_counter() - start,
+                            )
+                        )
+        except RenderCancelled:
+            os.remove(file_name)
+            raise
+        return frames
+
+    def render(
+        self,
+        project_version: ProjectVersion,
+        variant_id: UUID,
+        bpm: Optional[Bpm] = None,
+        track: Optional[Track] = None,
+        file_name: Optional[str] = None,
+        stream: bool = False,
+        progress: Optional[Callable[[RenderProgress], None]] = None,
+        cancel: Optional[Event] = None,
+        normalize: Optional[float] = None,
+    ) -> RenderResult:
+        # normalize is a target loudness in LUFS, reached with one gain applied when the file is written
+        if stream and normalize is not None:
+            raise ValueError("Normalizing needs the whole render before writing, it cannot be streamed")
+        bpm = bpm or project_version.bpm
+        start = perf_counter()
+        timeline = Timeline.from_project_version(
+            project_version=project_version, start_variant_id=variant_id, track=track
+        )
+        meters = self.meters(project_version=project_version, timeline=timeline)
+        if stream:
+            if not file_name:
+                raise ValueError("Streaming render requires file name")
+            frames = self.stream_timeline(
+                timeline=timeline, bpm=bpm, file_name=file_name, progress=progress, cancel=cancel, meters=meters
+            )
+            result = RenderResult(frames=frames, sample_rate=self.sample_rate, elapsed=perf_counter() - start)
+            result.levels = meters.report()
+        else:
+            audio = self.render_timeline(timeline=timeline, bpm=bpm, meters=meters)
+            levels = meters.report()
+            if normalize is not None:
+                levels.normalize(target=normalize)
+            if file_name:
+                write_audio(file_name=file_name, audio=audio, sample_rate=self.sample_rate, gain=levels.gain)
+            result = RenderResult(
+                frames=len(audio),
+                audio=audio,
+                sample_rate=self.sample_rate,
+                elapsed=perf_counter() - start,
+                levels=levels,
+            )
+        result.file_name = file_name
+        logger.info(
+            f"Rendered {result.duration:.2f} s in {result.elapsed:.2f} s, realtime factor {result.realtime_factor:.1f}x"
+        )
+        logger.info(f"Levels\n{result.levels}")
+        if clipped := result.levels.clipped:
+            logger.warning(f"Clipping in {clipped}")
+        return result
+
+    def delete(self):
+        self.synth.delete()
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from src.app.backend.timeline import Timeline
+from src.app.model.types import Bpm
+from src.app.utils.logger import get_console_logger
+from src.app.utils.properties import MidiAttr
+
+logger = get_console_logger(name=__name__, log_level=logging.INFO)
+
+
+class RenderCache:
+    EXTENSION = ".npy"
+
+    def __init__(self, directory: str, max_bytes: int = MidiAttr.RENDER_CACHE_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.size = 0
+        # Least recently used first, entries of previous sessions ordered by access time
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        files = sorted(self.directory.glob(f"*{RenderCache.EXTENSION}"), key=lambda file: file.stat().st_atime_ns)
+        for file in files:
+            self._add(key=file.stem, size=file.stat().st_size)
+        self._evict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __repr__(self) -> str:
+        return (
+            f"RenderCache(entries={len(self)}, bytes={self.size}, hits={self.hits}, misses={self.misses}, "
+            f"hit_rate={self.hit_rate:.2f}, bytes_saved={self.bytes_saved})"
+        )
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+    @staticmethod
+    def key(timeline: Timeline, bpm: Bpm, sample_rate: int, tail: float) -> str:
+        digest = hashlib.sha256()
+        digest.update(timeline.events.tobytes())
+        digest.update(timeline.bar_ticks.tobytes())
+        for preset in timeline.presets:
+            # Sound font identity, so that a replaced file with the same name is not served from cache
+            stat = os.stat(preset.sf_name)
+            digest.update(f"{preset.sf_name}|{stat.st_size}|{stat.st_mtime_ns}|{preset.bank}|{preset.patch}".encode())
+        digest.update(f"{bpm}|{sample_rate}|{tail}".encode())
+        return digest.hexdigest()
+
+    def file_name(self, key: str) -> Path:
+        return self.directory / f"{key}{RenderCache.EXTENSION}"
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        audio = np.load(self.file_name(key=key))
+        self._entries.move_to_end(key)
+        os.utime(self.file_name(key=key))
+        self.hits += 1
+        self.bytes_saved += audio.nbytes
+        return audio
+
+    def put(self, key: str, audio: np.ndarray):
+        np.save(self.file_name(key=key), audio)
+        self._add(key=key, size=self.file_name(key=key).stat().st_size)
+        self._evict()
+
+    def _add(self, key: str, size: int):
+        self.size += size - self._entries.get(key, 0)
+        self._entries[key] = size
+        self._entries.move_to_end(key)
+
+    def _evict(self):
+        while self._entries and self.size > self.max_bytes:
+            key, size = self._entries.popitem(last=False)
+            self.size -= size
+            self.file_name(key=key).unlink(missing_ok=True)
+            logger.debug(f"Evicted {key}")
+
+    def clear(self):
+        for key in self._entries:
+            self.file_name(key=key).unlink(missing_ok=True)
+        self._entries.clear()
+        self.size = 0
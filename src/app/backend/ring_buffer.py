@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src.app.backend.synth import Synth
+
+
+class AudioRingBuffer:
+    def __init__(self, frames: int, planar: bool = False):
+        self.frames = frames
+        self.planar = planar
+        # Interleaved as (frames, 2) or planar as (2, frames), allocated once and rendered into in place
+        self.data = np.zeros((2, frames) if planar else (frames, 2), dtype=np.float32)
+        self.head = 0
+        self.tail = 0
+        frame_axis, channel_axis = (1, 0) if planar else (0, 1)
+        # Addresses are computed once, so pulling a block only does integer arithmetic on the Python side
+        self._left = self.data.ctypes.data
+        self._right = self._left + self.data.strides[channel_axis]
+        self._frame_bytes = self.data.strides[frame_axis]
+        self._incr = self._frame_bytes // self.data.itemsize
+
+    def __len__(self) -> int:
+        return self.head - self.tail
+
+    def __repr__(self) -> str:
+        return f"AudioRingBuffer(frames={self.frames}, planar={self.planar}, available={len(self)})"
+
+    @property
+    def free(self) -> int:
+        return self.frames - len(self)
+
+    def _span(self, array: np.ndarray, start: int, stop: int) -> np.ndarray:
+        return array[:, start:stop] if self.planar else array[start:stop]
+
+    def pull(self, synth: Synth, frames: Optional[int] = None) -> int:
+        frames = self.free if frames is None else frames
+        if frames > self.free:
+            raise ValueError(f"Cannot pull {frames} frames into {self}")
+        start = self.head % self.frames
+        first = min(frames, self.frames - start)
+        offset = start * self._frame_bytes
+        synth.write_float_into(first, self._left + offset, self._incr, self._right + offset, self._incr)
+        if frames > first:
+            synth.write_float_into(frames - first, self._left, self._incr, self._right, self._incr)
+        self.head += frames
+        return frames
+
+    def peek(self, frames: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        # Views in playing order, the second one is empty unless the frames wrap around the end of the buffer
+        frames = len(self) if frames is None else min(frames, len(self))
+        start = self.tail % self.frames
+        first = min(frames, self.frames - start)
+        return self._span(self.data, start, start + first), self._span(self.data, 0, frames - first)
+
+    def consume(self, frames: int):
+        if frames > len(self):
+            raise ValueError(f"Cannot consume {frames} frames from {self}")
+        self.tail += frames
+
+    def read(self, out: np.ndarray) -> int:
+        first, second = self.peek(frames=out.shape[1] if self.planar else len(out))
+        split = first.shape[1] if self.planar else len(first)
+        frames = split + (second.shape[1] if self.planar else len(second))
+        self._span(out, 0, split)[...] = first
+        self._span(out, split, frames)[...] = second
+        self.consume(frames=frames)
+        return frames
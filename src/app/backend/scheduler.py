@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import logging
+from bisect import bisect_right
+from collections import deque
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.app.backend.timeline import EventCode, NO_PRESET, Timeline
+from src.app.utils.logger import get_console_logger
+from src.app.utils.properties import PlayOptions
+
+logger = get_console_logger(name=__name__, log_level=logging.INFO)
+
+Batch = Tuple[np.ndarray, int]
+Program = Tuple[int, int, int]
+# (time, code, channel, payload), the payload is (pitch, velocity, duration), (sfid, bank, patch),
+# (control, value) or (value,) by code
+DecodedEvent = Tuple[int, EventCode, int, Tuple[int, ...]]
+
+DURATION_EDGES_MS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+LATENESS_EDGES_MS = (0, 1, 2, 5, 10, 20, 50)
+
+
+class DeadlineMetrics:
+    def __init__(self, time_scale: int):
+        self.time_scale = time_scale
+        self.refills = 0
+        self.late = 0
+        self.events = 0
+        self.max_queued = 0
+        self.min_margin: Optional[int] = None
+        self.total_margin = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"DeadlineMetrics(refills={self.refills}, late={self.late}, events={self.events}, "
+            f"max_queued={self.max_queued}, min_margin_ms={self.min_margin_ms}, mean_margin_ms={self.mean_margin_ms})"
+        )
+
+    def ms(self, ticks: int) -> float:
+        return round(1000 * ticks / self.time_scale, 2)
+
+    @property
+    def min_margin_ms(self) -> Optional[float]:
+        return None if self.min_margin is None else self.ms(ticks=self.min_margin)
+
+    @property
+    def mean_margin_ms(self) -> Optional[float]:
+        return None if not self.refills else self.ms(ticks=self.total_margin / self.refills)
+
+    def record_refill(self, margin: int):
+        # Margin is the audio time still queued when the refill started; negative means the window ran dry
+        self.refills += 1
+        self.total_margin += margin
+        if margin < 0:
+            self.late += 1
+        if self.min_margin is None or margin < self.min_margin:
+            self.min_margin = margin
+
+    def record_events(self, events: int, queued: int):
+        self.events += events
+        self.max_queued = max(self.max_queued, queued)
+
+
+class Histogram:
+    def __init__(self, edges: Sequence[float]):
+        # Bucket i counts values below edges[i] and not below edges[i - 1], the last one everything above
+        self.edges = list(edges)
+        self.counts = [0] * (len(self.edges) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max: Optional[float] = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __repr__(self) -> str:
+        buckets = ", ".join(f"{label}: {count}" for label, count in self.buckets() if count)
+        return f"Histogram(count={self.count}, mean={self.mean}, max={self.max}, {{{buckets}}})"
+
+    @property
+    def mean(self) -> Optional[float]:
+        return None if not self.count else round(self.total / self.count, 3)
+
+    def record(self, value: float):
+        self.counts[bisect_right(self.edges, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def buckets(self) -> List[Tuple[str, int]]:
+        labels = [f"<{self.edges[0]}"]
+        labels += [f"{low}-{high}" for low, high in zip(self.edges, self.edges[1:])]
+        labels.append(f">={self.edges[-1]}")
+        return list(zip(labels, self.counts))
+
+    def percentile(self, q: float) -> Optional[float]:
+        # Upper edge of the bucket holding the q-th percentile, the maximum for the open ended last bucket
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for edge, count in zip(self.edges, self.counts):
+            seen += count
+            if seen >= rank:
+                return edge
+        return self.max
+
+
+class CallbackMetrics:
+    def __init__(self, time_scale: int):
+        self.time_scale = time_scale
+        # Time spent inside the sequencer callback and how long after its timer it ran, both in ms
+        self.durations = Histogram(edges=DURATION_EDGES_MS)
+        self.lateness = Histogram(edges=LATENESS_EDGES_MS)
+        # Delay between the callback handing work over and the prefetch worker picking it up
+        self.handoff = Histogram(edges=LATENESS_EDGES_MS)
+
+    def __repr__(self) -> str:
+        return f"CallbackMetrics(durations={self.durations}, lateness={self.lateness}, handoff={self.handoff})"
+
+    def record(self, duration: float, late: int):
+        self.durations.record(1000 * duration)
+        self.lateness.record(1000 * late / self.time_scale)
+
+
+class ChannelPrograms:
+    def __init__(self):
+        self.programs: Dict[int, Program] = {}
+        self.sent = 0
+        self.suppressed = 0
+
+    def __repr__(self) -> str:
+        return f"ChannelPrograms(sent={self.sent}, suppressed={self.suppressed})"
+
+    def select(self, channel: int, program: Program) -> bool:
+        if self.programs.get(channel) == program:
+            self.suppressed += 1
+            return False
+        self.programs[channel] = program
+        self.sent += 1
+        return True
+
+
+def decode_events(
+    events: np.ndarray, program_list: List[Program], offset: int, programs: ChannelPrograms
+) -> Iterator[DecodedEvent]:
+    """Timeline slice as sequencer events at tick + offset, program selects already sent on a channel are skipped"""
+    columns = zip(
+        (events["tick"] + offset).tolist(),
+        events["type"].tolist(),
+        events["channel"].tolist(),
+        events["pitch"].tolist(),
+        events["velocity"].tolist(),
+        # Notes end a tick early, so that the note off comes before a following note on the same key
+        (events["duration"] - 1).tolist(),
+        events["control"].tolist(),
+        events["value"].tolist(),
+        events["preset"].tolist(),
+    )
+    for time, code, channel, pitch, velocity, duration, control, value, preset in columns:
+        if code == EventCode.NOTE:
+            if preset != NO_PRESET and programs.select(channel=channel, program=program_list[preset]):
+                yield time, EventCode.PROGRAM, channel, program_list[preset]
+            yield time, EventCode.NOTE, channel, (pitch, velocity, duration)
+        elif code == EventCode.PROGRAM:
+            if programs.select(channel=channel, program=program_list[preset]):
+                yield time, EventCode.PROGRAM, channel, program_list[preset]
+        elif code == EventCode.CONTROL:
+            yield time, EventCode.CONTROL, channel, (control, value)
+        elif code == EventCode.PITCH_BEND:
+            yield time, EventCode.PITCH_BEND, channel, (value,)
+        else:
+            raise ValueError(f"Event code {code} not supported")
+
+
+class LookaheadScheduler:
+    def __init__(
+        self, timeline: Timeline, start_tick: int, time_scale: int, options: PlayOptions, start_position: int = 0
+    ):
+        self.timeline = timeline
+        self.time_scale = time_scale
+        self.repeat = options.repeat
+        self.window = self.ms2tick(ms=options.lookahead_ms)
+        self.period = self.ms2tick(ms=options.refill_period_ms)
+        self.max_queued_events = options.max_queued_events
+        # position is the timeline tick up to which events were sent, origin maps it to sequencer time
+        self.position = start_position
+        self.origin = start_tick - self.position
+        self.stop_time = start_tick + timeline.length - self.position
+        self.metrics = DeadlineMetrics(time_scale=time_scale)
+        # Events are sent in time order, so this is the program each channel has at the end of the window
+        self.programs = ChannelPrograms()
+        self._queued: Deque[np.ndarray] = deque()
+
+    def ms2tick(self, ms: int) -> int:
+        return max(1, round(ms * self.time_scale / 1000))
+
+    @property
+    def scheduled_until(self) -> int:
+        return self.origin + self.position
+
+    def is_finished(self) -> bool:
+        return self.timeline.length == 0 or (not self.repeat and self.position >= self.timeline.length)
+
+    def queued(self, now: int) -> int:
+        while self._queued and self._queued[0][-1] < now:
+            self._queued.popleft()
+        return sum(len(times) - int(np.searchsorted(times, now, side="left")) for times in self._queued)
+
+    def refill(self, now: int, record: bool = True) -> List[Batch]:
+        if record and not self.is_finished():
+            self.metrics.record_refill(margin=self.scheduled_until - now)
+        batches: List[Batch] = []
+        horizon = now + self.window
+        capacity = self.max_queued_events - self.queued(now=now)
+        while capacity > 0 and self.scheduled_until < horizon and not self.is_finished():
+            if self.position >= self.timeline.length:
+                self.origin += self.timeline.length
+                self.position = 0
+            end = min(horizon - self.origin, self.timeline.length)
+            events = self.timeline.slice(start_tick=self.position, end_tick=end)
+            if len(events) > capacity:
+                # Cut on a tick boundary so that the remainder of a chord is sent with the next refill
+                cut = int(np.searchsorted(events["tick"], events["tick"][capacity], side="left"))
+                if cut == 0:
+                    cut = int(np.searchsorted(events["tick"], events["tick"][0], side="right"))
+                if cut < len(events):
+                    end = int(events["tick"][cut])
+                events = events[:cut]
+            if len(events):
+                batches.append((events, self.origin))
+                self._queued.append(events["tick"] + self.origin)
+                capacity -= len(events)
+            self.position = end
+        self.metrics.record_events(events=sum(len(events) for events, _ in batches), queued=self.queued(now=now))
+        return batches
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import logging
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from src.app.backend.preset_index import PresetEntry
+from src.app.backend.scheduler import Program
+from src.app.model.types import Preset
+from src.app.utils.logger import get_console_logger
+from src.app.utils.properties import MidiAttr
+
+logger = get_console_logger(name=__name__, log_level=logging.INFO)
+
+
+@dataclass(kw_only=True, slots=True)
+class SoundFontStats:
+    sf_name: str
+    size: int
+    load_time: float
+    loads: int = 1
+    uses: int = 0
+    last_used: float = 0.0
+
+
+class SoundFontManager:
+    def __init__(self, budget: int = MidiAttr.SF_MEMORY_BUDGET):
+        self.budget = budget
+        self.size = 0
+        self.unloads = 0
+        # Fonts of the open project and of the current playback are never unloaded
+        self.referenced: Set[str] = set()
+        self.playing: Set[str] = set()
+        # Least recently used first
+        self._fonts: OrderedDict[str, SoundFontStats] = OrderedDict()
+        self._history: Dict[str, SoundFontStats] = {}
+
+    def __len__(self) -> int:
+        return len(self._fonts)
+
+    def __contains__(self, sf_name: str) -> bool:
+        return sf_name in self._fonts
+
+    def __iter__(self) -> Iterator[SoundFontStats]:
+        return iter(self._fonts.values())
+
+    def __repr__(self) -> str:
+        return (
+            f"SoundFontManager(fonts={len(self)}, size={self.size}, budget={self.budget}, "
+            f"unloads={self.unloads}, reloads={sum(stats.loads - 1 for stats in self._history.values())})"
+        )
+
+    @staticmethod
+    def font_size(sf_name: str) -> int:
+        # Samples are loaded into memory as a whole, so the file size is a close estimate of the memory used.
+        # Backends that do not read the file, like the recording one, use no sample memory
+        return os.path.getsize(sf_name) if os.path.isfile(sf_name) else 0
+
+    def stats(self, sf_name: str) -> Optional[SoundFontStats]:
+        return self._history.get(sf_name)
+
+    def fits(self, sf_name: str) -> bool:
+        return self.size + self.font_size(sf_name=sf_name) <= self.budget
+
+    def loaded(self, sf_name: str, load_time: float):
+        if (stats := self._history.get(sf_name)) is None:
+            stats = SoundFontStats(sf_name=sf_name, size=self.font_size(sf_name=sf_name), load_time=load_time)
+            self._history[sf_name] = stats
+        else:
+            stats.loads += 1
+            stats.load_time = load_time
+        self._fonts[sf_name] = stats
+        self.size += stats.size
+        self.touch(sf_name=sf_name)
+
+    def unloaded(self, sf_name: str):
+        if (stats := self._fonts.pop(sf_name, None)) is not None:
+            self.size -= stats.size
+            self.unloads += 1
+
+    def touch(self, sf_name: str):
+        if (stats := self._fonts.get(sf_name)) is not None:
+            stats.uses += 1
+            stats.last_used = perf_counter()
+            self._fonts.move_to_end(sf_name)
+
+    def victims(self, keep: Iterable[str] = ()) -> List[str]:
+        keep = self.referenced | self.playing | set(keep)
+        victims = []
+        size = self.size
+        for sf_name, stats in self._fonts.items():
+            if size <= self.budget:
+                break
+            if sf_name not in keep:
+                victims.append(sf_name)
+                size -= stats.size
+        return victims
+
+
+class SoundFontRegistry:
+    def __init__(self):
+        self.sfids: Dict[str, int] = {}
+        self.sf_names: Dict[int, str] = {}
+        self.display_names: Dict[str, str] = {}
+        # Flat table for lookups on the note path, nested one for listing banks and patches of a font
+        self.presets: Dict[Program, str] = {}
+        self.banks: Dict[int, Dict[int, Dict[int, str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.sfids)
+
+    def __contains__(self, sf_name: str) -> bool:
+        return sf_name in self.sfids
+
+    def __repr__(self) -> str:
+        return f"SoundFontRegistry(fonts={len(self)}, presets={len(self.presets)})"
+
+    def add(self, sf_name: str, sfid: int):
+        self.sfids[sf_name] = sfid
+        self.sf_names[sfid] = sf_name
+        self.banks.setdefault(sfid, {})
+
+    def add_presets(self, sfid: int, presets: List[PresetEntry]):
+        for bank, patch, preset_name in presets:
+            self.presets[sfid, bank, patch] = preset_name
+            self.banks[sfid].setdefault(bank, {})[patch] = preset_name
+
+    def remove(self, sfid: int) -> Optional[str]:
+        if (sf_name := self.sf_names.pop(sfid, None)) is not None:
+            del self.sfids[sf_name]
+        for bank, patches in self.banks.pop(sfid, {}).items():
+            for patch in patches:
+                del self.presets[sfid, bank, patch]
+        return sf_name
+
+    def sfid(self, sf_name: str) -> int:
+        return self.sfids[sf_name]
+
+    def sf_name(self, sfid: int) -> str:
+        if (sf_name := self.sf_names.get(sfid)) is None:
+            raise ValueError(f"Cannot find sound font id {sfid} in registry {self}")
+        return sf_name
+
+    def display_name(self, sf_name: str) -> str:
+        if (display_name := self.display_names.get(sf_name)) is None:
+            display_name = self.display_names[sf_name] = Path(sf_name).name
+        return display_name
+
+    def preset_name(self, sfid: int, bank: int, patch: int) -> Optional[str]:
+        return self.presets.get((sfid, bank, patch))
+
+    def program(self, preset: Preset) -> Program:
+        return self.sfids[preset.sf_name], preset.bank, preset.patch
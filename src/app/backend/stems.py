@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
+from time import perf_counter
+from typing import Dict, List, Optional
+from uuid import UUID
+
+import numpy as np
+
+from src.app.backend.render import OfflineRenderer, write_audio
+from src.app.backend.render_cache import RenderCache
+from src.app.backend.timeline import Timeline
+from src.app.model.project_version import ProjectVersion
+from src.app.model.types import Bpm
+from src.app.utils.logger import get_console_logger
+from src.app.utils.properties import MidiAttr
+
+logger = get_console_logger(name=__name__, log_level=logging.INFO)
+
+
+@dataclass(kw_only=True, slots=True)
+class StemsResult:
+    stems: Dict[str, str]
+    sample_rate: int
+    duration: float
+    elapsed: float
+    mix: Optional[np.ndarray] = None
+    mix_file_name: Optional[str] = None
+
+    @property
+    def realtime_factor(self) -> float:
+        return self.duration * len(self.stems) / self.elapsed if self.elapsed else float("inf")
+
+
+@lru_cache(maxsize=None)
+def worker_renderer(sample_rate: int) -> OfflineRenderer:
+    # One synth per worker process, so soundfonts are loaded once per process and not per stem
+    return OfflineRenderer(sample_rate=sample_rate)
+
+
+def render_stem(timeline: Timeline, bpm: Bpm, sample_rate: int, file_name: str) -> np.ndarray:
+    audio = worker_renderer(sample_rate=sample_rate).render_timeline(timeline=timeline, bpm=bpm)
+    write_audio(file_name=file_name, audio=audio, sample_rate=sample_rate)
+    return audio
+
+
+def mix_stems(stems: List[np.ndarray], gains: List[float]) -> np.ndarray:
+    mix = np.zeros((max(len(stem) for stem in stems), 2), dtype=np.float32)
+    for stem, gain in zip(stems, gains):
+        mix[: len(stem)] += gain * stem
+    return mix
+
+
+def render_stems(
+    project_version: ProjectVersion,
+    variant_id: UUID,
+    directory: str,
+    bpm: Optional[Bpm] = None,
+    sample_rate: int = MidiAttr.SAMPLE_RATE,
+    workers: Optional[int] = None,
+    mix: bool = False,
+    gains: Optional[Dict[str, float]] = None,
+    mix_file_name: Optional[str] = None,
+    cache: Optional[RenderCache] = None,
+) -> StemsResult:
+    bpm = bpm or project_version.bpm
+    gains = gains or {}
+    start = perf_counter()
+    variants = Timeline.play_order(project_version=project_version, start_variant_id=variant_id, last_variant_id=None)
+    tracks = [
+        track for track in project_version.tracks if any(variant.is_track_enabled(track=track) for variant in variants)
+    ]
+    stems = {track.name: os.path.join(directory, f"{track.name}.wav") for track in tracks}
+    timelines = {
+        track.name: Timeline.from_project_version(
+            project_version=project_version, start_variant_id=variant_id, track=track, enabled_only=True
+        )
+        for track in tracks
+    }
+    audio: Dict[str, np.ndarray] = {}
+    keys: Dict[str, str] = {}
+    if cache is not None:
+        # Keys stat sound fonts and hash events, so they are only computed when there is a cache to look up
+        keys = {
+            name: RenderCache.key(timeline=timeline, bpm=bpm, sample_rate=sample_rate, tail=MidiAttr.RENDER_TAIL_SEC)
+            for name, timeline in timelines.items()
+        }
+        for name, key in keys.items():
+            if (cached := cache.get(key=key)) is not None:
+                write_audio(file_name=stems[name], audio=cached, sample_rate=sample_rate)
+                audio[name] = cached
+    changed = [name for name in timelines if name not in audio]
+    if changed:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                name: executor.submit(
+                    render_stem, timeline=timelines[name], bpm=bpm, sample_rate=sample_rate, file_name=stems[name]
+                )
+                for name in changed
+            }
+            for name, future in futures.items():
+                audio[name] = future.result()
+                if cache is not None:
+                    cache.put(key=keys[name], audio=audio[name])
+    audio = {name: audio[name] for name in timelines}
+    result = StemsResult(
+        stems=stems,
+        sample_rate=sample_rate,
+        duration=max((len(stem) for stem in audio.values()), default=0) / sample_rate,
+        elapsed=perf_counter() - start,
+    )
+    if (mix or mix_file_name) and audio:
+        result.mix = mix_stems(stems=list(audio.values()), gains=[gains.get(name, 1.0) for name in audio])
+        if mix_file_name:
+            write_audio(file_name=mix_file_name, audio=result.mix, sample_rate=sample_rate)
+            result.mix_file_name = mix_file_name
+    if cache is not None:
+        logger.info(f"Re-rendered {len(changed)} of {len(stems)} stems {cache}")
+    logger.info(
+        f"Rendered {len(stems)} stems of {result.duration:.2f} s in {result.elapsed:.2f} s, "
+        f"realtime factor {result.realtime_factor:.1f}x"
+    )
+    return result
@@ -48,19 +48,24 @@ from ctypes import (
 from ctypes.util import find_library
 
 # Third-party modules
-from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Any
 
+import numpy as np
 from six import binary_type, iteritems, text_type
 
-from src.app.model.types import Bpm, Preset
+from src.app.backend.engine import SequencerBackend, SynthBackend
+from src.app.backend.preset_index import PresetEntry
+from src.app.backend.profiles import EngineProfile
+from src.app.backend.scheduler import ChannelPrograms, decode_events
+from src.app.backend.timeline import EventCode
+from src.app.model.types import Preset
 from src.app.utils.logger import get_console_logger
 from src.app.model.bar import Bar
 from src.app.model.event import Event, EventType
 
 # Constants
 from src.app.utils.properties import MidiAttr
-from src.app.utils.units import unit2tick, beat2tick, bar_length2tick
+from src.app.utils.units import bar_length2tick, ppq2tick
 
 logger = get_console_logger(name=__name__, log_level=logging.DEBUG)
 
@@ -106,16 +111,26 @@ lib = (
     or find_library("libfluidsynth-1")
 )
 
-if lib is None:
-    raise ImportError("Couldn't find the FluidSynth library.")
+# Dynamically link the FluidSynth library. Without it the module still imports, so that headless backends
+# can be used, and calling any binding raises
+_fl = CDLL(lib) if lib is not None else None
+FLUIDSYNTH_AVAILABLE = _fl is not None
+if not FLUIDSYNTH_AVAILABLE:
+    logger.warning("Couldn't find the FluidSynth library.")
 
-# Dynamically link the FluidSynth library
-_fl = CDLL(lib)
+
+def _unavailable(name):
+    def call(*args, **kwargs):
+        raise OSError(f"Couldn't find the FluidSynth library, {name} is not available")
+
+    return call
 
 
 # Helper function for declaring function prototypes
 def cfunc(name, result, *args):
     """Build and apply a ctypes prototype complete with parameter flags."""
+    if _fl is None:
+        return _unavailable(name)
     atypes = []
     aflags = []
     for arg in args:
@@ -274,6 +289,11 @@ fluid_synth_bank_select = cfunc(
     ("bank", c_int, 1),
 )
 fluid_synth_all_notes_off = cfunc("fluid_synth_all_notes_off", c_int, ("synth", c_void_p, 1), ("chan", c_int, 1))
+fluid_synth_get_active_voice_count = cfunc("fluid_synth_get_active_voice_count", c_int, ("synth", c_void_p, 1))
+
+fluid_synth_set_interp_method = cfunc(
+    "fluid_synth_set_interp_method", c_int, ("synth", c_void_p, 1), ("chan", c_int, 1), ("interp_method", c_int, 1)
+)
 # Reset functions
 fluid_synth_program_reset = cfunc("fluid_synth_program_reset", c_int, ("synth", c_void_p, 1))
 fluid_synth_system_reset = cfunc("fluid_synth_system_reset", c_int, ("synth", c_void_p, 1))
@@ -290,6 +310,28 @@ fluid_synth_write_s16 = cfunc(
     ("roff", c_int, 1),
     ("rincr", c_int, 1),
 )
+fluid_synth_write_float = cfunc(
+    "fluid_synth_write_float",
+    c_int,
+    ("synth", c_void_p, 1),
+    ("len", c_int, 1),
+    ("lout", c_void_p, 1),
+    ("loff", c_int, 1),
+    ("lincr", c_int, 1),
+    ("rout", c_void_p, 1),
+    ("roff", c_int, 1),
+    ("rincr", c_int, 1),
+)
+fluid_synth_process = cfunc(
+    "fluid_synth_process",
+    c_int,
+    ("synth", c_void_p, 1),
+    ("len", c_int, 1),
+    ("nfx", c_int, 1),
+    ("fx", c_void_p, 1),
+    ("nout", c_int, 1),
+    ("out", c_void_p, 1),
+)
 fluid_synth_handle_midi_event = cfunc(
     "fluid_synth_handle_midi_event",
     c_int,
@@ -583,9 +625,17 @@ try:
         ("banknum", c_int, 1),
         ("prognum", c_int, 1),
     )
+    fluid_sfont_iteration_start = cfunc("fluid_sfont_iteration_start", None, ("sfont", c_void_p, 1))
+    fluid_sfont_iteration_next = cfunc("fluid_sfont_iteration_next", c_void_p, ("sfont", c_void_p, 1))
+    fluid_preset_get_banknum = cfunc("fluid_preset_get_banknum", c_int, ("preset", c_void_p, 1))
+    fluid_preset_get_num = cfunc("fluid_preset_get_num", c_int, ("preset", c_void_p, 1))
 except AttributeError:
     fluid_preset_get_name = None
     fluid_sfont_get_preset = None
+    fluid_sfont_iteration_start = None
+    fluid_sfont_iteration_next = None
+    fluid_preset_get_banknum = None
+    fluid_preset_get_num = None
 
 # Fluid file renderer
 new_fluid_file_renderer = cfunc("new_fluid_file_renderer", c_void_p, ("synth", c_void_p, 1))
@@ -639,6 +689,14 @@ fluid_sequencer_register_client = cfunc(
 fluid_sequencer_unregister_client = cfunc(
     "fluid_sequencer_unregister_client", None, ("seq", c_void_p, 1), ("id", c_short, 1)
 )
+fluid_sequencer_remove_events = cfunc(
+    "fluid_sequencer_remove_events",
+    None,
+    ("seq", c_void_p, 1),
+    ("source", c_short, 1),
+    ("dest", c_short, 1),
+    ("type", c_int, 1),
+)
 fluid_sequencer_get_tick = cfunc("fluid_sequencer_get_tick", c_uint, ("seq", c_void_p, 1))
 fluid_sequencer_set_time_scale = cfunc(
     "fluid_sequencer_set_time_scale", None, ("seq", c_void_p, 1), ("scale", c_double, 1)
@@ -741,21 +799,45 @@ def _e(s, encoding=DEFAULT_ENCODING):
 # Convenience functions
 
 
-def fluid_synth_write_s16_stereo(synth, nframes):
+def fluid_synth_write_s16_stereo(synth, nframes, out=None):
     """Return generated samples in stereo 16-bit format.
 
     :param synth: an instance of class Synth
     :param nframes: number of sample frames to generate
     :type nframes: ``int``
+    :param out: optional array of at least 2 * nframes samples which is
+        filled in place and returned, so repeated calls allocate nothing
+    :type out: ``np.array(..., dtype=numpy.int16)``
     :return: one-dimenional NumPy array of interleaved samples
     :rtype: ``np.array(..., dtype=numpy.int16)``
 
     """
-    import numpy
+    if out is None:
+        out = np.empty(nframes * 2, dtype=np.int16)
+    elif out.dtype != np.int16 or len(out) < nframes * 2 or not out.flags.c_contiguous:
+        raise ValueError(f"Expected contiguous int16 array of {nframes * 2} samples")
+    address = out.ctypes.data
+    fluid_synth_write_s16(synth, nframes, address, 0, 2, address, 1, 2)
+    return out[: nframes * 2]
+
 
-    buf = create_string_buffer(nframes * 4)
-    fluid_synth_write_s16(synth, nframes, buf, 0, 2, buf, 1, 2)
-    return numpy.frombuffer(buf[:], dtype=numpy.int16)
+def float_buffer_layout(out, planar=False):
+    """Return frames, left and right addresses and the increment in samples of a stereo float32 array.
+
+    :param out: array of shape (frames, 2), or (2, frames) when planar, views included
+    :raises ValueError: when fluidsynth could write outside of the array with the derived layout
+
+    """
+    if out.dtype != np.float32 or out.ndim != 2 or not out.flags.writeable:
+        raise ValueError(f"Expected writeable two dimensional float32 array, got {out.dtype} {out.shape}")
+    frame_axis, channel_axis = (1, 0) if planar else (0, 1)
+    if out.shape[channel_axis] != 2:
+        raise ValueError(f"Expected two channels on axis {channel_axis}, got shape {out.shape}")
+    # Increments are whole samples going forward, reversed or misaligned views cannot be described to fluidsynth
+    if any(stride <= 0 or stride % out.itemsize for stride in out.strides):
+        raise ValueError(f"Expected positive strides in whole samples, got {out.strides}")
+    address = out.ctypes.data
+    return out.shape[frame_axis], address, address + out.strides[channel_axis], out.strides[frame_axis] // out.itemsize
 
 
 def raw_audio_string(data):
@@ -765,9 +847,7 @@ def raw_audio_string(data):
     (other formats not currently supported).
 
     """
-    import numpy
-
-    return (data.astype(numpy.int16)).tostring()
+    return data.astype(np.int16, copy=False).tobytes()
 
 
 # Object-oriented interface, simplifies access to functions
@@ -1062,10 +1142,10 @@ class Player(BasePlayer):
         return result
 
 
-class Synth:
+class Synth(SynthBackend):
     """Represents a FluidSynth synthesizer."""
 
-    def __init__(self, gain=0.2, samplerate=44100.0, channels=256, **kwargs):
+    def __init__(self, gain=0.2, samplerate=44100.0, channels=256, profile: Optional[EngineProfile] = None, **kwargs):
         """Create new synthesizer object to control sound generation.
 
         Optional keyword arguments:
@@ -1082,6 +1162,9 @@ class Synth:
             internally FluidSynth can use up to 256 channels, which can be
             mapped to different MIDI sources.
         :type channels: ``int``
+        :param profile: engine profile whose buffer, polyphony and interpolation
+            settings are applied before the keyword arguments
+        :type profile: ``EngineProfile``
 
         Additional keyword arguments are interpreted and applied as fluidsynth
         settings, i.e. the argument name is used as the setting name and its
@@ -1093,23 +1176,28 @@ class Synth:
         ``FLUID_STR_TYPE`` settings.
 
         """
+        super().__init__()
         self.settings = new_fluid_settings()
         self.setting("synth.gain", float(gain))
         self.setting("synth.sample-rate", float(samplerate))
         # self.setting('synth.backend-channels', channels)
         self.setting("synth.midi-channels", channels)
         # synth.midi-channels
+        self.profile = profile
+        if profile is not None:
+            for opt, val in iteritems(profile.settings()):
+                self.setting(opt, val)
 
         for opt, val in iteritems(kwargs):
             self.setting(opt, val)
 
         self.synth = new_fluid_synth(self.settings)
+        if profile is not None:
+            self.set_interp_method(chan=-1, method=profile.interpolation)
         self.audio_driver = None
         self.midi_driver = None
         self.router = None
         self.cmd_handler = None
-        self.sf_map: Dict[str, int] = {}
-        self.preset_map: Dict = {}
 
     def setting(self, opt, val=None):  # pylint: disable=inconsistent-return-statements
         # pylint: disable=too-many-return-statements
@@ -1207,6 +1295,9 @@ class Synth:
             else:
                 self.cmd_handler = new_fluid_cmd_handler(self.synth, self.router)
 
+    def create_sequencer(self, time_scale: int, use_system_timer: bool = False, callback=None) -> Sequencer:
+        return Sequencer(synth=self, time_scale=time_scale, use_system_timer=use_system_timer, callback=callback)
+
     def delete(self):
         if self.audio_driver is not None:
             delete_fluid_audio_driver(self.audio_driver)
@@ -1226,40 +1317,12 @@ class Synth:
     def sfload(self, filename, update_midi_preset=0):
         """Load SoundFont and return its ID."""
         sfid = fluid_synth_sfload(self.synth, _e(filename), update_midi_preset)
-        self.sf_map[filename] = sfid
+        self.sf_registry.add(sf_name=filename, sfid=sfid)
         return sfid
 
-    @staticmethod
-    def get_sf_files(path: str) -> List[str]:
-        glob_path = Path(path)
-        logger.debug(f"Reading soundfonts from path {glob_path}")
-        return [str(item) for item in glob_path.glob("**/*.sf2")]
-
-    def load_sf(self, file_name: str):
-        def nested_set(dic, keys, value):
-            for key in keys[:-1]:
-                dic = dic.setdefault(key, {})
-            dic[keys[-1]] = value
-
-        sfid = self.sfload(filename=file_name)
-        for bank in range(MidiAttr.MAX_MIDI + 1):
-            for patch in range(MidiAttr.MAX_MIDI):
-                preset = (sfid, bank, patch)
-                preset_name = self.sfpreset_name(sfid, bank, patch)
-                if preset_name is not None:
-                    nested_set(dic=self.preset_map, keys=preset, value=preset_name)
-
-    def sf_name(self, sfid: int) -> str:
-        for filename, id in self.sf_map.items():
-            if id == sfid:
-                return filename
-        raise ValueError(f"Cannot find sound font id {sfid} in map {self.sf_map.items()}")
-
     def sfunload(self, sfid, update_midi_preset=0):
         """Unload a SoundFont and free memory it used."""
-        for filename, id in self.sf_map.items():
-            if id == sfid:
-                self.sf_map.pop(filename)
+        self.sf_registry.remove(sfid=sfid)
         return fluid_synth_sfunload(self.synth, sfid, update_midi_preset)
 
     def program_select(self, chan, sfid, bank, preset):
@@ -1297,8 +1360,24 @@ class Synth:
         fluid_synth_get_program(self.synth, chan, byref(sfontid), byref(banknum), byref(prognum))
         return sfontid.value, banknum.value, prognum.value
 
+    def sfpresets(self, sfid: int) -> List[PresetEntry]:
+        """Return (bank, patch, name) of all presets of a soundfont."""
+        if not fluid_sfont_iteration_next:
+            raise NotImplementedError("Fluidsynth library does not provide required 'fluid_sfont_iteration' functions")
+
+        sfont = fluid_synth_get_sfont_by_id(self.synth, sfid)
+        presets = []
+        fluid_sfont_iteration_start(sfont)
+        while preset := fluid_sfont_iteration_next(sfont):
+            presets.append(
+                (fluid_preset_get_banknum(preset), fluid_preset_get_num(preset), _d(fluid_preset_get_name(preset)))
+            )
+        return presets
+
     def sfpreset_name(self, sfid, bank, patch):
         """Return name of a soundfont preset."""
+        if (preset_name := self.sf_registry.preset_name(sfid=sfid, bank=bank, patch=patch)) is not None:
+            return preset_name
         if not fluid_preset_get_name:
             raise NotImplementedError("Fluidsynth library does not provide required 'fluid_preset_get_name' function")
 
@@ -1520,18 +1599,44 @@ class Synth:
         """Turn off all notes on a MIDI channel (put them into release phase)."""
         return fluid_synth_all_notes_off(self.synth, chan)
 
-    def get_samples(self, len=1024):
+    def active_voice_count(self) -> int:
+        return fluid_synth_get_active_voice_count(self.synth)
+
+    def set_interp_method(self, chan: int, method: int):
+        """Set the sample interpolation of a MIDI channel, -1 applies it to all channels."""
+        return fluid_synth_set_interp_method(self.synth, chan, method)
+
+    def write_float(self, out: np.ndarray, planar: bool = False):
+        """Render straight into a float32 array of shape (frames, 2), or (2, frames) when planar, views included."""
+        nframes, left, right, incr = float_buffer_layout(out=out, planar=planar)
+        self.write_float_into(nframes, left, incr, right, incr)
+
+    def write_float_into(self, nframes: int, left: int, left_incr: int, right: int, right_incr: int):
+        """Render nframes at raw addresses with increments in samples, for callers that keep their buffers."""
+        if fluid_synth_write_float(self.synth, nframes, left, 0, left_incr, right, 0, right_incr) == FLUID_FAILED:
+            raise OSError("Rendering samples failed")
+
+    def process_into(self, nframes: int, fx, nfx: int, out, nout: int):
+        """Render nframes per audio group into ctypes arrays of left and right channel pointers.
+
+        Samples are added to what the buffers hold. Effects go to the fx buffers, pointers may repeat to mix them.
+        """
+        if fluid_synth_process(self.synth, nframes, nfx, fx, nout, out) == FLUID_FAILED:
+            raise OSError("Rendering samples failed")
+
+    def get_samples(self, len=1024, out=None):
         """Generate audio samples.
 
         The return value will be a NumPy array containing the given
         length of audio samples. If the synth is set to stereo output
-        (the default) the array will be size 2 * len.
+        (the default) the array will be size 2 * len. When out is given
+        the samples are written into it instead of a new array.
 
         """
-        return fluid_synth_write_s16_stereo(self.synth, len)
+        return fluid_synth_write_s16_stereo(self.synth, len, out=out)
 
 
-class Sequencer:
+class Sequencer(SequencerBackend):
     def __init__(self, synth, time_scale=1000, use_system_timer=True, callback=None):
         """Create new sequencer object to control and schedule timing of backend events.
 
@@ -1543,6 +1648,7 @@ class Sequencer:
         """
         self.client_callbacks = []
         self.sequencer = new_fluid_sequencer2(use_system_timer)
+        self._event = new_fluid_event()
         fluid_sequencer_set_time_scale(self.sequencer, time_scale)
         self.synth: Optional[Any] = None
         self.synth_seq_id = self.register_fluidsynth(synth)
@@ -1571,12 +1677,11 @@ class Sequencer:
     def unregister_client(self, client_id: int):
         fluid_sequencer_unregister_client(self.sequencer, client_id)
 
-    def note(self, time, channel, key, unit, bpm, velocity, source=-1, dest=-1, absolute=True):
-        if any(map(lambda x: x is None, [time, channel, key, unit, bpm, velocity])):
-            raise ValueError(f"Not all parameters defined " f"{[time, channel, key, unit, bpm, velocity]}")
+    def note(self, time, channel, key, duration, velocity, source=-1, dest=-1, absolute=True):
+        if any(map(lambda x: x is None, [time, channel, key, duration, velocity])):
+            raise ValueError(f"Not all parameters defined " f"{[time, channel, key, duration, velocity]}")
         evt = self._create_event(source, dest)
-        duration = unit2tick(unit=unit, bpm=bpm) - 1
-        fluid_event_note(evt, channel, key, velocity, duration)
+        fluid_event_note(evt, channel, key, velocity, duration - 1)
         self._schedule_event(evt, time, absolute)
         delete_fluid_event(evt)
 
@@ -1594,8 +1699,7 @@ class Sequencer:
 
     def program_change(self, time, channel, preset: Preset, source=-1, dest=-1, absolute=True):
         evt = self._create_event(source, dest)
-        sfid = self.synth.sf_map[preset.sf_name]
-        fluid_event_program_select(evt, channel, sfid, preset.bank, preset.patch)
+        fluid_event_program_select(evt, channel, *self.synth.sf_registry.program(preset=preset))
         self._schedule_event(evt, time, absolute)
         delete_fluid_event(evt)
 
@@ -1635,21 +1739,30 @@ class Sequencer:
     def process(self, msec):
         fluid_sequencer_process(self.sequencer, msec)
 
-    def delete(self):
-        delete_fluid_sequencer(self.sequencer)
+    def remove_events(self, source=-1, dest=-1, type=-1):
+        fluid_sequencer_remove_events(self.sequencer, source, dest, type)
 
-    def __del__(self):
-        if hasattr(self, "client_id") and self.client_id:
+    def delete(self):
+        # Safe to call more than once, so an explicit teardown is not repeated by __del__
+        if getattr(self, "client_id", None):
             self.unregister_client(client_id=self.client_id)
+            self.client_id = None
+        if getattr(self, "_event", None):
+            delete_fluid_event(self._event)
+            self._event = None
+        if getattr(self, "sequencer", None):
+            delete_fluid_sequencer(self.sequencer)
+            self.sequencer = None
         self.client_callbacks.clear()
-        if self.sequencer:
-            self.delete()
+
+    def __del__(self):
+        self.delete()
 
     # -----------------------------------------------------------------------------------------------
     # Added by me
     # -----------------------------------------------------------------------------------------------
 
-    def send_event(self, time: int, event: Event, bpm: Bpm, synth_seq_id):
+    def send_event(self, time: int, event: Event, synth_seq_id):
         if event.active:
             match event.type:
                 case EventType.NOTE:
@@ -1664,8 +1777,7 @@ class Sequencer:
                         time=time,
                         channel=event.channel,
                         key=int(event.pitch),
-                        unit=event.unit,
-                        bpm=bpm,  # unit2tick(unit=note.unit, bpm=bpm),
+                        duration=ppq2tick(ticks=event.duration),
                         velocity=event.velocity,
                         dest=synth_seq_id,
                     )
@@ -1704,11 +1816,41 @@ class Sequencer:
     #                 # send program change to current event
     #         self.send_event(time=timed_event.time, event=timed_event.event, bpm=bpm, synth_seq_id=synth_seq_id)
 
-    def play_bar(self, synth: Synth, bar: Bar, bpm: Bpm, start_tick: int = 0, repeat: int = 1):
+    def send_events(
+        self,
+        events: np.ndarray,
+        presets: List[Preset],
+        offset: int,
+        dest=-1,
+        programs: Optional[ChannelPrograms] = None,
+    ):
+        if programs is None:
+            programs = ChannelPrograms()
+        # fluid_sequencer_send_at copies the event, so one handle is reused for the whole batch
+        evt = self._event
+        fluid_event_set_source(evt, -1)
+        fluid_event_set_dest(evt, dest)
+        sequencer = self.sequencer
+        program_list = [self.synth.sf_registry.program(preset=preset) for preset in presets]
+        for time, code, channel, data in decode_events(
+            events=events, program_list=program_list, offset=offset, programs=programs
+        ):
+            if code == EventCode.NOTE:
+                fluid_event_note(evt, channel, *data)
+            elif code == EventCode.PROGRAM:
+                fluid_event_program_select(evt, channel, *data)
+            elif code == EventCode.CONTROL:
+                fluid_event_control_change(evt, channel, *data)
+            else:
+                fluid_event_pitch_bend(evt, channel, *data)
+            if fluid_sequencer_send_at(sequencer, evt, time, True) == FLUID_FAILED:
+                raise OSError("Scheduling event failed")
+
+    def play_bar(self, synth: Synth, bar: Bar, start_tick: int = 0, repeat: int = 1):
         synth_seq_id = self.register_fluidsynth(synth)
         offset = self.get_tick() + start_tick
         for counter in range(repeat):
-            offset += counter * bar_length2tick(bar=bar, bpm=bpm)
+            offset += counter * bar_length2tick(bar=bar)
             for event in bar.events():
-                last_time = offset + beat2tick(beat=event.beat, bpm=bpm)
-                self.send_event(time=last_time, event=event, bpm=bpm, synth_seq_id=synth_seq_id)
+                last_time = offset + ppq2tick(ticks=event.tick)
+                self.send_event(time=last_time, event=event, synth_seq_id=synth_seq_id)
@@ -0,0 +1,501 @@
+from __future__ import annotations
+
+import logging
+from bisect import bisect_right
+from enum import IntEnum
+from itertools import accumulate
+from typing import List, Optional, Dict, Tuple, Hashable, Iterable
+from uuid import UUID
+
+import numpy as np
+from pubsub import pub
+
+from src.app.model.bar import Bar
+from src.app.model.event import EventType, Event
+from src.app.model.event_store import EventStore, ACTIVE, TYPE_CODES
+from src.app.model.project_version import ProjectVersion
+from src.app.model.sequence import Sequence
+from src.app.model.track import Track
+from src.app.model.types import Preset
+from src.app.model.variant import Variant, Variants, VariantType
+from src.app.utils.logger import get_console_logger
+from src.app.utils.properties import NotificationMessage
+from src.app.utils.units import ppq2tick
+
+logger = get_console_logger(name=__name__, log_level=logging.INFO)
+
+
+class EventCode(IntEnum):
+    # Order matches EventType sort order within a bar (program, controls, pitch bend, note)
+    PROGRAM = 0
+    CONTROL = 1
+    PITCH_BEND = 2
+    NOTE = 3
+
+
+NO_PRESET = -1
+
+EVENT_DTYPE = np.dtype(
+    [
+        ("tick", np.int64),
+        ("type", np.int8),
+        ("channel", np.int16),
+        ("pitch", np.int16),
+        ("velocity", np.int16),
+        ("duration", np.int32),
+        ("control", np.int16),
+        ("value", np.int32),
+        ("preset", np.int32),
+    ]
+)
+
+Row = Tuple[int, int, int, int, int, int, int, int, int]
+
+
+class PresetTable:
+    def __init__(self, presets: Optional[List[Preset]] = None):
+        self.presets: List[Preset] = []
+        self._index: Dict[Tuple[str, int, int], int] = {}
+        for preset in presets or []:
+            self.index(preset=preset)
+
+    def index(self, preset: Optional[Preset]) -> int:
+        if preset is None:
+            return NO_PRESET
+        key = (preset.sf_name, preset.bank, preset.patch)
+        if key not in self._index:
+            self._index[key] = len(self.presets)
+            self.presets.append(preset)
+        return self._index[key]
+
+
+class Timeline:
+    def __init__(self, events: np.ndarray, presets: List[Preset], bar_ticks: np.ndarray):
+        self.events = events
+        self.presets = presets
+        self.bar_ticks = bar_ticks
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __repr__(self) -> str:
+        return f"Timeline(events={len(self)}, bars={self.num_of_bars}, length={self.length})"
+
+    @property
+    def num_of_bars(self) -> int:
+        return len(self.bar_ticks) - 1
+
+    @property
+    def length(self) -> int:
+        return int(self.bar_ticks[-1])
+
+    def is_empty(self) -> bool:
+        return len(self.events) == 0
+
+    def bar_start(self, bar_num: int) -> int:
+        return int(self.bar_ticks[bar_num])
+
+    def bar_length(self, bar_num: int) -> int:
+        return int(self.bar_ticks[bar_num + 1] - self.bar_ticks[bar_num])
+
+    def slice(self, start_tick: int, end_tick: int) -> np.ndarray:
+        start, end = np.searchsorted(self.events["tick"], [start_tick, end_tick], side="left")
+        return self.events[start:end]
+
+    def bar(self, bar_num: int) -> np.ndarray:
+        if not 0 <= bar_num < self.num_of_bars:
+            raise ValueError(f"Bar number outside of range {bar_num} -> {self.num_of_bars}")
+        return self.slice(start_tick=self.bar_ticks[bar_num], end_tick=self.bar_ticks[bar_num + 1])
+
+    def preset(self, index: int) -> Optional[Preset]:
+        return None if index == NO_PRESET else self.presets[index]
+
+    @staticmethod
+    def _event_rows(event: Event, tick: int, preset_table: PresetTable) -> List[Row]:
+        match event.type:
+            case EventType.NOTE:
+                return [
+                    (
+                        tick,
+                        EventCode.NOTE,
+                        event.channel,
+                        int(event.pitch),
+                        event.velocity,
+                        ppq2tick(ticks=event.duration),
+                        0,
+                        0,
+                        preset_table.index(preset=event.preset),
+                    )
+                ]
+            case EventType.PROGRAM:
+                return [
+                    (tick, EventCode.PROGRAM, event.channel, 0, 0, 0, 0, 0, preset_table.index(preset=event.preset))
+                ]
+            case EventType.CONTROLS:
+                return [
+                    (tick, EventCode.CONTROL, event.channel, 0, 0, 0, control.class_.code, control.value, NO_PRESET)
+                    for control in event.controls
+                ]
+            case EventType.PITCH_BEND:
+                return [
+                    (tick + bend.time, EventCode.PITCH_BEND, event.channel, 0, 0, 0, 0, bend.value, NO_PRESET)
+                    for bend in event.pitch_bend_chain.__root__
+                ]
+            case _:
+                raise ValueError(f"Event type {event.type} not supported")
+
+    @classmethod
+    def from_rows(cls, rows: List[Row], presets: List[Preset], bar_ticks: np.ndarray) -> Timeline:
+        events = np.array(rows, dtype=EVENT_DTYPE)
+        order = np.lexsort((events["type"], events["tick"]))
+        return cls(events=events[order], presets=presets, bar_ticks=bar_ticks)
+
+    @classmethod
+    def from_sequence(cls, sequence: Sequence) -> Timeline:
+        return cls.from_bars(bars=[sequence.bars[bar_num] for bar_num in sorted(sequence.bars.keys())])
+
+    @classmethod
+    def from_bars(cls, bars: List[Bar]) -> Timeline:
+        # Ticks count quarter notes whatever the tempo, bpm only sets the sequencer time scale
+        preset_table = PresetTable()
+        rows: List[Row] = []
+        bar_ticks = [0]
+        for bar in bars:
+            bar_tick = bar_ticks[-1]
+            for event in bar.events():
+                if event.active:
+                    tick = bar_tick + ppq2tick(ticks=event.tick)
+                    rows.extend(cls._event_rows(event=event, tick=tick, preset_table=preset_table))
+            bar_ticks.append(bar_tick + ppq2tick(ticks=bar.length_ticks()))
+        return cls.from_rows(rows=rows, presets=preset_table.presets, bar_ticks=np.array(bar_ticks, dtype=np.int64))
+
+    @staticmethod
+    def sequence_bar_ticks(sequence: Sequence) -> np.ndarray:
+        lengths = (ppq2tick(ticks=sequence.bars[bar_num].length_ticks()) for bar_num in sorted(sequence.bars.keys()))
+        return np.array([0] + list(accumulate(lengths)), dtype=np.int64)
+
+    @classmethod
+    def from_store(cls, store: EventStore, bar_ticks: np.ndarray) -> Timeline:
+        # Notes and program changes are converted column-wise, controls and pitch bends come from side tables
+        columns = store.columns
+        active = (columns["flags"] & ACTIVE).astype(bool)
+        codes = columns["type"]
+        ticks = bar_ticks[columns["bar_num"]] + ppq2tick(ticks=columns["tick"].astype(np.int64))
+        simple = active & ((codes == TYPE_CODES[EventType.NOTE]) | (codes == TYPE_CODES[EventType.PROGRAM]))
+        events = np.zeros(np.count_nonzero(simple), dtype=EVENT_DTYPE)
+        events["tick"] = ticks[simple]
+        events["type"] = codes[simple]
+        for name in "channel", "pitch", "velocity", "preset":
+            events[name] = columns[name][simple]
+        is_note = events["type"] == EventCode.NOTE
+        events["duration"] = np.where(is_note, ppq2tick(ticks=columns["duration"][simple].astype(np.int64)), 0)
+        events["pitch"] = np.where(is_note, events["pitch"], 0)
+        events["velocity"] = np.where(is_note, events["velocity"], 0)
+        rows: List[Row] = []
+        for row, controls in store.controls.items():
+            if active[row]:
+                rows.extend(
+                    (
+                        ticks[row],
+                        EventCode.CONTROL,
+                        columns["channel"][row],
+                        0,
+                        0,
+                        0,
+                        control.class_.code,
+                        control.value,
+                        NO_PRESET,
+                    )
+                    for control in controls
+                )
+        for row, chain in store.pitch_bend_chains.items():
+            if active[row]:
+                rows.extend(
+                    (
+                        ticks[row] + bend.time,
+                        EventCode.PITCH_BEND,
+                        columns["channel"][row],
+                        0,
+                        0,
+                        0,
+                        0,
+                        bend.value,
+                        NO_PRESET,
+                    )
+                    for bend in chain.__root__
+                )
+        events = np.concatenate([events, np.array(rows, dtype=EVENT_DTYPE)])
+        order = np.lexsort((events["type"], events["tick"]))
+        return cls(events=events[order], presets=list(store.presets), bar_ticks=bar_ticks)
+
+    @classmethod
+    def concatenate(cls, timelines: List[Timeline]) -> Timeline:
+        if not timelines:
+            return cls.empty()
+        preset_table = PresetTable()
+        chunks = []
+        bar_ticks = [np.zeros(1, dtype=np.int64)]
+        offset = 0
+        for timeline in timelines:
+            chunk = timeline.events.copy()
+            chunk["tick"] += offset
+            if timeline.presets:
+                mapping = np.array([preset_table.index(preset=preset) for preset in timeline.presets], dtype=np.int32)
+                has_preset = chunk["preset"] != NO_PRESET
+                chunk["preset"][has_preset] = mapping[chunk["preset"][has_preset]]
+            chunks.append(chunk)
+            bar_ticks.append(timeline.bar_ticks[1:] + offset)
+            offset += timeline.length
+        return cls(events=np.concatenate(chunks), presets=preset_table.presets, bar_ticks=np.concatenate(bar_ticks))
+
+    @classmethod
+    def empty(cls) -> Timeline:
+        return cls(events=np.zeros(0, dtype=EVENT_DTYPE), presets=[], bar_ticks=np.zeros(1, dtype=np.int64))
+
+    @staticmethod
+    def play_order(project_version: ProjectVersion, start_variant_id: UUID, last_variant_id: Optional[UUID]) -> List:
+        variants = [project_version.get_variant(variant_id=start_variant_id)]
+        while variants[-1].id != last_variant_id and not project_version.is_last_variant(
+            variant_id=variants[-1].id, repeat=False
+        ):
+            variants.append(project_version.get_next_variant(variant_id=variants[-1].id, repeat=False))
+        return variants
+
+    @classmethod
+    def from_project_version(
+        cls,
+        project_version: ProjectVersion,
+        start_variant_id: UUID,
+        last_variant_id: Optional[UUID] = None,
+        track: Optional[Track] = None,
+        enabled_only: bool = False,
+    ) -> Timeline:
+        variants = cls.play_order(
+            project_version=project_version, start_variant_id=start_variant_id, last_variant_id=last_variant_id
+        )
+        timelines = []
+        for variant in variants:
+            # Compiled to columns, so presets are annotated without copying events
+            versions = project_version.get_compiled_versions(variant_id=variant.id, single_track=track)
+            timeline = cls.from_store(
+                store=EventStore.concatenate([version.get_store() for version in versions]),
+                bar_ticks=cls.sequence_bar_ticks(sequence=versions[0].sequence),
+            )
+            if track and enabled_only and not variant.is_track_enabled(track=track):
+                # Keep bar layout of the variant so that stems stay aligned with the full mix
+                timeline = cls(events=timeline.events[:0], presets=[], bar_ticks=timeline.bar_ticks)
+            timelines.append(timeline)
+        return cls.concatenate(timelines)
+
+
+class CompositionIndex:
+    def __init__(self, project_version: ProjectVersion, variants: Iterable[Variant]):
+        self.project_version = project_version
+        self.variants = variants
+        self.variant_ids: List[UUID] = []
+        # Bar start ticks within each variant, the last item being the variant length
+        self.variant_bar_ticks: List[List[int]] = []
+        self.bar_offsets: List[int] = [0]
+        self.tick_offsets: List[int] = [0]
+        for variant in variants:
+            self.insert(index=len(self.variant_ids), variant=variant)
+
+    def __len__(self) -> int:
+        return len(self.variant_ids)
+
+    @property
+    def num_of_bars(self) -> int:
+        return self.bar_offsets[-1]
+
+    @property
+    def length(self) -> int:
+        return self.tick_offsets[-1]
+
+    def _bar_ticks(self, variant: Variant) -> List[int]:
+        # Bar layout is read from the first track version, so nothing gets compiled
+        version = self.project_version.get_first_track_version_of_variant(variant=variant)
+        return [0] + list(accumulate(ppq2tick(ticks=bar.length_ticks()) for bar in version.sequence))
+
+    def _update_offsets(self, index: int):
+        del self.bar_offsets[index + 1 :]
+        del self.tick_offsets[index + 1 :]
+        for bar_ticks in self.variant_bar_ticks[index:]:
+            self.bar_offsets.append(self.bar_offsets[-1] + len(bar_ticks) - 1)
+            self.tick_offsets.append(self.tick_offsets[-1] + bar_ticks[-1])
+
+    def insert(self, index: int, variant: Variant):
+        self.variant_ids.insert(index, variant.id)
+        self.variant_bar_ticks.insert(index, self._bar_ticks(variant=variant))
+        self._update_offsets(index=index)
+
+    def remove(self, variant_id: UUID):
+        index = self.variant_index(variant_id=variant_id)
+        del self.variant_ids[index]
+        del self.variant_bar_ticks[index]
+        self._update_offsets(index=index)
+
+    def variant_index(self, variant_id: UUID) -> int:
+        return self.variant_ids.index(variant_id)
+
+    def last_index(self, variant_id: Optional[UUID] = None, last_variant_id: Optional[UUID] = None) -> int:
+        # Like the play order, playback runs to the end when the last variant does not follow the start one
+        start = 0 if variant_id is None else self.variant_index(variant_id=variant_id)
+        if last_variant_id is None or (last := self.variant_index(variant_id=last_variant_id)) < start:
+            return len(self) - 1
+        return last
+
+    def seek_bar(
+        self, bar_num: int, variant_id: Optional[UUID] = None, last_variant_id: Optional[UUID] = None
+    ) -> Tuple[UUID, int]:
+        if variant_id is not None:
+            bar_num += self.bar_offsets[self.variant_index(variant_id=variant_id)]
+        end = self.bar_offsets[self.last_index(variant_id=variant_id, last_variant_id=last_variant_id) + 1]
+        if not 0 <= bar_num < end:
+            raise ValueError(f"Bar number outside of range {bar_num} -> {end}")
+        index = bisect_right(self.bar_offsets, bar_num) - 1
+        return self.variant_ids[index], self.variant_bar_ticks[index][bar_num - self.bar_offsets[index]]
+
+    def seek_tick(
+        self, tick: int, variant_id: Optional[UUID] = None, last_variant_id: Optional[UUID] = None
+    ) -> Tuple[UUID, int]:
+        if variant_id is not None:
+            tick += self.tick_offsets[self.variant_index(variant_id=variant_id)]
+        end = self.tick_offsets[self.last_index(variant_id=variant_id, last_variant_id=last_variant_id) + 1]
+        if not 0 <= tick < end:
+            raise ValueError(f"Tick outside of range {tick} -> {end}")
+        index = bisect_right(self.tick_offsets, tick) - 1
+        return self.variant_ids[index], tick - self.tick_offsets[index]
+
+
+class TimelineCache:
+    INVALIDATING_MESSAGES = (
+        NotificationMessage.EVENT_ADDED,
+        NotificationMessage.EVENT_REMOVED,
+        NotificationMessage.EVENT_CHANGED,
+        NotificationMessage.EVENTS_CHANGED,
+        NotificationMessage.TRACK_ADDED,
+        NotificationMessage.TRACK_REMOVED,
+        NotificationMessage.TRACK_CHANGED,
+        NotificationMessage.TRACK_VERSION_ADDED,
+        NotificationMessage.TRACK_VERSION_REMOVED,
+        NotificationMessage.TRACK_VERSION_CHANGED,
+        NotificationMessage.PROJECT_VERSION_CHANGED,
+        NotificationMessage.PROJECT_VERSION_REMOVED,
+        NotificationMessage.COMPOSITION_VARIANT_ADDED,
+        NotificationMessage.COMPOSITION_VARIANT_REMOVED,
+    )
+    # Events do not change bar layout and composition variant changes are applied incrementally
+    INDEX_INVALIDATING_MESSAGES = (
+        NotificationMessage.TRACK_ADDED,
+        NotificationMessage.TRACK_REMOVED,
+        NotificationMessage.TRACK_CHANGED,
+        NotificationMessage.TRACK_VERSION_ADDED,
+        NotificationMessage.TRACK_VERSION_REMOVED,
+        NotificationMessage.TRACK_VERSION_CHANGED,
+        NotificationMessage.PROJECT_VERSION_CHANGED,
+        NotificationMessage.PROJECT_VERSION_REMOVED,
+    )
+
+    def __init__(self):
+        self._timelines: Dict[Hashable, Timeline] = {}
+        self._indexes: Dict[Hashable, CompositionIndex] = {}
+        self.hits = 0
+        self.misses = 0
+        # Listening on the root topic keeps message data specification of model topics untouched
+        pub.subscribe(self.on_message, pub.ALL_TOPICS)
+
+    def __len__(self) -> int:
+        return len(self._timelines)
+
+    def close(self):
+        # Owners die in reference cycles, so waiting for the weak reference to drop may be too late
+        if pub.isSubscribed(self.on_message, pub.ALL_TOPICS):
+            pub.unsubscribe(self.on_message, pub.ALL_TOPICS)
+
+    def on_message(self, topic=pub.AUTO_TOPIC, **kwargs):
+        match topic.getName():
+            case NotificationMessage.COMPOSITION_VARIANT_ADDED:
+                for composition_index in self._composition_indexes(variants=kwargs["variants"]):
+                    composition_index.insert(index=len(composition_index), variant=kwargs["variant"])
+            case NotificationMessage.COMPOSITION_VARIANT_REMOVED:
+                for composition_index in self._composition_indexes(variants=kwargs["variants"]):
+                    composition_index.remove(variant_id=kwargs["variant"].id)
+            case name if name in TimelineCache.INDEX_INVALIDATING_MESSAGES:
+                self._indexes.clear()
+        if topic.getName() in TimelineCache.INVALIDATING_MESSAGES:
+            self.invalidate()
+
+    def invalidate(self):
+        self._timelines.clear()
+
+    def _composition_indexes(self, variants: Variants) -> List[CompositionIndex]:
+        return [index for index in self._indexes.values() if index.variants is variants]
+
+    def index(self, project_version: ProjectVersion, variant_id: UUID) -> CompositionIndex:
+        # Ticks do not depend on the tempo, so one index serves any bpm
+        variant = project_version.get_variant(variant_id=variant_id)
+        if variant.type == VariantType.SINGLE:
+            key, variants = (project_version.id, variant.id), [variant]
+        else:
+            variants = project_version.get_variants(variant_id=variant_id)
+            key = (project_version.id, id(variants))
+        if (index := self._indexes.get(key)) is None:
+            index = self._indexes[key] = CompositionIndex(project_version=project_version, variants=variants)
+        return index
+
+    @staticmethod
+    def layout(project_version: ProjectVersion, start_variant_id: UUID, last_variant_id: Optional[UUID]) -> Tuple:
+        # Variant items and track version presets are edited in place without notifications,
+        # so they are part of the key instead of relying on invalidation
+        variants = Timeline.play_order(
+            project_version=project_version, start_variant_id=start_variant_id, last_variant_id=last_variant_id
+        )
+        layout = []
+        for variant in variants:
+            for item in variant:
+                track = project_version.tracks.get_track(identifier=item.track_id)
+                version = track.get_version(identifier=item.version_id)
+                layout.append(
+                    (
+                        variant.id,
+                        item.track_id,
+                        item.version_id,
+                        item.enabled,
+                        version.channel,
+                        version.sf_name,
+                        version.bank,
+                        version.patch,
+                        version.num_of_bars(),
+                    )
+                )
+        return tuple(layout)
+
+    def get(
+        self,
+        project_version: ProjectVersion,
+        start_variant_id: UUID,
+        last_variant_id: Optional[UUID] = None,
+        track: Optional[Track] = None,
+    ) -> Timeline:
+        key = (
+            project_version.id,
+            start_variant_id,
+            last_variant_id,
+            track.id if track else None,
+            self.layout(
+                project_version=project_version, start_variant_id=start_variant_id, last_variant_id=last_variant_id
+            ),
+        )
+        if (timeline := self._timelines.get(key)) is not None:
+            self.hits += 1
+            return timeline
+        self.misses += 1
+        timeline = Timeline.from_project_version(
+            project_version=project_version,
+            start_variant_id=start_variant_id,
+            last_variant_id=last_variant_id,
+            track=track,
+        )
+        logger.debug(f"Compiled {timeline}")
+        self._timelines[key] = timeline
+        return timeline
@@ -1,6 +1,5 @@
 from __future__ import annotations
 from enum import Enum
-from pathlib import Path
 from typing import Any, NamedTuple, TYPE_CHECKING, Optional, List
 
 from PySide6.QtGui import QIcon, QColor, QPalette
@@ -334,8 +333,8 @@ class PresetTab(QWidget):
         self.sf_list.clear()
         self.bank_list.clear()
         self.prog_list.clear()
-        for sf_path in self.config.mf.synth.sf_map.keys():
-            item = QListWidgetItem(Path(sf_path).name, self.sf_list)
+        for sf_path in self.config.mf.synth.sf_files:
+            item = QListWidgetItem(self.config.mf.synth.sf_registry.display_name(sf_name=sf_path), self.sf_list)
             item.setIcon(QIcon(":/icons/sf.png"))
             item.setData(Qt.UserRole, sf_path)
             self.sf_list.addItem(item)
@@ -348,7 +347,7 @@ class PresetTab(QWidget):
         self.bank_list.itemSelectionChanged.disconnect()
         if sfid == curr_sfid:
             self.bank_list.clear()
-            for bank in self.config.mf.synth.preset_map[sfid].keys():
+            for bank in self.config.mf.synth.sf_registry.banks[sfid].keys():
                 item = QListWidgetItem(str(bank), self.bank_list)
                 item.setData(Qt.UserRole, bank)
                 item.setIcon(QIcon(":/icons/bank.png"))
@@ -360,10 +359,10 @@ class PresetTab(QWidget):
         if bank == int(self.bank_list.currentItem().text()):
             self.prog_list.clear()
             # print('populate_programs', sfid, bank)
-            for patch, preset in self.config.mf.synth.preset_map[sfid][bank].items():
+            sf_name = self.config.mf.synth.sf_registry.sf_name(sfid=sfid)
+            for patch, preset in self.config.mf.synth.sf_registry.banks[sfid][bank].items():
                 item = QListWidgetItem(f"{str(patch)}: {preset}")
                 item.setIcon(QIcon(":/icons/preset.png"))
-                sf_name = self.config.mf.synth.sf_name(sfid=sfid)
                 item.setData(Qt.UserRole, Preset(sf_name=sf_name, bank=bank, patch=patch))
                 self.prog_list.addItem(item)
         self.prog_list.currentItemChanged.connect(self.on_prog_selected)
@@ -18,13 +18,14 @@ from src.app.gui.widgets import GraphicsView, Box
 from src.app.model.event import Event, EventType, Diff, EventDiff
 from src.app.model.meter import invert
 from src.app.model.midi_keyboard import BaseKeyboard
-from src.app.model.sequence import Sequence
+from src.app.model.sequence import ChangeSet, Sequence
 from src.app.model.serializer import model_to_string
 from src.app.model.track import TrackVersion
 from src.app.model.types import Channel
 from src.app.utils.logger import get_console_logger
 from src.app.utils.notification import register_listener
 from src.app.utils.properties import GuiAttr, KeyAttr, NotificationMessage, GridAttr, MidiAttr
+from src.app.utils.units import unit2ppq
 
 logger = get_console_logger(name=__name__, log_level=logging.INFO)
 
@@ -158,6 +159,7 @@ class BaseGridScene(QGraphicsScene):
             mapping={
                 NotificationMessage.EVENT_ADDED: self.add_node,
                 NotificationMessage.EVENT_REMOVED: self.remove_node,
+                NotificationMessage.EVENTS_CHANGED: self.update_nodes,
             }
         )
 
@@ -179,23 +181,22 @@ class BaseGridScene(QGraphicsScene):
     def set_event_position(self, event: Event, node: Node, x: int, user_defined: bool = False) -> Event:
         if node:
             event.bar_num = node.event.bar_num
-            event.beat = node.event.beat
+            event.tick = node.event.tick
         else:
             if user_defined:
                 x = self.round_to_grid_line(x)
             else:
                 x = self.round_to_cell(x)
-            beat_ratio, bar_num = modf(self.ratio(x))
-            beat = self.sequence.meter().unit_from_ratio(ratio=beat_ratio)
+            tick_ratio, bar_num = modf(self.ratio(x))
             event.bar_num = int(bar_num)
-            event.beat = beat
+            event.tick = self.sequence.meter().ticks_from_ratio(ratio=tick_ratio)
         return event
 
     def set_event_unit(self, event: Event, node: Node) -> Event:
         if node:
-            event.unit = node.event.unit
+            event.duration = node.event.duration
         else:
-            event.unit = self.note_length_func()
+            event.duration = unit2ppq(unit=self.note_length_func())
         return event
 
     def set_event_pitch(self, node: Node, y: int) -> Event:
@@ -224,8 +225,8 @@ class BaseGridScene(QGraphicsScene):
             if moving:
                 center = node.scenePos().x() + node.rect.width() / 2
                 dist = x - center
-                beat_diff_ratio, _ = modf(self.ratio(dist))
-                diff.beat_diff = meter.unit_from_ratio(ratio=beat_diff_ratio)
+                tick_diff_ratio, _ = modf(self.ratio(dist))
+                diff.tick_diff = meter.ticks_from_ratio(ratio=tick_diff_ratio)
                 key = self.keyboard.get_key_by_pos(position=y)
                 diff.pitch_diff = int(key.event()) - int(event) if key else None
             elif resizing:
@@ -233,12 +234,11 @@ class BaseGridScene(QGraphicsScene):
                     raise ValueError("Cannot resize when node is undefined")
                 node_right = node.mapToScene(node.rect.topRight())
                 min_unit_width = self.get_unit_width(unit=GuiAttr.GRID_MIN_UNIT)
-                unit_diff = x - node_right.x()
-                if abs(unit_diff) >= min_unit_width:
-                    unit_ratio = self.ratio(copysign(min_unit_width, unit_diff))
-                    unit_diff = meter.unit_from_ratio(ratio=unit_ratio)
-                    if meter.significant_value(unit=meter.add(value=event.unit, value_diff=unit_diff)):
-                        diff.unit_diff = unit_diff
+                x_diff = x - node_right.x()
+                if abs(x_diff) >= min_unit_width:
+                    duration_diff = int(copysign(meter.min_ticks(), x_diff))
+                    if meter.is_significant(ticks=event.duration + duration_diff):
+                        diff.duration_diff = duration_diff
             return EventDiff(event=event, diff=diff)
         return None
 
@@ -257,7 +257,7 @@ class BaseGridScene(QGraphicsScene):
 
     def event_to_point(self, event: Event) -> QPointF:
         x = event.bar_num * self.bar_width
-        ratio = self.sequence.meter().unit_ratio(unit=event.beat)
+        ratio = self.sequence.meter().tick_ratio(ticks=event.tick)
         x += ratio * self.bar_width
         x = self.round_to_cell(x)
         key = self.keyboard.get_key_by_event(event=event)
@@ -277,6 +277,17 @@ class BaseGridScene(QGraphicsScene):
             logger.debug(f"found events {found}")
             self.delete_nodes(meta_notes=found, hard_delete=True)
 
+    def update_nodes(self, sequence_id, changes: ChangeSet):
+        # Nodes are looked up in one pass over the scene instead of once per removed event
+        if sequence_id != id(self._sequence):
+            return
+        removed = {id(event) for event in changes.removed() if event.type in self.supported_event_types}
+        found = [node for node in self.nodes() if id(node.event) in removed]
+        if len(found) != len(removed):
+            raise ValueError(f"Found {len(found)} of {len(removed)} removed events in grid")
+        self.delete_nodes(meta_notes=found, hard_delete=True)
+        self._add_nodes(events=[event for event in changes.added() if event.type in self.supported_event_types])
+
     def remove_event(self, event: Event):
         self.sequence.remove_event(bar_num=event.bar_num, event=event)
         logger.debug(self.sequence)
@@ -356,6 +367,9 @@ class BaseGridScene(QGraphicsScene):
     def get_unit_width(self, unit: float) -> float:
         return invert(unit) * self.bar_width
 
+    def get_ticks_width(self, ticks: int) -> float:
+        return ticks / (4 * MidiAttr.PPQ) * self.bar_width
+
     # def set_grid_width_props(self):
     #     self.width_bar = self.grid_divider * KeyAttr.W_HEIGHT
     #     self.width_beat = (self.width_bar / self.numerator) * (self.grid_divider / self.denominator)
@@ -436,7 +450,7 @@ class BaseGridScene(QGraphicsScene):
                             self.selection.selecting = True
                             self.selection.start_pos = QPointF(pos)
                         case Qt.ShiftModifier:
-                            self.keyboard.get_key_by_pos(y).play_note()
+                            self.keyboard.get_key_by_pos(y).play_note(secs=MidiAttr.KEY_PLAY_TIME)
                         case Qt.ShiftModifier | Qt.ControlModifier:
                             raise NotImplementedError
                         case Qt.NoModifier:
@@ -455,7 +469,7 @@ class BaseGridScene(QGraphicsScene):
                             # )
                             if key and event:
                                 self.add_event(event=event)
-                                key.play_note_in_thread(secs=MidiAttr.KEY_PLAY_TIME)
+                                key.play_note(secs=MidiAttr.KEY_PLAY_TIME)
                 case Qt.RightButton:
                     for meta_node in self.nodes(pos):
                         self.remove_event(event=meta_node.event)
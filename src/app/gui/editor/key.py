@@ -1,9 +1,7 @@
 from __future__ import annotations
 
 import logging
-import threading
 from dataclasses import asdict
-from time import sleep
 from typing import Union, Optional
 
 from PySide6.QtCore import Qt, QPoint, QRect, QSize
@@ -131,24 +129,20 @@ class PianoKey(Key):
     def __str__(self):
         return str(self.note)
 
-    def play_note(self):
+    def play_note(self, secs: Optional[float] = None):
         preset = None
         if track_version := self.keyboard.track_version:
             preset = track_version.preset()
-        self.keyboard.synth.note_on(
-            channel=self.note.channel, pitch=int(self.note), velocity=MidiAttr.DEFAULT_VELOCITY, preset=preset
+        self.keyboard.synth.preview.note_on(
+            channel=self.note.channel,
+            pitch=int(self.note),
+            velocity=MidiAttr.DEFAULT_VELOCITY,
+            preset=preset,
+            secs=secs,
         )
 
-    def play_note_for_period(self, secs):
-        self.play_note()
-        sleep(secs)
-        self.stop_note()
-
-    def play_note_in_thread(self, secs):
-        threading.Thread(target=self.play_note_for_period, args=(secs,)).start()
-
     def stop_note(self):
-        self.keyboard.synth.noteoff(chan=self.note.channel, key=int(self.note))
+        self.keyboard.synth.preview.note_off(channel=self.note.channel, pitch=int(self.note))
 
     def mousePressEvent(self, event: QGraphicsSceneMouseEvent):
         super().mousePressEvent(event)
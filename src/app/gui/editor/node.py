@@ -62,8 +62,8 @@ class Node(QGraphicsItem):
         point = self.grid_scene.event_to_point(event=new_event)
         self.prepareGeometryChange()
         self.setPos(point)
-        if self._event is None or (self._event is not None and self._event.unit != new_event.unit):
-            self.rect.setWidth(self.grid_scene.get_unit_width(new_event.unit))
+        if self._event is None or (self._event is not None and self._event.duration != new_event.duration):
+            self.rect.setWidth(self.grid_scene.get_ticks_width(ticks=new_event.duration))
         self._event = new_event
 
     def paint(self, painter: QPainter, _, __=None):
@@ -96,7 +96,7 @@ class Node(QGraphicsItem):
         return f"{str(self.scenePos())} {str(self.event)}"
 
     def is_move_allowed(self, old_event: Event, new_event: Event) -> bool:
-        if new_event.beat != old_event.beat and GridAttr.MOVE_HORIZONTAL not in self.grid_attr:
+        if new_event.tick != old_event.tick and GridAttr.MOVE_HORIZONTAL not in self.grid_attr:
             return False
         old_key = self.grid_scene.keyboard.get_key_by_event(event=old_event)
         new_key = self.grid_scene.keyboard.get_key_by_event(event=new_event)
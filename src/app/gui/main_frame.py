@@ -14,6 +14,7 @@ from PySide6.QtWidgets import (
 )
 
 from src.app.backend.midway_synth import MidwaySynth
+from src.app.backend.profiles import DEFAULT_ENGINE_PROFILE
 from src.app.gui.project_control import ProjectControl, SequencerBox
 from src.app.gui.dialogs.generic_config import GenericConfigDlg, GenericConfig
 from src.app.gui.menu import MenuBar
@@ -29,7 +30,14 @@ from src.app.model.track import Track, TrackVersion
 from src.app.model.types import dict_diff, DictDiff
 from src.app.utils.logger import get_console_logger
 from src.app.utils.notification import register_listener
-from src.app.utils.properties import IniAttr, AppAttr, NotificationMessage, FileFilterAttr, StatusMessage
+from src.app.utils.properties import (
+    IniAttr,
+    AppAttr,
+    NotificationMessage,
+    FileFilterAttr,
+    StatusMessage,
+    EngineProfileName,
+)
 from src.app.utils.file_system import file_exists, save_file_dialog, open_file_dialog
 
 logger = get_console_logger(__name__)
@@ -39,7 +47,11 @@ class MainFrame(QMainWindow):
     def __init__(self, app: QApplication, config: QSettings):
         super().__init__()
         self.config = config
-        self.synth = MidwaySynth(mf=self, sf2_path=AppAttr.PATH_SF2)
+        self.synth = MidwaySynth(
+            mf=self,
+            sf2_path=AppAttr.PATH_SF2,
+            profile=self.get_engine_profile(config=config),
+        )
         self.status_bar = self.statusBar()
         self.app = app
         self.menu = MenuBar(self)
@@ -69,6 +81,7 @@ class MainFrame(QMainWindow):
     @project.setter
     def project(self, _project: Project):
         if _project is not None:
+            self.synth.prioritize_fonts(sf_names=_project.get_sf_names())
             self.project_control.project = _project
             self._project = _project
 
@@ -93,6 +106,15 @@ class MainFrame(QMainWindow):
         project.file_name = file_name
         self.project = project
 
+    @staticmethod
+    def get_engine_profile(config: QSettings) -> EngineProfileName:
+        name = config.value(IniAttr.ENGINE_PROFILE, DEFAULT_ENGINE_PROFILE)
+        try:
+            return EngineProfileName(name)
+        except ValueError:
+            logger.warning(f"Unknown engine profile {name!r} in config, using {DEFAULT_ENGINE_PROFILE.value}")
+            return DEFAULT_ENGINE_PROFILE
+
     def get_last_project_file_name(self) -> str:
         return self.config.value(IniAttr.PROJECT_FILE, "")
 
@@ -149,6 +171,7 @@ class MainFrame(QMainWindow):
     def save_config(self):
         self.config.setValue(IniAttr.MAIN_WINDOW_GEOMETRY, self.saveGeometry())
         self.config.setValue(IniAttr.PROJECT_FILE, self.project_file_name)
+        self.config.setValue(IniAttr.ENGINE_PROFILE, self.synth.profile.name.value)
 
     def ask_about_changes(self) -> QMessageBox.StandardButton:
         return QMessageBox.question(
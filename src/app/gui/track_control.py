@@ -67,6 +67,7 @@ class BaseTrackVersionControlTab(TrackVersionControlTab):
         self.track = track
         self.track_version = track_version
         self.piano_roll = self.create_piano_roll()
+        self.fonts_initialized = False
 
         self._font = FontBox(synth=self.synth)
         self.populate_font_combo()
@@ -151,6 +152,10 @@ class BaseTrackVersionControlTab(TrackVersionControlTab):
         return True
 
     def init_fonts(self):
+        # Called by the font loader once project fonts are in, unless they were already loaded on creation
+        if self.fonts_initialized:
+            return
+        self.fonts_initialized = True
         self.populate_font_combo()
         self._font.currentIndexChanged.connect(self.on_font_change)
         self.sf_name = self.track_version.sf_name
@@ -3,7 +3,6 @@ import logging
 import threading
 from enum import Enum, auto
 from functools import partial
-from pathlib import Path
 from typing import Optional, TYPE_CHECKING, Callable
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QPainter, QIcon, QAction
@@ -113,8 +112,9 @@ class FontBox(QComboBox):
         self.setEditable(False)
         self.setDuplicatesEnabled(False)
         self.clear()
-        for font in self.synth.sf_map.keys():
-            self.addItem(Path(font).name, font)
+        # Fonts not loaded yet are listed too and loaded when selected
+        for font in self.synth.sf_files:
+            self.addItem(self.synth.sf_registry.display_name(sf_name=font), font)
 
 
 class PresetBox(QComboBox):
@@ -124,14 +124,10 @@ class PresetBox(QComboBox):
 
     def populate_preset_combo(self, sfid: int):
         self.clear()
-        for bank in self.synth.preset_map[sfid]:
-            for patch in self.synth.preset_map[sfid][bank]:
-                sf_name = self.synth.sf_name(sfid=sfid)
-                preset = Preset(sf_name=sf_name, bank=bank, patch=patch)
-                preset_map = self.synth.preset_map
-                if sfid in preset_map and bank in preset_map[sfid] and patch in preset_map[sfid][bank]:
-                    preset_name = preset_map[sfid][bank][patch]
-                    self.addItem(f"{bank}:{patch} {preset_name}", preset)
+        sf_name = self.synth.sf_registry.sf_name(sfid=sfid)
+        for bank, patches in self.synth.sf_registry.banks[sfid].items():
+            for patch, preset_name in patches.items():
+                self.addItem(f"{bank}:{patch} {preset_name}", Preset(sf_name=sf_name, bank=bank, patch=patch))
 
 
 class DeriveTrackVersionBox(QWidget):
@@ -2,12 +2,15 @@ from __future__ import annotations
 
 import copy
 import logging
-from typing import List, Union, Optional, Iterator
+from bisect import bisect_left, bisect_right, insort
+from operator import attrgetter
+from typing import List, Union, Optional, Iterator, Dict, Tuple
 
-from pydantic import BaseModel, NonNegativeInt, NonNegativeFloat
+from pydantic import BaseModel, NonNegativeInt, NonNegativeFloat, PrivateAttr, validator
 
 from src.app.model.event import Event, EventType
-from src.app.model.meter import Meter, invert
+from src.app.model.meter import Meter
+from src.app.model.types import Tick
 from src.app.utils.exceptions import BeatOutsideOfBar
 from src.app.utils.logger import get_console_logger
 
@@ -15,11 +18,75 @@ logger = get_console_logger(name=__name__, log_level=logging.DEBUG)
 
 _notes = List[Union[Event, type(None)]]
 
+event_key = attrgetter("tick", "type")
+tick_key = attrgetter("tick")
+
+
+def overlaps(event: Event, other: Event) -> bool:
+    return (
+        event.tick < other.tick < event.tick + event.duration or other.tick < event.tick < other.tick + other.duration
+    )
+
+
+class PitchIndex:
+    """Notes of a bar by pitch, each lane sorted by tick"""
+
+    def __init__(self):
+        self.source: Optional[List[Event]] = None
+        self.lanes: Dict[int, List[Event]] = {}
+        # Upper bound of note duration in a lane, it limits how far back an overlapping note can start
+        self.max_durations: Dict[int, int] = {}
+
+    def __deepcopy__(self, memo) -> PitchIndex:
+        # Copied bars own copied events, so the index is rebuilt on the first query instead
+        return PitchIndex()
+
+    def is_current(self, events: List[Event]) -> bool:
+        return self.source is events
+
+    def invalidate(self):
+        self.source = None
+
+    def build(self, events: List[Event]):
+        self.source = events
+        self.lanes.clear()
+        self.max_durations.clear()
+        for event in events:
+            self.add(event=event)
+
+    def add(self, event: Event):
+        if event.type != EventType.NOTE:
+            return
+        insort(self.lanes.setdefault(event.pitch, []), event, key=tick_key)
+        self.max_durations[event.pitch] = max(self.max_durations.get(event.pitch, 0), event.duration)
+
+    def remove(self, event: Event):
+        if event.type != EventType.NOTE:
+            return
+        lane = self.lanes[event.pitch]
+        start = bisect_left(lane, event.tick, key=tick_key)
+        for index in range(start, bisect_right(lane, event.tick, key=tick_key)):
+            if lane[index] is event:
+                del lane[index]
+                return
+
+    def overlapping(self, event: Event) -> Iterator[Event]:
+        lane = self.lanes.get(event.pitch, [])
+        start = bisect_right(lane, event.tick - self.max_durations.get(event.pitch, 0), key=tick_key)
+        end = bisect_left(lane, event.tick + event.duration, key=tick_key)
+        return (other for other in lane[start:end] if overlaps(event=event, other=other))
+
 
 class Bar(BaseModel):
     meter: Meter = Meter()
     bar_num: Optional[NonNegativeInt]
+    # Sorted by (tick, type)
     bar: List[Event] = []
+    _pitches: PitchIndex = PrivateAttr(default_factory=PitchIndex)
+
+    @validator("bar")
+    def sort_events(cls, events: List[Event]) -> List[Event]:  # pylint: disable=no-self-argument
+        return sorted(events, key=event_key)
 
     def dbg(self) -> str:
         return str([e.dbg() for e in self.bar])
@@ -34,14 +101,32 @@ class Bar(BaseModel):
             return False
         return True
 
+    def key_range(self, event: Event) -> Tuple[int, int]:
+        key = event_key(event)
+        return bisect_left(self.bar, key, key=event_key), bisect_right(self.bar, key, key=event_key)
+
+    def equal_events(self, event: Event) -> List[Event]:
+        start, end = self.key_range(event=event)
+        return [e for e in self.bar[start:end] if e == event]
+
+    def pitch_index(self) -> PitchIndex:
+        if not self._pitches.is_current(events=self.bar):
+            self._pitches.build(events=self.bar)
+        return self._pitches
+
     def has_event(self, event: Event) -> bool:
-        found = [e for e in self.bar if e == event and not e.is_related(other=event)]
+        found = [e for e in self.equal_events(event=event) if not e.is_related(other=event)]
         if len(found) > 1:
             raise ValueError(f"Found more than one event {event.dbg()} in bar {self.dbg()}")
         return len(found) == 1
 
     def has_conflict(self, event: Event) -> bool:
-        return len([e for e in self.bar if e.has_conflict(other=event)]) > 0
+        if any(not e.is_related(other=event) for e in self.equal_events(event=event)):
+            return True
+        # Only notes have a length, other events conflict when equal
+        if event.type != EventType.NOTE:
+            return False
+        return any(not e.is_related(other=event) for e in self.pitch_index().overlapping(event=event))
 
     def __eq__(self, other):
         params = list(filter(lambda x: x is None, [self, other]))
@@ -68,40 +153,60 @@ class Bar(BaseModel):
     def length(self) -> NonNegativeFloat:
         return self.meter.length()
 
+    def length_ticks(self) -> Tick:
+        return self.meter.length_ticks()
+
+    def share(self) -> Bar:
+        # Own list of the same events, which are then never changed in place by the holder of either bar
+        return Bar.construct(meter=self.meter, bar_num=self.bar_num, bar=list(self.bar))
+
     def clear(self):
         self.bar.clear()
+        self._pitches.build(events=self.bar)
+
+    def check_tick(self, event: Event) -> None:
+        if not 0 <= event.tick < self.length_ticks():
+            raise BeatOutsideOfBar(f"Item outside of bar 0 <= {event.tick} < {self.length_ticks()}")
 
     def add_event(self, event: Event) -> None:
-        if not 0 <= invert(event.beat) < self.length():
-            raise BeatOutsideOfBar(f"Item outside of bar 0 <= {invert(event.beat)} <= {self.length()}")
-        if self.has_event(event=event):
-            pass
-            # if event.type == EventType.NOTE:
-            #     raise EventAlreadyExists(f"Event {event.dbg()} exists in bar {self.dbg()}")
-            # else:
-            #     logger.warning(f"Event {event.dbg()} already exists in bar {self.dbg()} skipping")
-            #     return
-        self.bar.append(event)
-        self.bar.sort(key=lambda e: (invert(e.beat), e.type))
+        self.check_tick(event=event)
+        insort(self.bar, event, key=event_key)
+        if self._pitches.is_current(events=self.bar):
+            self._pitches.add(event=event)
 
     def add_events(self, events: List[Event]):
+        # Checked before the bar changes, then sorted once. The sort is stable, so added events
+        # follow equal ones already in the bar like with insort
         for event in events:
-            self.add_event(event=event)
+            self.check_tick(event=event)
+        self.bar.extend(events)
+        self.bar.sort(key=event_key)
+        self._pitches.invalidate()
 
     def event_index(self, event: Event) -> int:
         """Index of note in bar list"""
-        return self.bar.index(event)
-
-    def remove_event(self, event: Event) -> None:
-        if not self.has_event(event=event):
+        start, end = self.key_range(event=event)
+        for index in range(start, end):
+            if self.bar[index] == event:
+                return index
+        raise ValueError(f"Event {event.dbg()} not found in bar {self.dbg()}")
+
+    def remove_event(self, event: Event) -> Event:
+        """Remove the event equal to the given one and return the instance held by the bar"""
+        # Matched by equality only, so a copy derived from the held event removes it too
+        start, end = self.key_range(event=event)
+        found = [index for index in range(start, end) if self.bar[index] == event]
+        if not found:
             raise ValueError(f"Event {event.dbg()} not found in bar {self.dbg()}")
-        count = len(self.bar)
-        self.bar = [e for e in self.bar if e != event]
-        if len(self.bar) != count - 1:
-            raise ValueError(f"Event {event.dbg()} was not removed from bar {self.dbg()}")
+        if len(found) > 1:
+            raise ValueError(f"Found more than one event {event.dbg()} in bar {self.dbg()}")
+        removed = self.bar.pop(found[0])
+        if self._pitches.is_current(events=self.bar):
+            self._pitches.remove(event=removed)
+        return removed
 
     def remove_events(self, events: Optional[List[Event]]) -> None:
-        for event in events:
+        for event in list(events):
             self.remove_event(event=event)
 
     def remove_events_by_type(self, event_type: EventType) -> None:
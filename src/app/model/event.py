@@ -4,13 +4,13 @@ from dataclasses import dataclass
 from enum import Enum
 from typing import Optional, List, Tuple
 
-from pydantic import BaseModel, NonNegativeFloat, NonNegativeInt, Field
+from pydantic import BaseModel, NonNegativeInt, Field, root_validator
 
 from src.app.mingus.containers.note import Note
 from src.app.model.control import Control, PitchBendChain
-from src.app.model.meter import invert
-from src.app.model.types import Unit, Channel, Beat, Pitch, MidiValue, Preset
+from src.app.model.types import Channel, Pitch, MidiValue, Preset, Tick
 from src.app.utils.properties import MidiAttr
+from src.app.utils.units import unit2ppq
 
 
 class EventType(str, Enum):
@@ -23,9 +23,10 @@ class EventType(str, Enum):
 class Event(BaseModel):
     type: EventType
     channel: Optional[Channel]
-    beat: Optional[Beat]
+    # Position in the bar and length, both in ticks of MidiAttr.PPQ per quarter note
+    tick: Optional[Tick]
     pitch: Optional[Pitch]
-    unit: Optional[NonNegativeFloat]
+    duration: Optional[Tick]
     velocity: Optional[MidiValue] = MidiAttr.DEFAULT_VELOCITY
     preset: Optional[Preset] = None
     controls: Optional[List[Control]]
@@ -34,9 +35,18 @@ class Event(BaseModel):
     bar_num: Optional[NonNegativeInt]
     parent_id: int = Field(None, exclude=True)
 
+    @root_validator(pre=True)
+    def convert_beat_and_unit(cls, values):  # pylint: disable=no-self-argument
+        # Projects saved before the tick timebase store inverted whole note fractions, also accepted when composing
+        if (beat := values.pop("beat", None)) is not None:
+            values.setdefault("tick", unit2ppq(unit=beat))
+        if (unit := values.pop("unit", None)) is not None:
+            values.setdefault("duration", unit2ppq(unit=unit))
+        return values
+
     def dbg(self) -> str:
         patch = self.preset.patch if self.preset else None
-        return f"b:{invert(self.beat)} p:{self.pitch} u:{self.unit} bar:{self.bar_num} patch:{patch}"
+        return f"t:{self.tick} p:{self.pitch} d:{self.duration} bar:{self.bar_num} patch:{patch}"
 
     def is_related(self, other) -> bool:
         if hasattr(self, "parent_id") and self.parent_id == id(other):  # pylint: disable=no-member
@@ -52,11 +62,12 @@ class Event(BaseModel):
             return True
         if self.type == other.type == EventType.NOTE and self.pitch != other.pitch:
             return False
-        if self.unit is not None and other.unit is not None:
-            return invert(self.beat) < invert(other.beat) < invert(self.beat) + (invert(self.unit)) or invert(
-                other.beat
-            ) < invert(self.beat) < invert(other.beat) + (invert(other.unit))
-        raise ValueError(f"Cannot compare units {self.unit} {other.unit}")
+        if self.duration is not None and other.duration is not None:
+            return (
+                self.tick < other.tick < self.tick + self.duration
+                or other.tick < self.tick < other.tick + other.duration
+            )
+        raise ValueError(f"Cannot compare durations {self.duration} {other.duration}")
 
     def is_the_same_note(self, other) -> bool:
         if self.type != EventType.NOTE or self.type != other.type:
@@ -75,12 +86,12 @@ class Event(BaseModel):
         return (
             self.type == other.type
             and self.channel == other.channel
-            and self.beat == other.beat
+            and self.tick == other.tick
             and (
                 self.type != EventType.NOTE
                 or (self.type == EventType.NOTE and self.pitch == other.pitch and self.bar_num == other.bar_num)
             )
-            and self.unit == other.unit
+            and self.duration == other.duration
         )
 
     def __int__(self) -> int:
@@ -97,12 +108,12 @@ class Event(BaseModel):
         return note
 
     @classmethod
-    def from_note(cls, note: Note, channel: Channel, beat: Beat, unit: Unit, velocity: MidiValue) -> Event:
+    def from_note(cls, note: Note, channel: Channel, tick: Tick, duration: Tick, velocity: MidiValue) -> Event:
         return Event(
             type=EventType.NOTE,
             channel=channel,
-            beat=beat,
-            unit=unit,
+            tick=tick,
+            duration=duration,
             pitch=int(note),
             velocity=velocity,
         )
@@ -113,9 +124,9 @@ PairOfEvents = Tuple[Event, Event]
 
 @dataclass
 class Diff:
-    beat_diff: Unit = 0
+    tick_diff: int = 0
     pitch_diff: int = 0
-    unit_diff: Unit = 0
+    duration_diff: int = 0
 
 
 @dataclass
@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from pydantic import parse_obj_as
+
+from src.app.model.bar import Bar
+from src.app.model.control import Control, PitchBendChain
+from src.app.model.event import Event, EventType
+from src.app.model.types import Json, Preset
+from src.app.utils.properties import MidiAttr
+from src.app.utils.units import unit2ppq
+
+# Stands for None in integer columns
+NONE = -1
+# Codes follow the order of events with the same tick in a bar
+EVENT_TYPES = sorted(EventType, key=lambda event_type: event_type.value)
+TYPE_CODES = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
+ACTIVE = 1
+
+COLUMNS = {
+    "tick": np.int32,
+    "duration": np.int32,
+    "pitch": np.int8,
+    "velocity": np.int8,
+    "channel": np.int16,
+    "type": np.int8,
+    "flags": np.uint8,
+    "bar_num": np.int32,
+    "preset": np.int32,
+}
+
+
+Row = Tuple[int, int, int, int, int, int, int, int, int]
+SideTableRow = Tuple[int, Optional[List[Control]], Optional[PitchBendChain]]
+BarEvent = Tuple[Optional[int], Event, Optional[Preset]]
+
+
+def nvl(value: Optional[int]) -> int:
+    return NONE if value is None else value
+
+
+def opt(value: int) -> Optional[int]:
+    return None if value == NONE else value
+
+
+class EventView:
+    """Read only event backed by a row of an event store"""
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store: EventStore, row: int):
+        self.store = store
+        self.row = row
+
+    def __repr__(self) -> str:
+        return f"EventView(row={self.row}, {self.to_event().dbg()})"
+
+    def _get(self, column: str) -> Optional[int]:
+        return opt(int(self.store.columns[column][self.row]))
+
+    @property
+    def type(self) -> EventType:
+        return EVENT_TYPES[self.store.columns["type"][self.row]]
+
+    @property
+    def tick(self) -> Optional[int]:
+        return self._get("tick")
+
+    @property
+    def duration(self) -> Optional[int]:
+        return self._get("duration")
+
+    @property
+    def pitch(self) -> Optional[int]:
+        return self._get("pitch")
+
+    @property
+    def velocity(self) -> Optional[int]:
+        return self._get("velocity")
+
+    @property
+    def channel(self) -> Optional[int]:
+        return self._get("channel")
+
+    @property
+    def bar_num(self) -> Optional[int]:
+        return self._get("bar_num")
+
+    @property
+    def active(self) -> bool:
+        return bool(self.store.columns["flags"][self.row] & ACTIVE)
+
+    @property
+    def preset(self) -> Optional[Preset]:
+        index = self.store.columns["preset"][self.row]
+        return None if index == NONE else self.store.presets[index]
+
+    @property
+    def controls(self) -> Optional[List[Control]]:
+        return self.store.controls.get(self.row)
+
+    @property
+    def pitch_bend_chain(self) -> Optional[PitchBendChain]:
+        return self.store.pitch_bend_chains.get(self.row)
+
+    def to_event(self) -> Event:
+        return Event(
+            type=self.type,
+            channel=self.channel,
+            tick=self.tick,
+            pitch=self.pitch,
+            duration=self.duration,
+            velocity=self.velocity,
+            preset=self.preset,
+            controls=self.controls,
+            pitch_bend_chain=self.pitch_bend_chain,
+            active=self.active,
+            bar_num=self.bar_num,
+        )
+
+
+class EventStore:
+    """Events as NumPy columns, presets, controls and pitch bend chains in side tables"""
+
+    def __init__(self):
+        self.columns: Dict[str, np.ndarray] = {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.presets: List[Preset] = []
+        # Keyed by row
+        self.controls: Dict[int, List[Control]] = {}
+        self.pitch_bend_chains: Dict[int, PitchBendChain] = {}
+        self._preset_index: Dict[Tuple[str, int, int], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.columns["tick"])
+
+    def __iter__(self) -> Iterator[EventView]:
+        return (EventView(store=self, row=row) for row in range(len(self)))
+
+    def __getitem__(self, row: int) -> EventView:
+        if not 0 <= row < len(self):
+            raise IndexError(f"Row outside of store {row} -> {len(self)}")
+        return EventView(store=self, row=row)
+
+    def __repr__(self) -> str:
+        return f"EventStore(events={len(self)}, presets={len(self.presets)}, nbytes={self.nbytes})"
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.nbytes for column in self.columns.values())
+
+    def preset_index(self, preset: Optional[Preset]) -> int:
+        if preset is None:
+            return NONE
+        key = preset.sf_name, preset.bank, preset.patch
+        if (index := self._preset_index.get(key)) is None:
+            index = self._preset_index[key] = len(self.presets)
+            self.presets.append(preset)
+        return index
+
+    def bar(self, bar_num: int) -> np.ndarray:
+        return np.flatnonzero(self.columns["bar_num"] == bar_num)
+
+    def events(self) -> Iterator[Event]:
+        return (view.to_event() for view in self)
+
+    def _fill(self, rows: List[Row], side_tables: List[SideTableRow]) -> EventStore:
+        if rows:
+            self.columns = {
+                name: np.array(values, dtype=dtype) for (name, dtype), values in zip(COLUMNS.items(), zip(*rows))
+            }
+        for row, controls, pitch_bend_chain in side_tables:
+            if controls is not None:
+                self.controls[row] = controls
+            if pitch_bend_chain is not None:
+                self.pitch_bend_chains[row] = pitch_bend_chain
+        return self
+
+    @classmethod
+    def from_bar_events(cls, bar_events: Iterable[BarEvent]) -> EventStore:
+        # The preset of each row is given apart from the event, so that annotating does not need a copy
+        store = cls()
+        rows = []
+        side_tables = []
+        for row, (bar_num, event, preset) in enumerate(bar_events):
+            rows.append(
+                (
+                    nvl(event.tick),
+                    nvl(event.duration),
+                    nvl(event.pitch),
+                    nvl(event.velocity),
+                    nvl(event.channel),
+                    TYPE_CODES[event.type],
+                    ACTIVE if event.active else 0,
+                    nvl(bar_num),
+                    store.preset_index(preset=preset),
+                )
+            )
+            if event.controls is not None or event.pitch_bend_chain is not None:
+                side_tables.append((row, event.controls, event.pitch_bend_chain))
+        return store._fill(rows=rows, side_tables=side_tables)
+
+    @classmethod
+    def from_events(cls, events: Iterable[Event]) -> EventStore:
+        return cls.from_bar_events((event.bar_num, event, event.preset) for event in events)
+
+    @classmethod
+    def from_bars(cls, bars: Iterable[Bar]) -> EventStore:
+        # Bar numbers are taken from bars as events added to a bar may not carry one
+        return cls.from_bar_events((bar.bar_num, event, event.preset) for bar in bars for event in bar)
+
+    @classmethod
+    def concatenate(cls, stores: List[EventStore]) -> EventStore:
+        result = cls()
+        offset = 0
+        preset_columns = []
+        for store in stores:
+            mapping = np.array(
+                [result.preset_index(preset=preset) for preset in store.presets] + [NONE], dtype=np.int32
+            )
+            # NONE indexes the last item of the mapping
+            preset_columns.append(mapping[store.columns["preset"]])
+            result.controls.update((row + offset, controls) for row, controls in store.controls.items())
+            result.pitch_bend_chains.update((row + offset, chain) for row, chain in store.pitch_bend_chains.items())
+            offset += len(store)
+        if stores:
+            result.columns = {name: np.concatenate([store.columns[name] for store in stores]) for name in COLUMNS}
+            result.columns["preset"] = np.concatenate(preset_columns)
+        return result
+
+    @classmethod
+    def from_dicts(cls, events: Iterable[Json]) -> EventStore:
+        # Reads serialized events without building models, only controls and pitch bend chains are parsed
+        store = cls()
+        rows = []
+        side_tables = []
+        for row, event in enumerate(events):
+            tick = event.get("tick")
+            if tick is None and (beat := event.get("beat")) is not None:
+                tick = unit2ppq(unit=beat)
+            duration = event.get("duration")
+            if duration is None and (unit := event.get("unit")) is not None:
+                duration = unit2ppq(unit=unit)
+            preset = event.get("preset")
+            rows.append(
+                (
+                    nvl(tick),
+                    nvl(duration),
+                    nvl(event.get("pitch")),
+                    nvl(event.get("velocity", MidiAttr.DEFAULT_VELOCITY)),
+                    nvl(event.get("channel")),
+                    TYPE_CODES[EventType(event["type"])],
+                    ACTIVE if event.get("active", True) else 0,
+                    nvl(event.get("bar_num")),
+                    store.preset_index(preset=None if preset is None else Preset(**preset)),
+                )
+            )
+            controls, pitch_bend_chain = event.get("controls"), event.get("pitch_bend_chain")
+            if controls is not None or pitch_bend_chain is not None:
+                side_tables.append(
+                    (
+                        row,
+                        None if controls is None else parse_obj_as(List[Control], controls),
+                        None if pitch_bend_chain is None else PitchBendChain.parse_obj(pitch_bend_chain),
+                    )
+                )
+        return store._fill(rows=rows, side_tables=side_tables)
+
+    def to_dicts(self) -> List[Json]:
+        return [view.to_event().dict(exclude_none=True) for view in self]
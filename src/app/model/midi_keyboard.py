@@ -55,10 +55,7 @@ class MidiKey:
     def event(self):
         raise NotImplementedError
 
-    def play_note(self):
-        pass
-
-    def play_note_in_thread(self, secs):
+    def play_note(self, secs: Optional[float] = None):
         pass
 
 
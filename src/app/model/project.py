@@ -88,6 +88,12 @@ class Project(BaseModel):
             result = result.union(version.get_reserved_channels())
         return result
 
+    def get_sf_names(self) -> Set[str]:
+        result = set()
+        for version in self.versions:
+            result = result.union(version.get_sf_names())
+        return result
+
 
 @all_args_not_none
 def reset_project(project: Project) -> Project:
@@ -1,8 +1,7 @@
 from __future__ import annotations
 
-import copy
 import logging
-from typing import Optional, Set
+from typing import Optional, Set, List
 from uuid import UUID, uuid4
 
 from pydantic import BaseModel, Field
@@ -93,7 +92,7 @@ class ProjectVersion(BaseModel):
             self.remove_track_version(track=track, track_version=track_version)
         return self
 
-    def _get_variants(self, variant_id: UUID) -> Variants:
+    def get_variants(self, variant_id: UUID) -> Variants:
         if any(variant.id == variant_id for variant in self.variants):
             return self.variants
         for composition in self.compositions:
@@ -105,27 +104,22 @@ class ProjectVersion(BaseModel):
         )
 
     def get_next_variant(self, variant_id: UUID, repeat: bool, raise_on_last: bool = False) -> Optional[Variant]:
-        variants = self._get_variants(variant_id=variant_id)
+        variants = self.get_variants(variant_id=variant_id)
         if raise_on_last and self.is_last_variant(variant_id=variant_id, repeat=repeat):
             raise OutOfVariants(f"{variant_id} {variants}")
         return variants.get_next_variant(variant_id=variant_id, repeat=repeat)
 
     def is_last_variant(self, variant_id: UUID, repeat: bool) -> bool:
-        variants = self._get_variants(variant_id=variant_id)
+        variants = self.get_variants(variant_id=variant_id)
         return variants.is_last_variant(variant_id=variant_id, repeat=repeat)
 
     def get_variant(self, variant_id: UUID) -> Variant:
-        variants = self._get_variants(variant_id=variant_id)
+        variants = self.get_variants(variant_id=variant_id)
         return variants.get_variant(variant_id=variant_id)
 
-    def _get_compiled_sequence(self, variant_id: UUID, track: Track, include_preset: bool = True) -> Sequence:
-        variant = self.get_variant(variant_id=variant_id)
-        version_id = variant.get_track_variant_item(track=track).version_id
-        return track.get_version(identifier=version_id).get_sequence(include_preset=include_preset)
-
-    def get_compiled_sequence(
-        self, variant_id: UUID, single_track: Track = None, include_preset: bool = True, raise_not_found: bool = True
-    ) -> Sequence:
+    def get_compiled_versions(
+        self, variant_id: UUID, single_track: Track = None, raise_not_found: bool = True
+    ) -> List[TrackVersion]:
         variant = self.get_variant(variant_id=variant_id)
         if single_track:
             tracks = [single_track]
@@ -133,25 +127,35 @@ class ProjectVersion(BaseModel):
             tracks = [track for track in self.tracks if track.id in variant.get_enabled_tracks_ids()]
         if raise_not_found and not tracks:
             raise NoItemSelected(f"No tracks selected in current variant {variant.name}")
+        return [
+            track.get_version(identifier=variant.get_track_variant_item(track=track).version_id) for track in tracks
+        ]
+
+    def get_compiled_sequence(
+        self, variant_id: UUID, single_track: Track = None, include_preset: bool = True, raise_not_found: bool = True
+    ) -> Sequence:
+        versions = self.get_compiled_versions(
+            variant_id=variant_id, single_track=single_track, raise_not_found=raise_not_found
+        )
         sequence = None
-        if tracks:
-            sequence = copy.deepcopy(
-                self._get_compiled_sequence(variant_id=variant_id, track=tracks.pop(0), include_preset=include_preset)
-            )
-            for track in tracks:
-                sequence += copy.deepcopy(
-                    self._get_compiled_sequence(variant_id=variant_id, track=track, include_preset=include_preset)
-                )
+        if versions:
+            # Only bar lists are copied, events are shared with the track versions and merged as they are
+            sequence = versions[0].get_sequence(include_preset=include_preset).share()
+            for version in versions[1:]:
+                sequence += version.get_sequence(include_preset=include_preset)
         return sequence
 
+    def get_first_track_version_of_variant(self, variant: Variant) -> TrackVersion:
+        track = self.tracks.get_track(identifier=variant.get_first_track_id())
+        return track.get_version(identifier=variant.get_track_variant_item(track=track).version_id)
+
     def get_total_num_of_bars(self, variant_id: UUID) -> int:
         variant = self.get_variant(variant_id=variant_id)
-        variants = self._get_variants(variant_id=variant_id)
-        track = self.tracks.get_track(identifier=variant.get_first_track_id())
         if variant.type == VariantType.SINGLE:
-            return self.get_compiled_sequence(variant_id=variant_id, single_track=track).num_of_bars()
+            return self.get_first_track_version_of_variant(variant=variant).num_of_bars()
         return sum(
-            self.get_compiled_sequence(variant_id=variant.id, single_track=track).num_of_bars() for variant in variants
+            self.get_first_track_version_of_variant(variant=variant).num_of_bars()
+            for variant in self.get_variants(variant_id=variant_id)
         )
 
     def add_single_variant(self, name: str, selected: bool, enable_all_tracks: bool) -> Variant:
@@ -176,9 +180,27 @@ class ProjectVersion(BaseModel):
             selected=selected,
             enable_all_tracks=enable_all_tracks,
         )
-        self.compositions.get_by_name(name=composition_name).variants.add_variant(variant=variant)
+        variants = self.compositions.get_by_name(name=composition_name).variants
+        variants.add_variant(variant=variant)
+        notify(
+            message=NotificationMessage.COMPOSITION_VARIANT_ADDED,
+            project_version=self,
+            variants=variants,
+            variant=variant,
+        )
         return variant
 
+    def remove_composition_variant(self, composition_name: str, variant: Variant) -> ProjectVersion:
+        variants = self.compositions.get_by_name(name=composition_name).variants
+        variants.remove_variant(variant=variant)
+        notify(
+            message=NotificationMessage.COMPOSITION_VARIANT_REMOVED,
+            project_version=self,
+            variants=variants,
+            variant=variant,
+        )
+        return self
+
     @classmethod
     def init_from_tracks(cls, name: str, bpm: Bpm, tracks: Tracks, add_to_composition: bool = True) -> ProjectVersion:
         project_version = cls(name=name, bpm=bpm, tracks=tracks)
@@ -196,6 +218,9 @@ class ProjectVersion(BaseModel):
     def get_reserved_channels(self) -> Set[Channel]:
         return get_reserved_channels(project_version=self)
 
+    def get_sf_names(self) -> Set[str]:
+        return {track_version.sf_name for track in self.tracks for track_version in track.versions}
+
     def get_first_track_version(self, track: Optional[Track]):
         if track is None:
             track: Track = get_one(data=list(self.tracks), raise_on_empty=True, raise_on_multiple=False)
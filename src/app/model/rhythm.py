@@ -4,14 +4,14 @@ from enum import Enum
 from logging import INFO
 from typing import Optional, List
 
-import numpy as np
 from pydantic import NonNegativeInt, BaseModel, PositiveInt, NonNegativeFloat
 
 from src.app.model.bar import Bar
 from src.app.model.event import Event, EventType
-from src.app.model.meter import Meter, invert
+from src.app.model.meter import Meter
 from src.app.model.types import NoteUnit, MidiValue
 from src.app.utils.logger import get_console_logger
+from src.app.utils.units import unit2ppq
 
 logger = get_console_logger(name=__name__, log_level=INFO)
 
@@ -125,11 +125,10 @@ class Rhythm:
         note_duration: NoteUnit = None,
         bar_num: NonNegativeInt = None,
     ) -> Bar:
-        beat_step = self.meter.length() / note_unit
-        timeline = np.arange(0.0, self.meter.length(), beat_step)
+        timeline = range(0, self.meter.length_ticks(), unit2ppq(unit=note_unit))
         logger.debug(f"timeline {timeline}")
-        note_duration = note_duration or note_unit
-        notes = [Event(type=EventType.NOTE, beat=invert(beat), unit=note_duration) for beat in timeline]
+        duration = unit2ppq(unit=note_duration or note_unit)
+        notes = [Event(type=EventType.NOTE, tick=tick, duration=duration) for tick in timeline]
         logger.debug(f"notes {notes}")
         bar = Bar(meter=self.meter, bar_num=bar_num)
         bar.add_events(events=notes)
@@ -1,14 +1,17 @@
 from __future__ import annotations
 
 import logging
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from typing import Dict, Union, Optional, List, Any, Iterator
 
 from pubsub import pub
-from pydantic import PositiveInt, BaseModel, NonNegativeInt
+from pydantic import PositiveInt, BaseModel, NonNegativeInt, PrivateAttr
 
 from src.app.model.bar import Bar
 from src.app.model.event import Event, EventType, Diff, PairOfEvents
-from src.app.model.meter import Meter, invert
+from src.app.model.event_store import EventStore
+from src.app.model.meter import Meter
 from src.app.model.midi_keyboard import MidiRange
 from src.app.model.types import BarNum
 from src.app.utils.logger import get_console_logger
@@ -19,8 +22,36 @@ logger = get_console_logger(name=__name__, log_level=logging.DEBUG)
 _bars = Dict[BarNum, Union[Bar, type(None)]]
 
 
+@dataclass(slots=True)
+class BarChanges:
+    added: List[Event] = field(default_factory=list)
+    removed: List[Event] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class ChangeSet:
+    bars: Dict[BarNum, BarChanges] = field(default_factory=dict)
+
+    def __bool__(self) -> bool:
+        return any(changes.added or changes.removed for changes in self.bars.values())
+
+    def bar(self, bar_num: BarNum) -> BarChanges:
+        return self.bars.setdefault(bar_num, BarChanges())
+
+    def added(self) -> Iterator[Event]:
+        return (event for changes in self.bars.values() for event in changes.added)
+
+    def removed(self) -> Iterator[Event]:
+        return (event for changes in self.bars.values() for event in changes.removed)
+
+    def changed_bars(self) -> List[BarNum]:
+        return sorted(bar_num for bar_num, changes in self.bars.items() if changes.added or changes.removed)
+
+
 class Sequence(BaseModel):
     bars: Dict[int, Bar] = {}
+    # Pending changes of the open batch
+    _changes: Optional[ChangeSet] = PrivateAttr(default=None)
 
     def is_empty(self) -> bool:
         for bar in self.bars.values():
@@ -76,16 +107,18 @@ class Sequence(BaseModel):
         events = from_bar.events(deep_copy=True)
         for event in events:
             event.bar_num = to_bar_num
-        self.clear_bar(bar_num=to_bar_num)
-        self.add_events(bar_num=to_bar_num, events=events)
+        with self.batch():
+            self.clear_bar(bar_num=to_bar_num)
+            self.add_events(bar_num=to_bar_num, events=events)
 
     def copy_to_next_bar(self, bar_num: BarNum):
         self.copy_bar_from_to(from_bar_num=bar_num, to_bar_num=bar_num + 1)
 
     def copy_to_rest_bars(self, bar_num: BarNum):
         rest_of_bars = [k for k, v in self.bars.items() if k > bar_num]
-        for to_bar_num in rest_of_bars:
-            self.copy_bar_from_to(from_bar_num=bar_num, to_bar_num=to_bar_num)
+        with self.batch():
+            for to_bar_num in rest_of_bars:
+                self.copy_bar_from_to(from_bar_num=bar_num, to_bar_num=to_bar_num)
 
     def set_num_of_bars(self, value):
         if value <= 0:
@@ -117,8 +150,49 @@ class Sequence(BaseModel):
             raise ValueError(f"Bar number outside of range {bar_num} -> {self.num_of_bars()}")
         return self.bars[bar_num].event_index(event=event)
 
+    @contextmanager
+    def batch(self) -> Iterator[ChangeSet]:
+        """Groups edits into one change set, sent in a single EVENTS_CHANGED message when the outermost batch ends.
+        Added events are checked and sorted into bars at that point, so they are not visible in the batch.
+        Nothing is applied or sent when the batch raises"""
+        if self._changes is not None:
+            yield self._changes
+            return
+        changes = self._changes = ChangeSet()
+        try:
+            yield changes
+        except BaseException:
+            self._changes = None
+            self._rollback(changes=changes)
+            raise
+        self._changes = None
+        self._commit(changes=changes)
+
+    def _commit(self, changes: ChangeSet):
+        try:
+            for bar_num, bar_changes in changes.bars.items():
+                for event in bar_changes.added:
+                    self.bars[bar_num].check_tick(event=event)
+        except BaseException:
+            self._rollback(changes=changes)
+            raise
+        for bar_num, bar_changes in changes.bars.items():
+            if bar_changes.added:
+                self.bars[bar_num].add_events(events=bar_changes.added)
+        if changes:
+            pub.sendMessage(topicName=NotificationMessage.EVENTS_CHANGED, sequence_id=id(self), changes=changes)
+
+    def _rollback(self, changes: ChangeSet):
+        # Added events were never applied, removed ones are put back
+        for bar_num, bar_changes in changes.bars.items():
+            if bar_changes.removed:
+                self.bars[bar_num].add_events(events=bar_changes.removed)
+
     def add_event(self, bar_num: NonNegativeInt, event: Event, callback: bool = True) -> None:
         if bar_num in self.bars.keys():
+            if self._changes is not None:
+                self._changes.bar(bar_num=bar_num).added.append(event)
+                return
             self.bars[bar_num] += event
             if callback:
                 pub.sendMessage(
@@ -130,31 +204,46 @@ class Sequence(BaseModel):
             raise ValueError(f"Bar number outside of range {bar_num} -> {self.num_of_bars()}")
 
     def add_events(self, bar_num: NonNegativeInt, events: List[Event]):
-        for event in events:
-            self.add_event(bar_num=bar_num, event=event)
+        with self.batch():
+            for event in events:
+                self.add_event(bar_num=bar_num, event=event)
 
     def remove_event(self, bar_num: NonNegativeInt, event: Event, callback: bool = True) -> None:
         if bar_num not in self.bars.keys():
             raise ValueError(f"Bar number outside of range {bar_num} -> {self.num_of_bars()}")
-        self.bars[bar_num].remove_event(event=event)
+        if self._changes is not None:
+            bar_changes = self._changes.bar(bar_num=bar_num)
+            # An event added in the same batch is dropped before it reaches the bar
+            pending = [index for index, added in enumerate(bar_changes.added) if added == event]
+            if pending:
+                del bar_changes.added[pending[0]]
+                return
+            # The held instance is recorded, as listeners match it by identity
+            bar_changes.removed.append(self.bars[bar_num].remove_event(event=event))
+            return
+        removed = self.bars[bar_num].remove_event(event=event)
         if callback:
             pub.sendMessage(
                 topicName=NotificationMessage.EVENT_REMOVED,
                 sequence_id=id(self),
-                event=event,
+                event=removed,
             )
 
     def remove_events(self, bar_num: Optional[BarNum], events: Optional[List[Event]]) -> None:
-        # self.bars[bar_num].remove_events(events=events)
         if bar_num is not None:
             bars = [bar_num]
         else:
-            bars = self.bars.keys()
-        for _bar_num in bars:
-            if events is None:
-                events = self.bars[_bar_num].events()
-            for event in events:
-                self.remove_event(bar_num=_bar_num, event=event)
+            bars = list(self.bars.keys())
+        with self.batch() as changes:
+            for _bar_num in bars:
+                if events is None:
+                    bar_changes = changes.bar(bar_num=_bar_num)
+                    bar_changes.added.clear()
+                    bar_changes.removed.extend(self.bars[_bar_num].events())
+                    self.bars[_bar_num].clear()
+                else:
+                    for event in events:
+                        self.remove_event(bar_num=_bar_num, event=event)
 
     def clear_bar(self, bar_num: BarNum):
         self.remove_events(bar_num=bar_num, events=None)
@@ -217,6 +306,19 @@ class Sequence(BaseModel):
             meter = Meter()
         return cls.from_bars([Bar(meter=meter, bar_num=bar_num) for bar_num in range(num_of_bars)])
 
+    @classmethod
+    def from_store(cls, store: EventStore, num_of_bars: PositiveInt, meter: Meter = None) -> Sequence:
+        sequence = cls.from_num_of_bars(num_of_bars=num_of_bars, meter=meter)
+        for view in store:
+            sequence.bars[view.bar_num].add_event(event=view.to_event())
+        return sequence
+
+    def share(self) -> Sequence:
+        return Sequence.construct(bars={bar_num: bar.share() for bar_num, bar in self.bars.items()})
+
+    def to_store(self) -> EventStore:
+        return EventStore.from_bars(bars=(self.bars[bar_num] for bar_num in sorted(self.bars.keys())))
+
     @staticmethod
     def set_events_attr(events: List[Event], attr_val_map: Dict[str, Any]):
         for event in events:
@@ -236,27 +338,28 @@ class Sequence(BaseModel):
             event.pitch += diff.pitch_diff
         else:
             return None
-        # beat
-        if meter.significant_value(unit=diff.beat_diff):
-            moved_beat = meter.add(value=event.beat, value_diff=diff.beat_diff)
-            if meter.exceeds_length(unit=moved_beat):
+        # tick
+        length = meter.length_ticks()
+        if meter.is_significant(ticks=diff.tick_diff):
+            moved_tick = event.tick + diff.tick_diff
+            if meter.exceeds_length(ticks=moved_tick):
                 if old_event.bar_num + 1 < self.num_of_bars():
                     event.bar_num = old_event.bar_num + 1
-                    event.beat = meter.bar_remainder(unit=moved_beat)
+                    event.tick = moved_tick - length
                 else:
                     return None
-            elif moved_beat < 0:
+            elif moved_tick < 0:
                 if old_event.bar_num - 1 >= 0:
                     event.bar_num = old_event.bar_num - 1
-                    event.beat = meter.bar_remainder(unit=moved_beat)
+                    event.tick = moved_tick + length
                 else:
                     return None
             else:
-                event.beat = moved_beat
-        # unit
-        if meter.significant_value(unit=diff.unit_diff):
-            event.unit = meter.add(value=old_event.unit, value_diff=diff.unit_diff)
-        if invert(meter.add(value=event.unit, value_diff=event.beat)) > self.num_of_bars() * meter.length():
+                event.tick = moved_tick
+        # duration
+        if meter.is_significant(ticks=diff.duration_diff):
+            event.duration = old_event.duration + diff.duration_diff
+        if event.bar_num * length + event.tick + event.duration > self.num_of_bars() * length:
             return None
         if self.has_event(event=event):
             return None
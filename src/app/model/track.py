@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import copy
 from collections.abc import Iterator
 from typing import List, Optional
 from uuid import UUID, uuid4
@@ -9,6 +8,7 @@ from pydantic import BaseModel, PositiveInt, Field
 
 from src.app.model.bar import Bar
 from src.app.model.event import EventType
+from src.app.model.event_store import BarEvent, EventStore
 from src.app.model.sequence import Sequence
 from src.app.model.types import Channel, MidiValue, MidiBankValue, get_one, TrackType, Preset, Id
 from src.app.utils.exceptions import DuplicatedName, NoDataFound
@@ -50,28 +50,35 @@ class TrackVersion(BaseModel):
             sequence=sequence,
         )
 
+    def compiled_events(self) -> Iterator[BarEvent]:
+        # Program changes are dropped and folded into the effective preset of the notes that follow
+        last_preset = None
+        for bar in list(self.sequence):
+            for event in bar.events():
+                match event.type:
+                    case EventType.NOTE:
+                        if last_preset is None:
+                            last_preset = self.preset()
+                        yield bar.bar_num, event, last_preset
+                    case EventType.PROGRAM:
+                        last_preset = event.preset
+                    case _:
+                        yield bar.bar_num, event, event.preset
+
     def get_sequence(self, include_preset: bool = True) -> Sequence:
         if include_preset:
-            last_preset = None
-            bars: List[Bar] = []
-            for old_bar in list(self.sequence):
-                new_bar: Bar = copy.deepcopy(old_bar)
-                new_bar.clear()
-                for event in old_bar.events(deep_copy=True):
-                    match event.type:
-                        case EventType.NOTE:
-                            if last_preset is None:
-                                last_preset = self.preset()
-                            event.preset = last_preset
-                            new_bar.add_event(event=event)
-                        case EventType.PROGRAM:
-                            last_preset = event.preset
-                        case _:
-                            new_bar.add_event(event=event)
-                bars.append(new_bar)
-            return Sequence.from_bars(bars=bars)
+            # Events are shared with the track version, only notes are copied to carry their preset
+            bars = {bar.bar_num: Bar.construct(meter=bar.meter, bar_num=bar.bar_num, bar=[]) for bar in self.sequence}
+            for bar_num, event, preset in self.compiled_events():
+                if event.preset is not preset:
+                    event = event.copy(update={"preset": preset})
+                bars[bar_num].bar.append(event)
+            return Sequence.from_bars(bars=list(bars.values()))
         return self.sequence
 
+    def get_store(self) -> EventStore:
+        return EventStore.from_bar_events(self.compiled_events())
+
 
 class RhythmTrackVersion(TrackVersion):
     channel: Channel = MidiAttr.DRUM_CHANNEL
@@ -25,6 +25,7 @@ Bpm = PositiveInt
 Unit = confloat(ge=0)
 Channel = conint(ge=0, le=255)
 Beat = confloat(ge=0)
+Tick = NonNegativeInt
 Pitch = conint(ge=Midi.MIN_C1, le=Midi.MAX_B9)
 MidiValue = NewType("MidiValue", conint(ge=Midi.MIN, le=Midi.MAX))
 MidiBankValue = NewType("MidiValue", conint(ge=Midi.MIN, le=Midi.MAX + 1))
@@ -31,6 +31,10 @@ class DuplicatedName(Exception):
     pass
 
 
+class RenderCancelled(Exception):
+    pass
+
+
 def fail(text: str):
     logger.critical(text)
     raise RuntimeError(text)
@@ -5,7 +5,7 @@ from pathlib import Path
 from typing import List, Optional
 
 from PySide6.QtGui import QColor, QPalette, Qt
-from pydantic import NonNegativeInt
+from pydantic import NonNegativeInt, PositiveInt
 
 from src.app.mingus.core import value
 from src.app.model.types import NoteUnit, Channel, Bpm
@@ -28,6 +28,7 @@ class NotificationMessage:
     EVENT_REMOVED = "EVENT_REMOVED"
     EVENT_CHANGED = "EVENT_CHANGED"
     EVENT_COPIED = "EVENT_COPIED"
+    EVENTS_CHANGED = "EVENTS_CHANGED"
 
     TRACK_ADDED = "TRACK_ADDED"
     TRACK_REMOVED = "TRACK_REMOVED"
@@ -45,6 +46,9 @@ class NotificationMessage:
     SINGLE_VARIANT_ADDED = "SINGLE_VARIANT_ADDED"
     SINGLE_VARIANT_REMOVED = "SINGLE_VARIANT_REMOVED"
 
+    COMPOSITION_VARIANT_ADDED = "COMPOSITION_VARIANT_ADDED"
+    COMPOSITION_VARIANT_REMOVED = "COMPOSITION_VARIANT_REMOVED"
+
     PLAY = "Play"
     STOP = "Stop"
 
@@ -56,6 +60,7 @@ class AppAttr:
     FOLDER_PROJECT = "projects"
     FOLDER_MIDI = "midi"
     FOLDER_AUDIO = "audio"
+    PRESET_INDEX_FILE = "preset_index.json"
     PATH_UTILS = os.path.dirname(os.path.abspath(__file__))
     PATH_APP = str(Path(PATH_UTILS).parent)
     PATH_SRC = str(Path(PATH_APP).parent)
@@ -65,6 +70,7 @@ class AppAttr:
     PATH_PROJECT = os.path.join(PATH_ROOT, FOLDER_PROJECT)
     PATH_MIDI = os.path.join(PATH_ROOT, FOLDER_MIDI)
     PATH_AUDIO = os.path.join(PATH_ROOT, FOLDER_AUDIO)
+    PATH_PRESET_INDEX = os.path.join(PATH_ROOT, PRESET_INDEX_FILE)
     os.environ["PATH"] += PATH_FS + ";"
     MIME_TYPE = APP_NAME
 
@@ -73,6 +79,8 @@ class MidiAttr:
     DRUM_CHANNEL = 9
     DRUM_BANK = 128
     TICKS_PER_BEAT = 96
+    # Resolution of event positions and lengths in the model, ticks per quarter note
+    PPQ = 960
     MAX_MIDI = 128
     MAX_CHANNEL = 256
     DEFAULT_SF2 = os.path.join(AppAttr.PATH_SF2, "FluidR3.sf2")
@@ -84,6 +92,19 @@ class MidiAttr:
     CHANNELS: List[Channel] = list(range(MAX_CHANNEL))
     DRIVER = "dsound"
     KEY_PLAY_TIME = 0.3
+    PREVIEW_VOICES = 8
+    LOOKAHEAD_MS = 200
+    REFILL_PERIOD_MS = 50
+    MAX_QUEUED_EVENTS = 4096
+    SILENCE_POLL_MS = 5
+    SILENCE_TIMEOUT_MS = 5000
+    SAMPLE_RATE = 44100
+    RENDER_BLOCK_FRAMES = 4096
+    RENDER_TAIL_SEC = 2.0
+    RENDER_AUDIO_GROUPS = 16
+    NORMALIZE_CEILING_DB = -1.0
+    RENDER_CACHE_BYTES = 2 * 1024**3
+    SF_MEMORY_BUDGET = 2 * 1024**3
 
 
 class GuiAttr:
@@ -145,7 +166,11 @@ class FileFilterAttr(str, Enum):
 class PlayOptions:
     bpm: Optional[Bpm] = None
     start_bar_num: NonNegativeInt = 0
+    start_tick: Optional[NonNegativeInt] = None
     repeat: bool = False
+    lookahead_ms: PositiveInt = MidiAttr.LOOKAHEAD_MS
+    refill_period_ms: PositiveInt = MidiAttr.REFILL_PERIOD_MS
+    max_queued_events: PositiveInt = MidiAttr.MAX_QUEUED_EVENTS
 
 
 class KeyAttr:
@@ -206,6 +231,7 @@ class IniAttr(str, Enum):
     DEFAULT_PROJECT = "default_project.json"
     MAIN_WINDOW_GEOMETRY = "main_window/geometry"
     EVENT_WIN_GEOMETRY = "event_window/geometry"
+    ENGINE_PROFILE = "synth/engine_profile"
 
 
 class VariantGridRowIndex(int, Enum):
@@ -214,9 +240,18 @@ class VariantGridRowIndex(int, Enum):
     TRACK_OFFSET = 2
 
 
-class StopMessage(str, Enum):
-    STOP = "Stop"
-    QUIT = "Quit"
+class EngineProfileName(str, Enum):
+    LOW_LATENCY = "Low latency editing"
+    BALANCED = "Balanced"
+    HIGH_POLYPHONY = "High polyphony playback"
+    OFFLINE = "Offline render"
+
+
+class TransportState(str, Enum):
+    IDLE = "Idle"
+    STARTING = "Starting"
+    PLAYING = "Playing"
+    STOPPING = "Stopping"
 
 
 class DrumPatch(int, Enum):
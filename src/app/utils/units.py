@@ -3,8 +3,7 @@ from typing import NamedTuple, Any
 from pydantic import NonNegativeInt
 
 from src.app.mingus.containers import Bar
-from src.app.model.meter import invert
-from src.app.model.types import Bpm, Unit, Beat
+from src.app.model.types import Bpm, Unit, Beat, Tick
 from src.app.utils.properties import MidiAttr
 
 
@@ -84,12 +83,12 @@ def unit2tick(unit: Unit, bpm: Bpm) -> int:
     return tick
 
 
-def bar_length2tick(bar: Bar, bpm: Bpm) -> int:
-    return unit2tick(unit=bar.length(), bpm=bpm)
+def bar_length2tick(bar: Bar) -> int:
+    return ppq2tick(ticks=bar.length_ticks())
 
 
 def bar_length2sec(bar: Bar, bpm: Bpm) -> float:
-    end_tick = bar_length2tick(bar=bar, bpm=bpm)
+    end_tick = bar_length2tick(bar=bar)
     return tick2second(
         tick=end_tick,
         ticks_per_beat=MidiAttr.TICKS_PER_BEAT,
@@ -98,16 +97,22 @@ def bar_length2sec(bar: Bar, bpm: Bpm) -> float:
 
 
 def beat2tick(beat: Beat, bpm: Bpm) -> int:
-    qn_length = 60.0 / float(bpm)
-    second = 4 * qn_length * invert(beat)
-    tick = round(
-        second2tick(
-            second=second,
-            ticks_per_beat=MidiAttr.TICKS_PER_BEAT,
-            tempo=bpm2tempo(bpm=bpm),
-        )
-    )
-    return tick
+    # Beats are inverted whole note fractions like units, so the conversion is the same
+    return unit2tick(unit=beat, bpm=bpm)
+
+
+def unit2ppq(unit: Unit) -> int:
+    # Inverted whole note fraction, 4 is a quarter note, to model ticks
+    return 0 if unit == 0 else round(4 * MidiAttr.PPQ / unit)
+
+
+def ppq2unit(ticks: int) -> Unit:
+    return 0 if ticks == 0 else 4 * MidiAttr.PPQ / ticks
+
+
+def ppq2tick(ticks: Tick) -> int:
+    # Model ticks to sequencer ticks, exact for every note value down to a 128th triplet
+    return ticks * MidiAttr.TICKS_PER_BEAT // MidiAttr.PPQ
 
 
 def bpm2time_scale(bpm: Bpm):
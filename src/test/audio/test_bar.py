@@ -76,7 +76,7 @@ def test_play_bar_changing_programs(bar_c_major, synth, bpm):
         prog_event = Event(
             type=EventType.PROGRAM,
             channel=0,
-            beat=event.beat,
+            tick=event.tick,
             preset=Preset(sf_name=MidiAttr.DEFAULT_SF2, bank=0, patch=index),
         )
         bar.add_events([prog_event, event])
@@ -86,7 +86,7 @@ def test_play_bar_changing_programs(bar_c_major, synth, bpm):
         prog_event = Event(
             type=EventType.PROGRAM,
             channel=0,
-            beat=event.beat,
+            tick=event.tick,
             preset=Preset(sf_name=MidiAttr.DEFAULT_SF2, bank=0, patch=index + 64),
         )
         bar.add_events([prog_event, event])
@@ -1,8 +1,10 @@
+from time import sleep
+
 from src.app.model.project_version import ProjectVersion
 
 from src.app.model.sequence import Sequence
 from src.app.model.track import TrackVersion, Track, Tracks
-from src.app.utils.properties import GuiAttr, MidiAttr
+from src.app.utils.properties import GuiAttr, MidiAttr, TransportState
 
 
 def test_play_single_variant(track_c_major, synth, bpm):
@@ -56,3 +58,15 @@ def test_play_compiled_sound_fonts(synth, bar_c_major_up, bar_c_major_down, bpm)
     print(compiled)
     synth.play(project_version=project_version, start_variant_id=project_version.variants.get_first_variant().id)
     synth.wait_to_the_end()
+
+
+def test_play_stop_transport(track_c_major, synth, bpm):
+    tracks = Tracks(__root__=[track_c_major])
+    project_version = ProjectVersion.init_from_tracks(name="test_play_stop_transport", bpm=bpm, tracks=tracks)
+    synth.play(project_version=project_version, start_variant_id=project_version.variants.get_first_variant().id)
+    assert synth.transport.state == TransportState.PLAYING
+    sleep(0.5)
+    synth.stop()
+    assert synth.transport.state == TransportState.IDLE
+    assert not synth.is_playing()
+    assert synth.transport.stop_latency is not None
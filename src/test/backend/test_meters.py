@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from src.app.backend.meters import LevelMeter, LevelReport, RenderMeters
+
+SAMPLE_RATE = 48000
+
+
+def sine(seconds: float, amplitude: float = 1.0) -> np.ndarray:
+    t = np.arange(round(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    wave = (amplitude * np.sin(2 * np.pi * 1000 * t)).astype(np.float32)
+    return np.stack([wave, wave], axis=1)
+
+
+@pytest.mark.parametrize("block_frames", [1000, 4096, 48000])
+def test_levels_of_sine(block_frames):
+    audio = sine(seconds=2.0, amplitude=0.5)
+    meter = LevelMeter(name="sine", sample_rate=SAMPLE_RATE)
+    for start in range(0, len(audio), block_frames):
+        meter.update(block=audio[start : start + block_frames])
+    levels = meter.levels()
+    assert levels.peak == pytest.approx(0.5, abs=1e-3)
+    assert levels.rms_db == pytest.approx(-6.02 - 3.01, abs=0.01)
+    # Two channels of mean square 0.125 each
+    assert levels.loudness == pytest.approx(-0.691 + 10 * np.log10(0.25), abs=0.01)
+    assert levels.clipped == 0
+
+
+def test_silence_is_gated():
+    meter = LevelMeter(name="silence", sample_rate=SAMPLE_RATE)
+    meter.update(block=np.zeros((SAMPLE_RATE, 2), dtype=np.float32))
+    assert meter.loudness == float("-inf")
+    assert LevelReport(master=meter.levels()).normalize(target=-14.0) == 1.0
+
+
+def test_normalize_respects_ceiling():
+    meter = LevelMeter(name="master", sample_rate=SAMPLE_RATE)
+    meter.update(block=sine(seconds=1.0, amplitude=0.1))
+    report = LevelReport(master=meter.levels())
+    assert report.normalize(target=-30.0, ceiling=-1.0) == pytest.approx(10 ** ((-30.0 - report.master.loudness) / 20))
+    assert report.normalize(target=0.0, ceiling=-1.0) * report.master.peak == pytest.approx(10 ** (-1 / 20))
+
+
+def test_render_meters():
+    meters = RenderMeters(sample_rate=SAMPLE_RATE, tracks={"lead": (0,), "bass": (2,), "pads": (3, 1)})
+    groups = np.zeros((4, 2, SAMPLE_RATE), dtype=np.float32)
+    groups[2] = sine(seconds=1.0, amplitude=1.5).T
+    groups[1] = groups[3] = sine(seconds=1.0, amplitude=0.25).T
+    meters.update(master=groups.sum(axis=0).T, groups=groups)
+    report = meters.report()
+    assert report.tracks["lead"].peak == 0
+    assert report.tracks["bass"].clipped > 0
+    assert report.tracks["pads"].peak == pytest.approx(0.5, rel=1e-3)
+    assert report.clipped == ["master", "bass"]
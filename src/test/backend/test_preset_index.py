@@ -0,0 +1,46 @@
+import pytest
+
+from src.app.backend.preset_index import PresetIndex
+
+PRESETS = [(0, 0, "Piano"), (0, 24, "Nylon Guitar"), (128, 0, "Standard")]
+
+
+@pytest.fixture(name="sound_font")
+def fixture_sound_font(tmp_path) -> str:
+    sound_font = tmp_path / "test.sf2"
+    sound_font.write_bytes(b"sf2")
+    return str(sound_font)
+
+
+def test_warm_start(sound_font, tmp_path):
+    file_name = str(tmp_path / "index.json")
+    calls = []
+
+    def enumerate_presets():
+        calls.append(sound_font)
+        return PRESETS
+
+    cold = PresetIndex(file_name=file_name)
+    assert cold.presets(sf_name=sound_font, enumerate_presets=enumerate_presets) == PRESETS
+    cold.save()
+    warm = PresetIndex(file_name=file_name)
+    assert len(warm) == 1
+    assert warm.presets(sf_name=sound_font, enumerate_presets=enumerate_presets) == PRESETS
+    assert len(calls) == 1
+    assert (warm.hits, warm.misses) == (1, 0)
+    assert not warm.dirty
+
+
+def test_changed_sound_font(sound_font, tmp_path):
+    index = PresetIndex(file_name=str(tmp_path / "index.json"))
+    index.put(sf_name=sound_font, presets=PRESETS, elapsed=0.1)
+    with open(sound_font, "ab") as file:
+        file.write(b"changed")
+    assert index.get(sf_name=sound_font) is None
+    assert index.misses == 1
+
+
+def test_corrupted_index(tmp_path):
+    file_name = tmp_path / "index.json"
+    file_name.write_text("{", encoding="utf-8")
+    assert len(PresetIndex(file_name=str(file_name))) == 0
@@ -0,0 +1,53 @@
+from src.app.backend.timeline import EventCode, Timeline
+from src.app.utils.units import bpm2time_scale
+
+
+def note_offs(synth):
+    return [call for call in synth.calls if call[0] == "noteoff"]
+
+
+def test_timed_preview(recording_synth):
+    preview = recording_synth.preview
+    preview.note_on(channel=0, pitch=60, secs=0.3)
+    preview.note_on(channel=0, pitch=62, secs=0.5)
+    assert preview.sounding() == 2
+    preview.sequencer.process(300)
+    assert note_offs(recording_synth) == [("noteoff", 0, 60)]
+    preview.sequencer.process(500)
+    assert note_offs(recording_synth) == [("noteoff", 0, 60), ("noteoff", 0, 62)]
+    assert preview.sounding() == 0
+
+
+def test_retriggered_note_is_not_cut(recording_synth):
+    preview = recording_synth.preview
+    preview.note_on(channel=0, pitch=60, secs=0.3)
+    preview.sequencer.process(200)
+    preview.note_on(channel=0, pitch=60, secs=0.3)
+    # The note-off of the first click is due, but belongs to a voice which was already replaced
+    preview.sequencer.process(300)
+    assert note_offs(recording_synth) == [("noteoff", 0, 60)]
+    assert preview.sounding() == 1
+    preview.sequencer.process(500)
+    assert preview.sounding() == 0
+
+
+def test_voice_limit(recording_synth):
+    preview = recording_synth.preview
+    preview.voices = 2
+    for pitch in (60, 62, 64, 65):
+        preview.note_on(channel=0, pitch=pitch)
+    preview.note_on(channel=1, pitch=60)
+    assert preview.stolen == 2
+    assert note_offs(recording_synth) == [("noteoff", 0, 60), ("noteoff", 0, 62)]
+    assert preview.sounding() == 3
+    preview.note_off(channel=0, pitch=64)
+    preview.stop()
+    assert preview.sounding() == 0
+
+
+def test_preview_timeline(recording_synth, bar_c_major, bpm):
+    timeline = Timeline.from_bars(bars=[bar_c_major])
+    recording_synth.preview.play_timeline(timeline=timeline, bpm=bpm)
+    notes = [event for event in recording_synth.preview.sequencer.scheduled if event.code == EventCode.NOTE]
+    scale = 1000 / bpm2time_scale(bpm=bpm)
+    assert [event.time for event in notes] == [round(tick * scale) for tick in timeline.events["tick"]]
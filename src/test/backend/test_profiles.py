@@ -0,0 +1,40 @@
+import os
+
+import pytest
+
+from src.app.backend.latency import measure_latency
+from src.app.backend.profiles import ENGINE_PROFILES
+from src.app.backend.synth import FLUIDSYNTH_AVAILABLE
+from src.app.utils.properties import EngineProfileName, MidiAttr
+
+
+def test_profiles_ordered_by_latency():
+    latencies = [
+        ENGINE_PROFILES[name].buffer_latency_ms(sample_rate=MidiAttr.SAMPLE_RATE) for name in EngineProfileName
+    ]
+    assert latencies == sorted(latencies)
+    assert ENGINE_PROFILES[EngineProfileName.LOW_LATENCY].buffer_latency_ms(sample_rate=48000) == 128 / 48
+    for name, profile in ENGINE_PROFILES.items():
+        assert profile.name == name
+        assert profile.period_size >= 64 and profile.periods >= 2
+
+
+def test_profile_settings():
+    settings = ENGINE_PROFILES[EngineProfileName.BALANCED].settings()
+    assert settings["audio.period-size"] == 256
+    assert settings["audio.periods"] == 2
+    assert settings["synth.polyphony"] == 256
+
+
+def test_recording_synth_keeps_profile(recording_synth):
+    assert recording_synth.profile is ENGINE_PROFILES[EngineProfileName.BALANCED]
+
+
+@pytest.mark.skipif(
+    not FLUIDSYNTH_AVAILABLE or not os.path.isfile(MidiAttr.DEFAULT_SF2), reason="needs fluidsynth and sound font"
+)
+def test_measure_latency():
+    report = measure_latency(profile=ENGINE_PROFILES[EngineProfileName.LOW_LATENCY])
+    assert report.buffer_ms == pytest.approx(1000 * 128 / MidiAttr.SAMPLE_RATE)
+    assert report.effective_ms > report.buffer_ms
+    assert report.voices > 0
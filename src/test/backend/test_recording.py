@@ -0,0 +1,178 @@
+from threading import Thread
+
+import pytest
+
+from src.app.backend.timeline import EventCode, Timeline
+from src.app.model.project_version import ProjectVersion
+from src.app.model.track import Tracks
+from src.app.utils.properties import PlayOptions, TransportState
+
+
+def play_to_the_end(synth, step_ms: int = 10, limit_ms: int = 60000):
+    sequencer = synth.player.event_provider().sequencer()
+    msec = 0
+    while synth.is_playing() and msec < limit_ms:
+        msec += step_ms
+        sequencer.process(msec)
+    return sequencer
+
+
+def test_recording_follows_timeline(recording_synth, track_c_major, bpm):
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_recording_follows_timeline", bpm=bpm, tracks=Tracks(__root__=[track_c_major])
+    )
+    variant_id = project_version.variants[0].id
+    recording_synth.play(project_version=project_version, start_variant_id=variant_id)
+    assert recording_synth.transport.state == TransportState.PLAYING
+    sequencer = play_to_the_end(synth=recording_synth)
+    assert recording_synth.transport.state == TransportState.IDLE
+    timeline = Timeline.from_project_version(project_version=project_version, start_variant_id=variant_id)
+    origin = sequencer.played[0].time - int(timeline.events["tick"][0])
+    notes = [event for event in sequencer.played if event.code == EventCode.NOTE]
+    expected = timeline.events[timeline.events["type"] == EventCode.NOTE]
+    assert [event.time - origin for event in notes] == expected["tick"].tolist()
+    assert [event.data[0] for event in notes] == expected["pitch"].tolist()
+    assert all(event.dest == sequencer.synth_seq_id for event in notes)
+    assert len(sequencer.callback_durations) == len(set(sequencer.timers))
+    assert len(recording_synth.player.metrics.durations) == len(sequencer.callback_durations)
+    assert recording_synth.player.metrics.lateness.max == 0
+    assert ("all_notes_off", -1) in recording_synth.calls
+
+
+def test_stop_removes_pending_events(recording_synth, track_c_major, bpm):
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_stop_removes_pending_events", bpm=bpm, tracks=Tracks(__root__=[track_c_major])
+    )
+    recording_synth.play(
+        project_version=project_version,
+        start_variant_id=project_version.variants[0].id,
+        options=PlayOptions(repeat=True),
+    )
+    sequencer = recording_synth.player.event_provider().sequencer()
+    sequencer.process(1000)
+    assert sequencer.pending()
+    recording_synth.stop()
+    assert not sequencer.pending()
+    assert sequencer.removed
+    played = len(sequencer.played)
+    sequencer.process(2000)
+    assert len(sequencer.played) == played
+
+
+def test_prefetch_worker(recording_synth, track_c_major, bpm):
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_prefetch_worker", bpm=bpm, tracks=Tracks(__root__=[track_c_major])
+    )
+    recording_synth.PREFETCH_IN_THREAD = True
+    recording_synth.play(project_version=project_version, start_variant_id=project_version.variants[0].id)
+    player = recording_synth.player
+    sequencer = player.event_provider().sequencer()
+    msec = 0
+    while recording_synth.is_playing() and msec < 60000:
+        msec += 10
+        sequencer.process(msec)
+        player.worker.wait()
+    assert recording_synth.transport.state == TransportState.IDLE
+    assert len(player.metrics.handoff) == len(player.metrics.durations)
+    timeline = Timeline.from_project_version(
+        project_version=project_version, start_variant_id=project_version.variants[0].id
+    )
+    notes = timeline.events[timeline.events["type"] == EventCode.NOTE]
+    assert [event.data[0] for event in sequencer.played if event.code == EventCode.NOTE] == notes["pitch"].tolist()
+    recording_synth.player.dispose()
+    assert player.worker is None
+
+
+def test_repeat_loops_to_first_variant(recording_synth, track_c_major, bpm):
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_repeat_loops_to_first_variant", bpm=bpm, tracks=Tracks(__root__=[track_c_major])
+    )
+    composition = project_version.compositions[0]
+    project_version.add_composition_variant(
+        name="2", composition_name=composition.name, selected=False, enable_all_tracks=True
+    )
+    variants = composition.variants
+    recording_synth.play(
+        project_version=project_version, start_variant_id=variants[1].id, options=PlayOptions(repeat=True)
+    )
+    scheduler = recording_synth.player.event_provider().scheduler
+    origin = scheduler.origin
+    timeline = Timeline.from_project_version(project_version=project_version, start_variant_id=variants[0].id)
+    start = recording_synth.timelines.index(project_version=project_version, variant_id=variants[0].id).tick_offsets[1]
+    assert scheduler.timeline.length == timeline.length
+    ticks = timeline.events["tick"][timeline.events["type"] == EventCode.NOTE].tolist()
+    expected = [tick + origin for tick in ticks if tick >= start]
+    expected += [tick + origin + timeline.length for tick in ticks if tick < start]
+    sequencer = recording_synth.player.event_provider().sequencer()
+    msec = 0
+    while len([event for event in sequencer.played if event.code == EventCode.NOTE]) < len(expected) and msec < 60000:
+        msec += 10
+        sequencer.process(msec)
+    assert recording_synth.is_playing()
+    notes = [event.time for event in sequencer.played if event.code == EventCode.NOTE]
+    assert notes[: len(expected)] == expected
+    recording_synth.stop()
+
+
+def test_duplicate_callbacks_skipped(recording_synth, track_c_major, bpm):
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_duplicate_callbacks_skipped", bpm=bpm, tracks=Tracks(__root__=[track_c_major])
+    )
+    recording_synth.play(
+        project_version=project_version,
+        start_variant_id=project_version.variants[0].id,
+        options=PlayOptions(repeat=True),
+    )
+    player = recording_synth.player
+    sequencer = player.event_provider().sequencer()
+    sequencer.process(1000)
+    last_callback = player.last_callback
+    timers = len(sequencer.timers)
+    player.prefetch(now=last_callback)
+    assert (player.last_callback, len(sequencer.timers)) == (last_callback, timers)
+    player.prefetch(now=last_callback + 1)
+    assert (player.last_callback, len(sequencer.timers)) == (last_callback + 1, timers + 1)
+    recording_synth.stop()
+
+
+def test_failed_start_resets_transport(recording_synth, track_c_major, bpm):
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_failed_start_resets_transport", bpm=bpm, tracks=Tracks(__root__=[track_c_major])
+    )
+    variant_id = project_version.variants[0].id
+    with pytest.raises(ValueError):
+        recording_synth.play(
+            project_version=project_version, start_variant_id=variant_id, options=PlayOptions(start_bar_num=100)
+        )
+    assert recording_synth.transport.state == TransportState.IDLE
+    recording_synth.stop()
+    recording_synth.play(project_version=project_version, start_variant_id=variant_id)
+    assert recording_synth.transport.state == TransportState.PLAYING
+    play_to_the_end(synth=recording_synth)
+    assert recording_synth.transport.state == TransportState.IDLE
+
+
+def test_stop_waits_for_refill(recording_synth, track_c_major, bpm):
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_stop_waits_for_refill", bpm=bpm, tracks=Tracks(__root__=[track_c_major])
+    )
+    recording_synth.play(
+        project_version=project_version,
+        start_variant_id=project_version.variants[0].id,
+        options=PlayOptions(repeat=True),
+    )
+    player = recording_synth.player
+    sequencer = player.event_provider().sequencer()
+    stops = [Thread(target=player.stop) for _ in range(2)]
+    with player.lock:
+        for stop in stops:
+            stop.start()
+        stops[0].join(timeout=0.05)
+        assert recording_synth.transport.state == TransportState.PLAYING
+    for stop in stops:
+        stop.join()
+    assert recording_synth.transport.state == TransportState.IDLE
+    assert recording_synth.calls.count(("all_notes_off", -1)) == 1
+    scheduled = len(sequencer.scheduled)
+    player.prefetch(now=sequencer.get_tick() + 1000)
+    assert len(sequencer.scheduled) == scheduled
@@ -0,0 +1,119 @@
+import wave
+from threading import Event
+
+import numpy as np
+import pytest
+
+from src.app.backend.render import OfflineRenderer, RenderProgress, write_audio
+from src.app.model.project_version import ProjectVersion
+from src.app.model.track import Tracks
+from src.app.utils.exceptions import RenderCancelled
+
+
+@pytest.fixture(name="renderer", scope="module")
+def fixture_renderer():
+    renderer = OfflineRenderer()
+    yield renderer
+    renderer.delete()
+
+
+def test_render_variant(renderer, track_c_major, bpm, tmp_path):
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_render_variant", bpm=bpm, tracks=Tracks(__root__=[track_c_major])
+    )
+    file_name = str(tmp_path / "variant.wav")
+    result = renderer.render(
+        project_version=project_version, variant_id=project_version.variants[0].id, file_name=file_name
+    )
+    length = 2 * 4 * 60 / bpm
+    assert result.duration == pytest.approx(length + renderer.tail, abs=0.01)
+    assert np.abs(result.audio).max() > 0
+    assert result.realtime_factor > 1
+    with wave.open(file_name, "rb") as file:
+        assert (file.getnchannels(), file.getframerate(), file.getnframes()) == (2, 44100, len(result.audio))
+
+
+def test_render_composition(renderer, track_c_major, bpm):
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_render_composition", bpm=bpm, tracks=Tracks(__root__=[track_c_major])
+    )
+    composition = project_version.compositions[0]
+    project_version.add_composition_variant(
+        name="2", composition_name=composition.name, selected=False, enable_all_tracks=True
+    )
+    result = renderer.render(project_version=project_version, variant_id=composition.variants[0].id, bpm=2 * bpm)
+    assert result.duration == pytest.approx(2 * 2 * 4 * 60 / (2 * bpm) + renderer.tail, abs=0.01)
+
+
+def test_write_audio_format(tmp_path):
+    with pytest.raises(ValueError):
+        write_audio(file_name=str(tmp_path / "audio.mp3"), audio=np.zeros((1, 2), dtype=np.float32), sample_rate=44100)
+
+
+def test_stream_render(renderer, track_c_major, bpm, tmp_path):
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_stream_render", bpm=bpm, tracks=Tracks(__root__=[track_c_major])
+    )
+    variant_id = project_version.variants[0].id
+    file_name = str(tmp_path / "stream.wav")
+    progress = []
+    result = renderer.render(
+        project_version=project_version,
+        variant_id=variant_id,
+        file_name=file_name,
+        stream=True,
+        progress=progress.append,
+    )
+    assert result.audio is None
+    assert result.frames == progress[-1].total_frames == progress[-1].frames
+    assert [report.bars for report in progress] == sorted(report.bars for report in progress)
+    assert progress[-1].bars == progress[-1].total_bars == 2
+    assert progress[-1].eta == 0
+    with wave.open(file_name, "rb") as file:
+        assert file.getnframes() == result.frames
+    in_memory = renderer.render(project_version=project_version, variant_id=variant_id)
+    with wave.open(file_name, "rb") as file:
+        streamed = np.frombuffer(file.readframes(result.frames), dtype="<i2").reshape(-1, 2)
+    assert np.abs(streamed / np.iinfo(np.int16).max - in_memory.audio).max() < 1e-3
+
+
+def test_stream_render_cancel(renderer, track_c_major, bpm, tmp_path):
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_stream_render_cancel", bpm=bpm, tracks=Tracks(__root__=[track_c_major])
+    )
+    file_name = tmp_path / "cancelled.wav"
+    cancel = Event()
+
+    def on_progress(progress: RenderProgress):
+        if progress.bars:
+            cancel.set()
+
+    with pytest.raises(RenderCancelled):
+        renderer.render(
+            project_version=project_version,
+            variant_id=project_version.variants[0].id,
+            file_name=str(file_name),
+            stream=True,
+            progress=on_progress,
+            cancel=cancel,
+        )
+    assert not file_name.exists()
+
+
+def test_render_levels(renderer, track_c_major, bpm, tmp_path):
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_render_levels", bpm=bpm, tracks=Tracks(__root__=[track_c_major])
+    )
+    file_name = str(tmp_path / "normalized.wav")
+    result = renderer.render(
+        project_version=project_version, variant_id=project_version.variants[0].id, file_name=file_name, normalize=-16.0
+    )
+    levels = result.levels
+    assert levels.master.peak == pytest.approx(np.abs(result.audio).max())
+    assert levels.tracks[track_c_major.name].peak > 0
+    assert levels.master.loudness + 20 * np.log10(levels.gain) == pytest.approx(-16.0, abs=0.01) or (
+        levels.master.peak * levels.gain == pytest.approx(10 ** (-1 / 20))
+    )
+    with wave.open(file_name, "rb") as file:
+        written = np.frombuffer(file.readframes(file.getnframes()), dtype="<i2")
+    assert np.abs(written).max() / np.iinfo(np.int16).max == pytest.approx(levels.master.peak * levels.gain, abs=1e-3)
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from src.app.backend.render_cache import RenderCache
+from src.app.backend.timeline import Timeline
+
+
+@pytest.fixture(name="timeline")
+def fixture_timeline(track_c_major, tmp_path) -> Timeline:
+    sound_font = tmp_path / "test.sf2"
+    sound_font.write_bytes(b"sf2")
+    track_c_major.get_default_version().sf_name = str(sound_font)
+    return Timeline.from_sequence(sequence=track_c_major.get_default_version().get_sequence())
+
+
+def test_key(timeline, bpm):
+    key = RenderCache.key(timeline=timeline, bpm=bpm, sample_rate=44100, tail=2.0)
+    assert key == RenderCache.key(timeline=timeline, bpm=bpm, sample_rate=44100, tail=2.0)
+    assert key != RenderCache.key(timeline=timeline, bpm=bpm + 1, sample_rate=44100, tail=2.0)
+    assert key != RenderCache.key(timeline=timeline, bpm=bpm, sample_rate=48000, tail=2.0)
+    changed = Timeline(events=timeline.events.copy(), presets=timeline.presets, bar_ticks=timeline.bar_ticks)
+    changed.events["pitch"][0] += 1
+    assert key != RenderCache.key(timeline=changed, bpm=bpm, sample_rate=44100, tail=2.0)
+    with open(timeline.presets[0].sf_name, "ab") as sound_font:
+        sound_font.write(b"changed")
+    assert key != RenderCache.key(timeline=timeline, bpm=bpm, sample_rate=44100, tail=2.0)
+
+
+def test_lru(tmp_path):
+    audio = np.ones((1000, 2), dtype=np.float32)
+    cache = RenderCache(directory=str(tmp_path / "cache"), max_bytes=int(2.5 * audio.nbytes))
+    cache.put(key="a", audio=audio)
+    cache.put(key="b", audio=2 * audio)
+    assert cache.get(key="a")[0, 0] == 1
+    cache.put(key="c", audio=3 * audio)
+    assert "a" in cache and "c" in cache and "b" not in cache
+    assert cache.get(key="b") is None
+    assert (cache.hits, cache.misses, cache.bytes_saved) == (1, 1, audio.nbytes)
+    assert cache.hit_rate == 0.5
+    reopened = RenderCache(directory=str(tmp_path / "cache"), max_bytes=cache.max_bytes)
+    assert len(reopened) == 2 and reopened.size == cache.size
+    reopened.clear()
+    assert len(RenderCache(directory=str(tmp_path / "cache"))) == 0
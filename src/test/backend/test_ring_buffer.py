@@ -0,0 +1,58 @@
+import ctypes
+
+import numpy as np
+import pytest
+
+from src.app.backend.ring_buffer import AudioRingBuffer
+from src.app.backend.synth import float_buffer_layout
+
+
+class RampSynth:
+    # Writes a running frame counter to the left channel and its negation to the right one
+    def __init__(self):
+        self.frame = 0
+
+    def write_float_into(self, nframes, left, left_incr, right, right_incr):
+        ramp = np.arange(self.frame, self.frame + nframes, dtype=np.float32)
+        for address, incr, values in ((left, left_incr, ramp), (right, right_incr, -ramp)):
+            samples = np.ctypeslib.as_array((ctypes.c_float * ((nframes - 1) * incr + 1)).from_address(address))
+            samples[::incr] = values
+        self.frame += nframes
+
+
+@pytest.mark.parametrize("planar", [False, True])
+def test_ring_buffer_wraps(planar):
+    ring = AudioRingBuffer(frames=8, planar=planar)
+    synth = RampSynth()
+    data = ring.data.ctypes.data
+    assert ring.pull(synth=synth) == 8
+    out = np.zeros((2, 5) if planar else (5, 2), dtype=np.float32)
+    assert ring.read(out=out) == 5
+    ring.pull(synth=synth, frames=5)
+    first, second = ring.peek()
+    assert (first.shape[1] if planar else len(first), second.shape[1] if planar else len(second)) == (3, 5)
+    left = np.concatenate([first, second], axis=1 if planar else 0)
+    left = left[0] if planar else left[:, 0]
+    assert left.tolist() == list(range(5, 13))
+    assert ring.read(out=np.zeros((2, 8) if planar else (8, 2), dtype=np.float32)) == 8
+    assert len(ring) == 0 and ring.data.ctypes.data == data
+
+
+def test_ring_buffer_overflow():
+    ring = AudioRingBuffer(frames=4)
+    ring.pull(synth=RampSynth(), frames=3)
+    with pytest.raises(ValueError):
+        ring.pull(synth=RampSynth(), frames=2)
+    with pytest.raises(ValueError):
+        ring.consume(frames=4)
+
+
+def test_float_buffer_layout():
+    out = np.zeros((8, 2), dtype=np.float32)
+    assert float_buffer_layout(out=out) == (8, out.ctypes.data, out.ctypes.data + 4, 2)
+    planar = np.zeros((2, 8), dtype=np.float32)
+    assert float_buffer_layout(out=planar, planar=True) == (8, planar.ctypes.data, planar.ctypes.data + 32, 1)
+    assert float_buffer_layout(out=out[::2])[3] == 4
+    for bad in out[:, :1], out[::-1], out[:, ::-1], planar, out.astype(np.float64), out.view(np.uint8)[:, 1:5]:
+        with pytest.raises(ValueError):
+            float_buffer_layout(out=bad)
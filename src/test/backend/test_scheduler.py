@@ -0,0 +1,93 @@
+from dataclasses import replace
+
+import numpy as np
+
+from src.app.backend.scheduler import ChannelPrograms, Histogram, LookaheadScheduler, decode_events
+from src.app.backend.timeline import EventCode, Timeline
+from src.app.utils.properties import PlayOptions
+from src.app.utils.units import bpm2time_scale
+
+
+def sent_ticks(batches) -> list:
+    return [int(tick) for events, offset in batches for tick in events["tick"] + offset]
+
+
+def test_refill_window(track_c_major, bpm):
+    timeline = Timeline.from_sequence(sequence=track_c_major.get_default_version().get_sequence())
+    time_scale = bpm2time_scale(bpm=bpm)
+    scheduler = LookaheadScheduler(timeline=timeline, start_tick=1000, time_scale=time_scale, options=PlayOptions())
+    assert scheduler.stop_time == 1000 + timeline.length
+    ticks = sent_ticks(scheduler.refill(now=1000, record=False))
+    assert ticks and all(1000 <= tick < 1000 + scheduler.window for tick in ticks)
+    assert scheduler.scheduled_until == 1000 + scheduler.window
+    now, sent = 1000, ticks
+    while not scheduler.is_finished():
+        now += scheduler.period
+        sent += sent_ticks(scheduler.refill(now=now))
+    assert sent == list(timeline.events["tick"] + 1000)
+    assert scheduler.metrics.late == 0
+    assert scheduler.metrics.min_margin > 0
+
+
+def test_refill_late_and_repeat(track_c_major, bpm):
+    timeline = Timeline.from_sequence(sequence=track_c_major.get_default_version().get_sequence())
+    scheduler = LookaheadScheduler(
+        timeline=timeline,
+        start_tick=0,
+        time_scale=bpm2time_scale(bpm=bpm),
+        options=PlayOptions(repeat=True),
+        start_position=timeline.bar_start(bar_num=1),
+    )
+    scheduler.refill(now=0, record=False)
+    ticks = sent_ticks(scheduler.refill(now=timeline.length))
+    assert scheduler.metrics.late == 1
+    assert ticks[-1] >= timeline.bar_length(bar_num=1)
+    assert not scheduler.is_finished()
+
+
+def test_refill_bounded_queue(sequence, bpm):
+    timeline = Timeline.from_sequence(sequence=sequence)
+    options = replace(PlayOptions(), lookahead_ms=10_000, max_queued_events=1)
+    scheduler = LookaheadScheduler(timeline=timeline, start_tick=0, time_scale=bpm2time_scale(bpm=bpm), options=options)
+    batches = scheduler.refill(now=0, record=False)
+    assert len(batches[0][0]) == 2
+    assert np.all(batches[0][0]["tick"] == 0)
+    assert not scheduler.refill(now=0)
+    assert scheduler.queued(now=1) == 0
+    assert sent_ticks(scheduler.refill(now=1)) == [timeline.bar_start(bar_num=1)]
+    assert sent_ticks(scheduler.refill(now=timeline.bar_start(bar_num=1) + 1)) == [int(timeline.events["tick"][-1])]
+    assert scheduler.is_finished()
+
+
+def test_channel_programs():
+    programs = ChannelPrograms()
+    assert programs.select(channel=0, program=(1, 0, 0))
+    assert not programs.select(channel=0, program=(1, 0, 0))
+    assert programs.select(channel=9, program=(1, 128, 0))
+    assert programs.select(channel=0, program=(1, 0, 26))
+    assert not programs.select(channel=9, program=(1, 128, 0))
+    assert (programs.sent, programs.suppressed) == (3, 2)
+
+
+def test_decode_events(sequence):
+    timeline = Timeline.from_sequence(sequence=sequence)
+    program_list = [(1, 0, 0)] * len(timeline.presets)
+    programs = ChannelPrograms()
+    decoded = list(decode_events(events=timeline.events, program_list=program_list, offset=10, programs=programs))
+    assert [time for time, *_ in decoded] == (timeline.events["tick"] + 10).tolist()
+    notes = timeline.events[timeline.events["type"] == EventCode.NOTE]
+    assert [data for _, code, _, data in decoded if code == EventCode.NOTE] == [
+        (pitch, velocity, duration - 1)
+        for pitch, velocity, duration in notes[["pitch", "velocity", "duration"]].tolist()
+    ]
+    assert not list(decode_events(events=timeline.events[:1], program_list=program_list, offset=0, programs=programs))
+
+
+def test_histogram():
+    histogram = Histogram(edges=[1, 5, 10])
+    for value in (0.5, 1, 2, 4, 7, 20):
+        histogram.record(value)
+    assert histogram.buckets() == [("<1", 1), ("1-5", 3), ("5-10", 1), (">=10", 1)]
+    assert histogram.percentile(50) == 5
+    assert histogram.percentile(100) == 20
+    assert histogram.mean == round(34.5 / 6, 3)
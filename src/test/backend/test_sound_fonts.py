@@ -0,0 +1,60 @@
+import pytest
+
+from src.app.backend.sound_fonts import SoundFontManager, SoundFontRegistry
+from src.app.model.types import Preset
+
+
+@pytest.fixture(name="sound_fonts")
+def fixture_sound_fonts(tmp_path) -> list:
+    sound_fonts = []
+    for name in "abcd":
+        sound_font = tmp_path / f"{name}.sf2"
+        sound_font.write_bytes(b"0" * 100)
+        sound_fonts.append(str(sound_font))
+    return sound_fonts
+
+
+def test_lru_victims(sound_fonts):
+    a, b, c, d = sound_fonts
+    manager = SoundFontManager(budget=250)
+    for sf_name in (a, b, c):
+        manager.loaded(sf_name=sf_name, load_time=0.1)
+    manager.touch(sf_name=a)
+    assert manager.victims() == [b]
+    manager.referenced = {b}
+    assert manager.victims() == [c]
+    manager.playing = {c}
+    assert manager.victims() == [a]
+    assert manager.victims(keep={a}) == []
+    assert not manager.fits(sf_name=d)
+
+
+def test_stats(sound_fonts):
+    a, *_ = sound_fonts
+    manager = SoundFontManager(budget=1000)
+    manager.loaded(sf_name=a, load_time=0.1)
+    manager.touch(sf_name=a)
+    manager.unloaded(sf_name=a)
+    assert a not in manager
+    assert (manager.size, manager.unloads) == (0, 1)
+    manager.loaded(sf_name=a, load_time=0.2)
+    stats = manager.stats(sf_name=a)
+    assert (stats.size, stats.loads, stats.uses, stats.load_time) == (100, 2, 3, 0.2)
+    assert manager.size == 100
+
+
+def test_registry():
+    registry = SoundFontRegistry()
+    registry.add(sf_name="a.sf2", sfid=1)
+    registry.add_presets(sfid=1, presets=[(0, 0, "Piano"), (128, 0, "Standard")])
+    registry.add(sf_name="b.sf2", sfid=2)
+    assert (registry.sfid(sf_name="a.sf2"), registry.sf_name(sfid=2)) == (1, "b.sf2")
+    assert registry.preset_name(sfid=1, bank=128, patch=0) == "Standard"
+    assert registry.banks[1] == {0: {0: "Piano"}, 128: {0: "Standard"}}
+    assert registry.program(preset=Preset(sf_name="a.sf2", bank=0, patch=0)) == (1, 0, 0)
+    assert registry.remove(sfid=1) == "a.sf2"
+    assert "a.sf2" not in registry
+    assert registry.preset_name(sfid=1, bank=0, patch=0) is None
+    with pytest.raises(ValueError):
+        registry.sf_name(sfid=1)
+    assert registry.remove(sfid=1) is None
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pytest
+
+from src.app.backend.render import OfflineRenderer
+from src.app.backend.render_cache import RenderCache
+from src.app.backend.stems import mix_stems, render_stems
+from src.app.model.project_version import ProjectVersion
+from src.app.model.sequence import Sequence
+from src.app.model.track import Track, Tracks, TrackVersion
+from src.app.utils.properties import MidiAttr
+
+
+def test_mix_stems():
+    stems = [np.ones((4, 2), dtype=np.float32), np.ones((2, 2), dtype=np.float32)]
+    mix = mix_stems(stems=stems, gains=[0.5, 2.0])
+    assert mix.shape == (4, 2)
+    assert list(mix[:, 0]) == [2.5, 2.5, 0.5, 0.5]
+
+
+def test_render_stems(track_c_major, bar_c_major_down, bar_c_major_up, bpm, tmp_path):
+    sequence = Sequence.from_bars([bar_c_major_down, bar_c_major_up], overwrite_bar_nums=True)
+    track = Track(
+        name="c major down",
+        versions=[TrackVersion(channel=1, name="v1", sequence=sequence, sf_name=MidiAttr.DEFAULT_SF2)],
+    )
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_render_stems", bpm=bpm, tracks=Tracks(__root__=[track_c_major, track])
+    )
+    variant_id = project_version.variants[0].id
+    result = render_stems(
+        project_version=project_version,
+        variant_id=variant_id,
+        directory=str(tmp_path),
+        workers=2,
+        mix_file_name=str(tmp_path / "mix.wav"),
+    )
+    assert set(result.stems) == {track_c_major.name, track.name}
+    assert all(os.path.exists(file_name) for file_name in result.stems.values())
+    renderer = OfflineRenderer()
+    full_mix = renderer.render(project_version=project_version, variant_id=variant_id).audio
+    renderer.delete()
+    assert result.mix.shape == full_mix.shape
+    assert np.abs(result.mix - full_mix).max() == pytest.approx(0, abs=1e-2)
+
+
+def test_render_stems_cache(track_c_major, bar_c_major_down, bar_c_major_up, bpm, tmp_path):
+    sequence = Sequence.from_bars([bar_c_major_down, bar_c_major_up], overwrite_bar_nums=True)
+    track = Track(
+        name="c major down",
+        versions=[TrackVersion(channel=1, name="v1", sequence=sequence, sf_name=MidiAttr.DEFAULT_SF2)],
+    )
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_render_stems_cache", bpm=bpm, tracks=Tracks(__root__=[track_c_major, track])
+    )
+    variant_id = project_version.variants[0].id
+    cache = RenderCache(directory=str(tmp_path / "cache"))
+    first = render_stems(
+        project_version=project_version, variant_id=variant_id, directory=str(tmp_path), mix=True, cache=cache
+    )
+    second = render_stems(
+        project_version=project_version, variant_id=variant_id, directory=str(tmp_path), mix=True, cache=cache
+    )
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert np.array_equal(first.mix, second.mix)
+    sequence.bars[0].events()[0].pitch += 1
+    render_stems(project_version=project_version, variant_id=variant_id, directory=str(tmp_path), cache=cache)
+    assert (cache.hits, cache.misses) == (3, 3)
@@ -0,0 +1,95 @@
+import pytest
+
+from src.app.backend.timeline import EventCode, NO_PRESET, Timeline, TimelineCache
+from src.app.model.project_version import ProjectVersion
+from src.app.model.track import Tracks
+from src.app.utils.notification import notify
+from src.app.utils.properties import MidiAttr, NotificationMessage
+
+
+def test_from_sequence(sequence):
+    timeline = Timeline.from_sequence(sequence=sequence)
+    assert len(timeline) == 4
+    assert timeline.num_of_bars == 2
+    assert timeline.bar_length(bar_num=0) == timeline.bar_length(bar_num=1) == 4 * MidiAttr.TICKS_PER_BEAT
+    assert list(timeline.events["type"]) == [EventCode.PROGRAM, EventCode.NOTE, EventCode.CONTROL, EventCode.NOTE]
+    assert list(timeline.bar(bar_num=1)["pitch"]) == [0, 80]
+    assert timeline.bar(bar_num=1)["tick"][-1] == timeline.bar_start(bar_num=1) + MidiAttr.TICKS_PER_BEAT // 2
+    assert timeline.preset(index=timeline.bar(bar_num=0)["preset"][0]).sf_name == "test"
+    assert timeline.bar(bar_num=0)["preset"][1] == NO_PRESET
+
+
+def test_from_project_version(track_c_major, bpm):
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_from_project_version", bpm=bpm, tracks=Tracks(__root__=[track_c_major])
+    )
+    composition = project_version.compositions[0]
+    project_version.add_composition_variant(
+        name="2", composition_name=composition.name, selected=False, enable_all_tracks=True
+    )
+    variants = composition.variants
+    timeline = Timeline.from_project_version(project_version=project_version, start_variant_id=variants[0].id)
+    assert timeline.num_of_bars == 4
+    assert len(timeline) == 32
+    assert len(timeline.presets) == 1
+    assert all(timeline.events["preset"] == 0)
+    assert list(timeline.bar(bar_num=0)["pitch"]) == list(timeline.bar(bar_num=2)["pitch"])
+    assert all(timeline.events["tick"][1:] >= timeline.events["tick"][:-1])
+
+
+def test_cache(track_c_major, bpm):
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_cache", bpm=bpm, tracks=Tracks(__root__=[track_c_major]), add_to_composition=False
+    )
+    cache = TimelineCache()
+    variant_id = project_version.variants[0].id
+    timeline = cache.get(project_version=project_version, start_variant_id=variant_id)
+    assert cache.get(project_version=project_version, start_variant_id=variant_id) is timeline
+    assert (cache.hits, cache.misses) == (1, 1)
+    project_version.variants[0].items[0].enabled = False
+    project_version.variants[0].items[0].enabled = True
+    track_c_major.get_default_version().patch = 5
+    assert cache.get(project_version=project_version, start_variant_id=variant_id) is not timeline
+    notify(message=NotificationMessage.EVENT_CHANGED, event=None, changed_event=None)
+    assert len(cache) == 0
+
+
+def test_composition_index(track_c_major, bpm):
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_composition_index", bpm=bpm, tracks=Tracks(__root__=[track_c_major])
+    )
+    composition = project_version.compositions[0]
+    cache = TimelineCache()
+    index = cache.index(project_version=project_version, variant_id=composition.variants[0].id)
+    assert (index.num_of_bars, len(index)) == (2, 1)
+    for name in ("2", "3"):
+        project_version.add_composition_variant(
+            name=name, composition_name=composition.name, selected=False, enable_all_tracks=True
+        )
+    assert cache.index(project_version=project_version, variant_id=composition.variants[0].id) is index
+    assert index.num_of_bars == project_version.get_total_num_of_bars(variant_id=composition.variants[0].id) == 6
+    bar_length = index.variant_bar_ticks[0][1]
+    assert index.seek_bar(bar_num=3) == (composition.variants[1].id, bar_length)
+    assert index.seek_bar(bar_num=1, variant_id=composition.variants[2].id) == (composition.variants[2].id, bar_length)
+    assert index.seek_tick(tick=4 * bar_length + 5) == (composition.variants[2].id, 5)
+    variants = composition.variants
+    assert index.seek_bar(bar_num=3, variant_id=variants[0].id, last_variant_id=variants[1].id)[0] == variants[1].id
+    with pytest.raises(ValueError):
+        index.seek_bar(bar_num=2, variant_id=variants[0].id, last_variant_id=variants[0].id)
+    with pytest.raises(ValueError):
+        index.seek_tick(tick=2 * bar_length, variant_id=variants[0].id, last_variant_id=variants[0].id)
+    # The last variant before the start one does not limit the seek, like the play order
+    assert index.seek_bar(bar_num=1, variant_id=variants[2].id, last_variant_id=variants[0].id)[0] == variants[2].id
+    project_version.remove_composition_variant(composition_name=composition.name, variant=composition.variants[1])
+    assert index.num_of_bars == 4
+    assert index.seek_bar(bar_num=3) == (composition.variants[1].id, bar_length)
+    with pytest.raises(ValueError):
+        index.seek_bar(bar_num=4)
+
+
+def test_from_store(track_c_major, sequence):
+    for source in sequence, track_c_major.get_default_version().get_sequence():
+        timeline = Timeline.from_sequence(sequence=source)
+        from_store = Timeline.from_store(store=source.to_store(), bar_ticks=timeline.bar_ticks)
+        assert (from_store.events == timeline.events).all()
+        assert from_store.presets == timeline.presets
@@ -0,0 +1,73 @@
+from time import perf_counter
+
+from src.app.model.bar import Bar, overlaps
+from src.app.model.control import PitchBend, PitchBendChain
+from src.app.model.event import Event, EventType
+from src.app.model.meter import Meter
+from src.app.utils.properties import MidiAttr
+
+# 128th triplets over 16 drum pitches
+ROLL_STEP = MidiAttr.PPQ // 48
+ROLL_PITCHES = range(35, 51)
+BEND_STEP = 2
+
+
+def drum_roll(meter: Meter) -> Bar:
+    bar = Bar(meter=meter, bar_num=0)
+    for tick in range(0, meter.length_ticks(), ROLL_STEP):
+        for pitch in ROLL_PITCHES:
+            bar.add_event(
+                Event(type=EventType.NOTE, channel=MidiAttr.DRUM_CHANNEL, tick=tick, pitch=pitch, duration=ROLL_STEP)
+            )
+    return bar
+
+
+def bend_bar(meter: Meter) -> Bar:
+    bar = Bar(meter=meter, bar_num=0)
+    chain = PitchBendChain(__root__=[PitchBend(time=0, value=0)])
+    for tick in range(0, meter.length_ticks(), BEND_STEP):
+        bar.add_event(Event(type=EventType.PITCH_BEND, channel=0, tick=tick, pitch_bend_chain=chain))
+    for tick in range(0, meter.length_ticks(), MidiAttr.PPQ):
+        bar.add_event(Event(type=EventType.NOTE, channel=0, tick=tick, pitch=60, duration=MidiAttr.PPQ))
+    return bar
+
+
+def probes(bar: Bar):
+    return [
+        Event(type=EventType.NOTE, channel=event.channel, tick=event.tick + 1, pitch=event.pitch, duration=ROLL_STEP)
+        for event in bar.events()[:: len(bar) // 200]
+        if event.type == EventType.NOTE
+    ]
+
+
+def test_bench_bar_queries():
+    for name, bar in ("drum roll", drum_roll(meter=Meter())), ("pitch bends", bend_bar(meter=Meter(numerator=8))):
+        queries = probes(bar=bar)
+        start = perf_counter()
+        indexed = [bar.has_conflict(event=event) for event in queries]
+        found = [bar.has_event(event=event) for event in bar.events()[:: len(bar) // 200]]
+        elapsed = perf_counter() - start
+
+        notes = [event for event in bar if event.type == EventType.NOTE]
+        start = perf_counter()
+        scanned = [
+            any(event.pitch == other.pitch and overlaps(event=event, other=other) for other in notes)
+            for event in queries
+        ]
+        scanned_found = [[e for e in bar if e == event] for event in bar.events()[:: len(bar) // 200]]
+        linear = perf_counter() - start
+
+        print(f"\n{name}: {len(bar)} events, {len(queries) + len(found)} queries")
+        print(f"indexed {1e6 * elapsed / (len(queries) + len(found)):.1f} us/query ({linear / elapsed:.1f}x)")
+        assert indexed == scanned
+        assert all(found) and all(len(events) == 1 for events in scanned_found)
+        assert elapsed < linear
+
+
+def test_bench_bar_inserts():
+    meter = Meter()
+    start = perf_counter()
+    bar = drum_roll(meter=meter)
+    elapsed = perf_counter() - start
+    print(f"\ninserted {len(bar)} events in {1000 * elapsed:.1f} ms ({1e6 * elapsed / len(bar):.1f} us/event)")
+    assert len(bar) == meter.length_ticks() // ROLL_STEP * len(ROLL_PITCHES)
@@ -0,0 +1,54 @@
+import tracemalloc
+from time import perf_counter
+from typing import Callable, Iterator, Tuple
+
+from src.app.model.event import Event
+from src.app.model.event_store import EventStore
+from src.app.model.types import Json
+from src.app.utils.properties import MidiAttr
+
+SIZES = 10_000, 100_000, 1_000_000
+# Building a million models takes minutes and gigabytes, so models are measured up to this size
+MAX_MODELS = 100_000
+
+
+def note_dicts(count: int) -> Iterator[Json]:
+    # Eight 16th notes per bar, as read from a saved project
+    for index in range(count):
+        yield {
+            "type": "3-note",
+            "channel": index % 16,
+            "tick": index % 8 * MidiAttr.PPQ // 4,
+            "pitch": 36 + index % 48,
+            "duration": MidiAttr.PPQ // 4,
+            "bar_num": index // 8,
+        }
+
+
+def measure(build: Callable) -> Tuple[float, int, object]:
+    # Timed apart from tracing, which slows allocations down several times
+    start = perf_counter()
+    build()
+    elapsed = perf_counter() - start
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, size, result
+
+
+def test_bench_event_store():
+    print()
+    for count in SIZES:
+        elapsed, size, store = measure(lambda: EventStore.from_dicts(note_dicts(count=count)))
+        assert len(store) == count
+        print(f"{count:>9,} events store  {elapsed:7.3f} s {size / 2**20:8.1f} MB ({size / count:.0f} B/event)")
+        if count > MAX_MODELS:
+            continue
+        model_elapsed, model_size, events = measure(lambda: [Event(**event) for event in note_dicts(count=count)])
+        assert len(events) == count
+        print(
+            f"{count:>9,} events models {model_elapsed:7.3f} s {model_size / 2**20:8.1f} MB "
+            f"({model_size / count:.0f} B/event, {model_size / size:.0f}x memory, {model_elapsed / elapsed:.1f}x time)"
+        )
+        assert size < model_size
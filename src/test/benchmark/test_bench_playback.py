@@ -0,0 +1,38 @@
+from statistics import mean
+from time import perf_counter
+
+from src.app.backend.timeline import EventCode
+from src.app.model.project_version import ProjectVersion
+from src.app.model.sequence import Sequence
+from src.app.model.track import Track, Tracks, TrackVersion
+
+NUM_OF_BARS = 256
+STEP_MS = 10
+
+
+def test_bench_recording_playback(recording_synth, track_c_major, bpm):
+    bars = [
+        bar.copy(deep=True)
+        for _ in range(NUM_OF_BARS // 2)
+        for bar in track_c_major.get_default_version().get_sequence()
+    ]
+    track = Track(name="long", versions=[TrackVersion.from_sequence(sequence=Sequence.from_bars(bars=bars))])
+    project_version = ProjectVersion.init_from_tracks(
+        name="test_bench_recording_playback", bpm=bpm, tracks=Tracks(__root__=[track])
+    )
+
+    start = perf_counter()
+    recording_synth.play(project_version=project_version, start_variant_id=project_version.variants[0].id)
+    sequencer = recording_synth.player.event_provider().sequencer()
+    msec = 0
+    while recording_synth.is_playing():
+        msec += STEP_MS
+        sequencer.process(msec)
+    elapsed = perf_counter() - start
+
+    notes = sum(1 for event in sequencer.played if event.code == EventCode.NOTE)
+    callbacks = [1000 * duration for duration in sequencer.callback_durations]
+    print(f"\nplayed {notes} notes of {msec / 1000:.1f} s in {elapsed:.3f} s ({msec / 1000 / elapsed:.0f}x realtime)")
+    print(f"scheduled {len(sequencer.scheduled) / elapsed:,.0f} events/s")
+    print(f"callbacks {len(callbacks)} mean {mean(callbacks):.3f} ms max {max(callbacks):.3f} ms")
+    assert notes == NUM_OF_BARS * 8
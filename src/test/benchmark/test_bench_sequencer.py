@@ -0,0 +1,36 @@
+from time import perf_counter
+
+from src.app.backend.synth import Sequencer
+from src.app.backend.timeline import Timeline
+from src.app.model.sequence import Sequence
+from src.app.utils.units import bpm2time_scale, ppq2tick
+
+NUM_OF_BARS = 64
+# Events are scheduled far ahead so nothing is played while measuring
+OFFSET = 10_000_000
+
+
+def test_bench_send_events(synth, track_c_major, bpm):
+    bars = [
+        bar.copy(deep=True)
+        for _ in range(NUM_OF_BARS // 2)
+        for bar in track_c_major.get_default_version().get_sequence()
+    ]
+    sequence = Sequence.from_bars(bars=bars)
+    timeline = Timeline.from_sequence(sequence=sequence)
+    sequencer = Sequencer(synth=synth, time_scale=bpm2time_scale(bpm=bpm), use_system_timer=False)
+
+    start = perf_counter()
+    for bar_num, bar in sequence.bars.items():
+        for event in bar.events():
+            time = OFFSET + timeline.bar_start(bar_num=bar_num) + ppq2tick(ticks=event.tick)
+            sequencer.send_event(time=time, event=event, synth_seq_id=sequencer.synth_seq_id)
+    per_event = perf_counter() - start
+
+    start = perf_counter()
+    sequencer.send_events(events=timeline.events, presets=timeline.presets, offset=OFFSET, dest=sequencer.synth_seq_id)
+    batched = perf_counter() - start
+
+    print(f"\nsend_event  {len(timeline) / per_event:,.0f} events/s")
+    print(f"send_events {len(timeline) / batched:,.0f} events/s ({per_event / batched:.1f}x)")
+    assert batched < per_event
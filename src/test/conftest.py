@@ -4,7 +4,7 @@ import pytest
 from pydantic import PositiveInt
 
 from src.app.backend.composer import Composer
-from src.app.backend.midway_synth import MidwaySynth
+from src.app.backend.midway_synth import MidwaySynth, RecordingMidwaySynth
 from src.app.mingus.containers.note import Note
 from src.app.mingus.core.scales import Major
 from src.app.model.bar import Bar
@@ -264,13 +264,20 @@ def fixture_bass_sequence(rhythm, num_of_bars) -> Sequence:
 
 
 @pytest.fixture(scope="session")
-def synth() -> MidwaySynth():
+def synth() -> MidwaySynth:
     s = MidwaySynth()
     yield s
     s.stop()
     s.quit()
 
 
+@pytest.fixture(name="recording_synth")
+def fixture_recording_synth(tmp_path) -> RecordingMidwaySynth:
+    s = RecordingMidwaySynth(sf2_path=str(tmp_path))
+    yield s
+    s.quit()
+
+
 @pytest.fixture(name="two_notes")
 def fixture_two_notes() -> List:
     return [
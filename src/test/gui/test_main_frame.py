@@ -0,0 +1,14 @@
+from PySide6.QtCore import QSettings
+
+from src.app.backend.profiles import DEFAULT_ENGINE_PROFILE
+from src.app.gui.main_frame import MainFrame
+from src.app.utils.properties import EngineProfileName, IniAttr
+
+
+def test_engine_profile_from_config(tmp_path):
+    config = QSettings(str(tmp_path / "config.ini"), QSettings.IniFormat)
+    assert MainFrame.get_engine_profile(config=config) == DEFAULT_ENGINE_PROFILE
+    config.setValue(IniAttr.ENGINE_PROFILE, EngineProfileName.OFFLINE.value)
+    assert MainFrame.get_engine_profile(config=config) == EngineProfileName.OFFLINE
+    config.setValue(IniAttr.ENGINE_PROFILE, "Removed profile")
+    assert MainFrame.get_engine_profile(config=config) == DEFAULT_ENGINE_PROFILE
@@ -1,5 +1,4 @@
 from src.app.model.event import Event, EventType
-from src.app.model.types import NoteUnit
 from src.app.utils.properties import MidiAttr
 
 
@@ -8,9 +7,9 @@ def test_note(note0):
     assert note0.dict() == {
         "type": "3-note",
         "channel": 0,
-        "beat": 0.0,
+        "tick": 0,
         "pitch": 79,
-        "unit": NoteUnit.EIGHTH.value,
+        "duration": MidiAttr.PPQ // 2,
         "velocity": MidiAttr.DEFAULT_VELOCITY,
         "preset": None,
         "controls": None,
@@ -20,6 +19,14 @@ def test_note(note0):
     }
 
 
+def test_note_from_beat_and_unit():
+    # Legacy inverted fractions are converted once, when the event is created or loaded
+    event = Event.parse_raw('{"type": "3-note", "channel": 0, "beat": 2.0, "pitch": 60, "unit": 4.0}')
+    assert (event.tick, event.duration) == (2 * MidiAttr.PPQ, MidiAttr.PPQ)
+    assert "beat" not in event.dict() and "unit" not in event.dict()
+    assert Event.parse_raw(event.json()) == event
+
+
 def test_bar_constructor(bar1):
     assert len(bar1) == 0
 
@@ -90,9 +97,9 @@ def test_program(program0):
     assert program0.dict() == {
         "type": "0-program",
         "channel": 0,
-        "beat": 0.0,
+        "tick": 0,
         "pitch": None,
-        "unit": None,
+        "duration": None,
         "velocity": MidiAttr.DEFAULT_VELOCITY,
         "preset": {"sf_name": "test", "bank": 0, "patch": 0},
         "controls": None,
@@ -107,9 +114,9 @@ def test_controls(control0):
     assert control0.dict() == {
         "type": "1-controls",
         "channel": 0,
-        "beat": 0.0,
+        "tick": 0,
         "pitch": None,
-        "unit": None,
+        "duration": None,
         "velocity": MidiAttr.DEFAULT_VELOCITY,
         "preset": None,
         "controls": [{"class_": {"name": "Volume", "code": 7}, "value": 100}],
@@ -158,3 +165,29 @@ def test_have_same_beat(bar0, note2, note3, note4):
     bar0 += note4
     result = bar0.has_conflict(note2)
     assert result is True
+
+
+def test_events_stay_sorted(bar0, note0, note1, note2, program0):
+    bar0.add_events([note2, note1, program0, note0])
+    assert [(e.tick, e.type) for e in bar0] == sorted((e.tick, e.type) for e in bar0)
+    assert bar0.event_index(note2) == 3
+    bar0.remove_event(note1)
+    assert list(bar0.events()) == [program0, note0, note2]
+
+
+def test_overlapping_notes(bar0):
+    quarter = MidiAttr.PPQ
+    bar0.add_events(
+        [
+            Event(type=EventType.NOTE, channel=0, tick=0, pitch=60, duration=4 * quarter),
+            Event(type=EventType.NOTE, channel=0, tick=quarter, pitch=62, duration=quarter),
+        ]
+    )
+    assert bar0.has_conflict(Event(type=EventType.NOTE, channel=0, tick=3 * quarter, pitch=60, duration=quarter))
+    assert bar0.has_conflict(Event(type=EventType.NOTE, channel=0, tick=quarter // 2, pitch=62, duration=quarter))
+    assert not bar0.has_conflict(Event(type=EventType.NOTE, channel=0, tick=2 * quarter, pitch=62, duration=quarter))
+    assert not bar0.has_conflict(Event(type=EventType.NOTE, channel=0, tick=quarter, pitch=61, duration=quarter))
+    copied = bar0.copy(deep=True)
+    copied.remove_event(copied[0])
+    assert not copied.has_conflict(Event(type=EventType.NOTE, channel=0, tick=3 * quarter, pitch=60, duration=quarter))
+    assert bar0.has_conflict(Event(type=EventType.NOTE, channel=0, tick=3 * quarter, pitch=60, duration=quarter))
@@ -0,0 +1,37 @@
+import json
+
+from src.app.model.event import EventType
+from src.app.model.event_store import EventStore
+from src.app.model.sequence import Sequence
+from src.app.utils.properties import MidiAttr
+
+
+def test_round_trip(sequence):
+    store = sequence.to_store()
+    assert len(store) == len(list(sequence.events()))
+    assert [view.type for view in store] == [EventType.PROGRAM, EventType.NOTE, EventType.CONTROLS, EventType.NOTE]
+    assert [view.bar_num for view in store] == [0, 0, 1, 1]
+    assert store[0].preset.sf_name == "test" and store[1].preset is None
+    assert store[2].controls[0].value == 100
+    restored = Sequence.from_store(store=store, num_of_bars=sequence.num_of_bars())
+    assert [event.bar_num for event in restored.events()] == [0, 0, 1, 1]
+    assert restored.to_store().to_dicts() == store.to_dicts()
+    assert [event.dict(exclude={"bar_num"}) for event in restored.events()] == [
+        event.dict(exclude={"bar_num"}) for event in sequence.events()
+    ]
+
+
+def test_from_dicts(sequence):
+    dicts = json.loads(json.dumps(sequence.to_store().to_dicts()))
+    dicts.append({"type": "3-note", "channel": 0, "beat": 2.0, "pitch": 60, "unit": 4.0, "bar_num": 1})
+    store = EventStore.from_dicts(dicts)
+    assert list(store.events())[:-1] == list(sequence.to_store().events())
+    view = store[len(store) - 1]
+    assert (view.tick, view.duration, view.velocity, view.active) == (
+        2 * MidiAttr.PPQ,
+        MidiAttr.PPQ,
+        MidiAttr.DEFAULT_VELOCITY,
+        True,
+    )
+    assert store.bar(bar_num=1).tolist() == [2, 3, 4]
+    assert len(store.presets) == 1
@@ -1,42 +1,32 @@
-from src.app.mingus.core import value
-from src.app.model.meter import Meter, invert
+from src.app.model.meter import Meter
+from src.app.model.types import NoteUnit
+from src.app.utils.properties import MidiAttr
+from src.app.utils.units import unit2ppq, ppq2tick
 
 
 def test_meter_exceeds_beat_limit():
     meter = Meter()
-    assert meter.significant_value(unit=value.sixty_fourth) is False
-    assert meter.significant_value(unit=value.eighth) is True
+    assert meter.is_significant(ticks=unit2ppq(unit=NoteUnit.SIXTY_FOURTH)) is False
+    assert meter.is_significant(ticks=unit2ppq(unit=NoteUnit.EIGHTH)) is True
+    assert meter.is_significant(ticks=-unit2ppq(unit=NoteUnit.EIGHTH)) is True
 
 
-def test_meter_unit_from_ratio():
+def test_meter_ticks_from_ratio():
     meter = Meter(numerator=3)
-    unit = meter.unit_from_ratio(ratio=1 / 3)
-    print(unit)
-    assert unit == 4.0
+    assert meter.length_ticks() == 3 * MidiAttr.PPQ
+    assert meter.ticks_from_ratio(ratio=1 / 3) == MidiAttr.PPQ
+    assert meter.tick_ratio(ticks=MidiAttr.PPQ) == 1 / 3
 
 
-def test_meter_add():
+def test_meter_exceeds_length():
     meter = Meter()
-    val = meter.add(value=value.eighth, value_diff=-value.quarter)
-    assert val == -value.eighth
-    val = meter.add(value=value.eighth, value_diff=-value.eighth)
-    assert val == 0
-    val = meter.add(value=value.eighth, value_diff=value.eighth)
-    assert val == value.quarter
+    assert not meter.exceeds_length(ticks=meter.length_ticks() - 1)
+    assert meter.exceeds_length(ticks=meter.length_ticks())
 
 
-def test_meter_bar_remainder():
-    meter = Meter()
-    val = meter.add(value=value.half, value_diff=value.quarter)
-    print(val)
-    val = meter.add(value=val, value_diff=value.half)
-    print(val)
-    val = meter.bar_remainder(val)
-    print(val)
-    assert val == 4.0
-    val = meter.add(value=value.quarter, value_diff=-value.half)
-    print(val)
-    assert val == -4.0
-    val = meter.bar_remainder(val)
-    print(invert(val))
-    assert invert(val) == 0.75
+def test_triplets_are_exact():
+    triplet = unit2ppq(unit=NoteUnit.EIGHTH) * 2 // 3
+    assert triplet * 3 == unit2ppq(unit=NoteUnit.QUARTER)
+    assert sum(ppq2tick(ticks=triplet) for _ in range(12)) == 4 * MidiAttr.TICKS_PER_BEAT
+    smallest = unit2ppq(unit=NoteUnit.HUNDRED_TWENTY_EIGHTH) * 2 // 3
+    assert ppq2tick(ticks=smallest) * MidiAttr.PPQ == smallest * MidiAttr.TICKS_PER_BEAT
@@ -1,5 +1,10 @@
+from uuid import uuid4
+
+from src.app.model.event import EventType
 from src.app.model.project_version import ProjectVersion
-from src.app.model.track import Tracks
+from src.app.model.sequence import Sequence
+from src.app.model.track import Track, Tracks, TrackVersion
+from src.app.utils.properties import MidiAttr
 
 
 def test_add_track(empty_project_version, track_c_major, empty_single_variant, empty_composition_variant):
@@ -28,3 +33,34 @@ def test_is_last_variant(track_c_major, bpm):
     variant = project_version.add_single_variant(name="test_is_last_variant", selected=True, enable_all_tracks=True)
     assert project_version.is_last_variant(variant_id=variant.id, repeat=False)
     assert not project_version.is_last_variant(variant_id=variant.id, repeat=True)
+
+
+def test_get_sf_names(track_c_major, bpm):
+    tracks = Tracks(__root__=[track_c_major])
+    project_version = ProjectVersion.init_from_tracks(name="test_get_sf_names", bpm=bpm, tracks=tracks)
+    assert project_version.get_sf_names() == {MidiAttr.DEFAULT_SF2}
+    track_c_major.versions.append(
+        TrackVersion(channel=1, name="chorium", sequence=Sequence(), sf_name=MidiAttr.DEFAULT_SF2_CHORIUM)
+    )
+    assert project_version.get_sf_names() == {MidiAttr.DEFAULT_SF2, MidiAttr.DEFAULT_SF2_CHORIUM}
+
+
+def test_compiled_sequence_shares_events(track_c_major, control0, bpm):
+    version = track_c_major.get_default_version()
+    version.sequence.add_event(bar_num=0, event=control0, callback=False)
+    second = Track(name="second", versions=[version.copy(update={"id": uuid4()})])
+    tracks = Tracks(__root__=[track_c_major, second])
+    project_version = ProjectVersion.init_from_tracks(name="test_compiled_sequence", bpm=bpm, tracks=tracks)
+    sequence = project_version.get_compiled_sequence(variant_id=project_version.variants[0].id)
+    assert len(list(sequence.events())) == 2 * len(list(version.sequence.events()))
+    # Controls are shared as they are, notes are new only to carry the effective preset
+    assert sum(event is control0 for event in sequence.events()) == 2
+    notes = [event for event in sequence.events() if event.type == EventType.NOTE]
+    assert all(note.preset == version.preset() for note in notes)
+    assert all(event.preset is None for event in version.sequence.events())
+    assert len(version.sequence.bars[0]) == len(version.sequence.bars[1]) + 1
+
+    store = version.get_store()
+    assert len(store) == len(list(version.sequence.events()))
+    assert store.presets == [version.preset()]
+    assert store[0].type == EventType.CONTROLS and store[0].preset is None
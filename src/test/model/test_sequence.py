@@ -1,8 +1,24 @@
-from src.app.mingus.core.value import add
+import pytest
+from pubsub import pub
+
 from src.app.model.event import EventType, Event, Diff
-from src.app.model.meter import invert
-from src.app.model.sequence import Sequence
+from src.app.model.sequence import ChangeSet, Sequence
 from src.app.model.types import NoteUnit
+from src.app.utils.exceptions import BeatOutsideOfBar
+from src.app.utils.properties import NotificationMessage
+from src.app.utils.units import unit2ppq
+
+
+@pytest.fixture
+def messages():
+    received = []
+
+    def listener(topic=pub.AUTO_TOPIC, **kwargs):
+        received.append((topic.getName(), kwargs))
+
+    pub.subscribe(listener, pub.ALL_TOPICS)
+    yield received
+    pub.unsubscribe(listener, pub.ALL_TOPICS)
 
 
 def test_sequence_constructor():
@@ -46,6 +62,62 @@ def test_clear_bar(bar0, bar1, note0, note1, seq_empty_bars):
     assert sequence.dict() == seq_empty_bars
 
 
+def test_batch(bar0, bar1, note0, note1, note2, messages):
+    sequence = Sequence.from_bars([bar0, bar1])
+    sequence.add_event(bar_num=0, event=note0)
+    messages.clear()
+    with sequence.batch():
+        sequence.add_events(bar_num=0, events=[note1])
+        sequence.add_event(bar_num=1, event=note2)
+        sequence.remove_event(bar_num=0, event=note0)
+        assert list(sequence.events()) == []
+    assert list(sequence.events()) == [note1, note2]
+    assert len(messages) == 1
+    topic, kwargs = messages[0]
+    changes: ChangeSet = kwargs["changes"]
+    assert topic == NotificationMessage.EVENTS_CHANGED and kwargs["sequence_id"] == id(sequence)
+    assert changes.changed_bars() == [0, 1]
+    assert changes.bar(bar_num=0).added == [note1] and changes.bar(bar_num=0).removed == [note0]
+
+
+def test_batch_records_held_events(bar0, note0, note1, messages):
+    sequence = Sequence.from_bars([bar0])
+    sequence.add_events(bar_num=0, events=[note0, note1])
+    messages.clear()
+    copies = [note0.copy(deep=True), note1.copy(update={"parent_id": id(note1)}, deep=True)]
+    sequence.remove_events(bar_num=0, events=copies)
+    assert sequence.is_empty()
+    changes = messages[0][1]["changes"]
+    assert [id(event) for event in changes.removed()] == [id(note0), id(note1)]
+
+
+def test_batch_rollback(bar0, bar1, note0, note1, messages):
+    sequence = Sequence.from_bars([bar0, bar1])
+    sequence.add_event(bar_num=0, event=note0)
+    messages.clear()
+    outside = note1.copy(update={"tick": bar0.length_ticks()})
+    with pytest.raises(BeatOutsideOfBar):
+        with sequence.batch():
+            sequence.clear_bar(bar_num=0)
+            sequence.add_events(bar_num=1, events=[note1, outside])
+    assert list(sequence.events()) == [note0]
+    assert not messages
+
+
+def test_copy_to_rest_bars(note0, note1, messages):
+    sequence = Sequence.from_num_of_bars(num_of_bars=4)
+    sequence.add_events(bar_num=0, events=[note0, note1])
+    sequence.add_events(bar_num=2, events=[note1.copy(update={"bar_num": 2})])
+    messages.clear()
+    sequence.copy_to_rest_bars(bar_num=0)
+    assert [len(bar) for bar in sequence] == [2, 2, 2, 2]
+    assert all([(e.tick, e.pitch) for e in bar] == [(e.tick, e.pitch) for e in sequence[0]] for bar in sequence)
+    assert len(messages) == 1
+    changes = messages[0][1]["changes"]
+    assert changes.changed_bars() == [1, 2, 3]
+    assert len(list(changes.added())) == 6 and len(list(changes.removed())) == 1
+
+
 def test_clear(bar0, bar1, note0, note1, note2, note3, seq_empty_bars):
     sequence = Sequence.from_bars([bar0, bar1])
     sequence.add_events(bar_num=0, events=[note0, note1])
@@ -107,50 +179,61 @@ def test_remove_events_by_type(bar0, bar1, note0, note1, program0, control0):
     assert not list(sequence.events())
 
 
-def test_changed_event_beat_pitch(bar0, bar1):
+def test_changed_event_tick_pitch(bar0, bar1):
     sequence = Sequence.from_bars([bar0, bar1])
-    event = Event(type=EventType.NOTE, pitch=50, beat=NoteUnit.HALF.value, unit=NoteUnit.QUARTER.value, bar_num=0)
+    quarter = unit2ppq(unit=NoteUnit.QUARTER)
+    event = Event(type=EventType.NOTE, pitch=50, tick=2 * quarter, duration=quarter, bar_num=0)
     sequence.add_event(bar_num=0, event=event)
-    moved_event = sequence.get_changed_event(old_event=event, diff=Diff(beat_diff=NoteUnit.QUARTER.value, pitch_diff=1))
+    moved_event = sequence.get_changed_event(old_event=event, diff=Diff(tick_diff=quarter, pitch_diff=1))
     assert moved_event.bar_num == 0
     assert moved_event.pitch == 51
-    assert invert(moved_event.beat) == 0.75
-    moved_event = sequence.get_changed_event(
-        old_event=moved_event, diff=Diff(beat_diff=NoteUnit.QUARTER.value, pitch_diff=1)
-    )
+    assert moved_event.tick == 3 * quarter
+    moved_event = sequence.get_changed_event(old_event=moved_event, diff=Diff(tick_diff=quarter, pitch_diff=1))
     assert moved_event.bar_num == 1
     assert moved_event.pitch == 52
-    assert moved_event.beat == 0.0
-    moved_event = sequence.get_changed_event(
-        old_event=moved_event, diff=Diff(beat_diff=-NoteUnit.QUARTER.value, pitch_diff=-1)
-    )
+    assert moved_event.tick == 0
+    moved_event = sequence.get_changed_event(old_event=moved_event, diff=Diff(tick_diff=-quarter, pitch_diff=-1))
     assert moved_event.bar_num == 0
     assert moved_event.pitch == 51
-    assert invert(moved_event.beat) == 0.75
-    moved_event = sequence.get_changed_event(
-        old_event=moved_event, diff=Diff(beat_diff=-add(NoteUnit.QUARTER.value, NoteUnit.HALF.value), pitch_diff=-1)
-    )
+    assert moved_event.tick == 3 * quarter
+    moved_event = sequence.get_changed_event(old_event=moved_event, diff=Diff(tick_diff=-3 * quarter, pitch_diff=-1))
     assert moved_event.bar_num == 0
     assert moved_event.pitch == 50
-    assert invert(moved_event.beat) == 0
+    assert moved_event.tick == 0
+    assert sequence.get_changed_event(old_event=moved_event, diff=Diff(tick_diff=-quarter)) is None
 
 
-def test_changed_event_unit(bar0, bar1):
+def test_changed_event_duration(bar0, bar1):
     sequence = Sequence.from_bars([bar0, bar1])
-    event = Event(type=EventType.NOTE, pitch=50, beat=NoteUnit.HALF.value, unit=NoteUnit.QUARTER.value, bar_num=0)
+    quarter = unit2ppq(unit=NoteUnit.QUARTER)
+    event = Event(type=EventType.NOTE, pitch=50, tick=2 * quarter, duration=quarter, bar_num=0)
     sequence.add_event(bar_num=0, event=event)
-    moved_event = sequence.get_changed_event(old_event=event, diff=Diff(unit_diff=NoteUnit.HALF.value))
+    moved_event = sequence.get_changed_event(old_event=event, diff=Diff(duration_diff=2 * quarter))
     assert moved_event.bar_num == 0
     assert moved_event.pitch == 50
-    assert moved_event.beat == NoteUnit.HALF.value
-    assert moved_event.unit == add(NoteUnit.QUARTER.value, NoteUnit.HALF.value)
+    assert moved_event.tick == 2 * quarter
+    assert moved_event.duration == 3 * quarter
+    last_event = Event(type=EventType.NOTE, pitch=50, tick=3 * quarter, duration=quarter, bar_num=1)
+    assert sequence.get_changed_event(old_event=last_event, diff=Diff(duration_diff=quarter)) is None
 
 
 def test_copy_bar_from_to(bar0, bar1):
     sequence = Sequence.from_bars([bar0, bar1])
-    event0 = Event(type=EventType.NOTE, pitch=50, beat=NoteUnit.HALF.value, unit=NoteUnit.QUARTER.value, bar_num=0)
+    event0 = Event(
+        type=EventType.NOTE,
+        pitch=50,
+        tick=unit2ppq(unit=NoteUnit.HALF),
+        duration=unit2ppq(unit=NoteUnit.QUARTER),
+        bar_num=0,
+    )
     sequence.add_event(bar_num=0, event=event0)
-    event1 = Event(type=EventType.NOTE, pitch=60, beat=NoteUnit.HALF.value, unit=NoteUnit.QUARTER.value, bar_num=1)
+    event1 = Event(
+        type=EventType.NOTE,
+        pitch=60,
+        tick=unit2ppq(unit=NoteUnit.HALF),
+        duration=unit2ppq(unit=NoteUnit.QUARTER),
+        bar_num=1,
+    )
     sequence.add_event(bar_num=1, event=event1)
     sequence.copy_bar_from_to(from_bar_num=0, to_bar_num=1)
     events1 = bar1.events()